@@ -12,10 +12,37 @@ Usage (RunPod):
     --out runpod/labels.auto.csv \
     --model Qwen/Qwen2-VL-7B-Instruct
 
+Resuming / sharding:
+  Rows are flushed after every batch. Re-running with the same --out skips
+  images already in it (a crash only loses the batch in flight, and new
+  images added to the folder are the only ones labeled); --overwrite
+  relabels everything.
+
+  --shard i/n splits the folder by a stable hash of each image's path
+  relative to --image_dir, so n processes or machines label disjoint sets.
+  Each writes <out stem>.shard-i-of-n.csv next to --out; combine them with
+    python runpod/pseudo_label_qwen2vl.py --merge --image_dir data/motor_checker \
+      --out runpod/labels.auto.csv
+  (rows sorted in folder order, one row per image).
+
+  Images are identified by their path relative to --image_dir, so
+  "./data/motor_checker", an absolute path, or shards written under another
+  machine root never relabel or duplicate an image. The image column is
+  written as data/motor_checker/<file> (relative to the cwd, as
+  make_train_jsonl.py expects).
+
 Env:
-  BATCH (default 1)
+  BATCH (default 1)  images per model.generate call (same as --batch).
+                     Prompts are left-padded; on CUDA OOM the batch is halved
+                     and retried, down to 1. Row order is always folder order.
   MAX_NEW_TOKENS (default 128)
 
+Checking batched output on CPU (should be identical to BATCH=1):
+  BATCH=1 python runpod/pseudo_label_qwen2vl.py --model Qwen/Qwen2-VL-2B-Instruct \
+    --dtype float32 --max_pixels 200704 --limit 8 --image_dir data/motor_checker --out /tmp/b1.csv
+  BATCH=4 python runpod/pseudo_label_qwen2vl.py ...same args... --out /tmp/b4.csv
+  cmp /tmp/b1.csv /tmp/b4.csv
+
 Note:
   This is best-effort. Always manually verify labels before training.
 """
@@ -24,9 +51,11 @@ from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
 import json
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import torch
@@ -80,38 +109,226 @@ def norm_number(v: str | None) -> str | None:
     return digits or None
 
 
+def load_images(paths: list[Path]) -> list[Image.Image]:
+    return [Image.open(p).convert("RGB") for p in paths]
+
+
+def generate_batch(model, processor, imgs: list[Image.Image], question: str, max_new_tokens: int) -> list[str]:
+    """Run one model.generate over a left-padded batch; returns only the generated text per image."""
+    prompts = [
+        processor.apply_chat_template(
+            [{"role": "user", "content": [{"type": "image", "image": img}, {"type": "text", "text": question}]}],
+            tokenize=False,
+            add_generation_prompt=True,
+        )
+        for img in imgs
+    ]
+    inputs = processor(text=prompts, images=imgs, padding=True, return_tensors="pt").to(model.device)
+
+    with torch.no_grad():
+        out_ids = model.generate(**inputs, max_new_tokens=max_new_tokens, temperature=0.1)
+
+    # left padding: every prompt ends at the same column, so the new tokens start there
+    new_ids = out_ids[:, inputs["input_ids"].shape[1] :]
+    return processor.batch_decode(new_ids, skip_special_tokens=True)
+
+
+def is_oom(e: BaseException) -> bool:
+    return isinstance(e, torch.cuda.OutOfMemoryError) or "out of memory" in str(e).lower()
+
+
+def generate_with_backoff(
+    model, processor, imgs: list[Image.Image], question: str, max_new_tokens: int, batch: int
+) -> tuple[list[str], int]:
+    """Generate for all imgs in sub-batches of `batch`, halving it on OOM.
+
+    Returns the texts (same order as imgs) and the batch size that worked, so the
+    caller keeps using the smaller size instead of hitting OOM on every batch.
+    """
+    texts: list[str] = []
+    i = 0
+    while i < len(imgs):
+        chunk = imgs[i : i + batch]
+        oom = False
+        try:
+            texts.extend(generate_batch(model, processor, chunk, question, max_new_tokens))
+            i += len(chunk)
+        except RuntimeError as e:
+            if batch == 1 or not is_oom(e):
+                raise
+            oom = True
+        if oom:
+            # free the failed batch's activations outside the except block (the traceback holds them)
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+            batch = max(1, batch // 2)
+            print(f"[WARN] out of memory, retrying with BATCH={batch}")
+    return texts, batch
+
+
+HEADER = ["image", "has_sticker", "color", "number", "raw"]
+
+
+def parse_shard(v: str) -> tuple[int, int]:
+    try:
+        i, n = (int(x) for x in v.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--shard must look like i/n, got {v!r}")
+    if n < 1 or not 0 <= i < n:
+        raise argparse.ArgumentTypeError(f"--shard needs 0 <= i < n, got {v!r}")
+    return i, n
+
+
+def in_shard(rel: str, shard: tuple[int, int]) -> bool:
+    """Stable across processes and machines (unlike hash(), which is salted per process)."""
+    i, n = shard
+    return int.from_bytes(hashlib.sha1(rel.encode("utf-8")).digest()[:8], "big") % n == i
+
+
+def shard_path(out: Path, shard: tuple[int, int]) -> Path:
+    i, n = shard
+    return out.with_name(f"{out.stem}.shard-{i}-of-{n}{out.suffix}")
+
+
+def dir_prefix(image_dir: Path) -> str:
+    """How --image_dir is written in the image column: relative to the cwd
+    (e.g. data/motor_checker, as make_train_jsonl expects) or absolute if outside it."""
+    rel = os.path.relpath(os.path.abspath(image_dir))
+    return Path(os.path.abspath(image_dir) if rel.startswith("..") else rel).as_posix()
+
+
+def image_key(image: str, image_dir: Path | None) -> str:
+    """Path relative to --image_dir, the identity of an image for resume/merge.
+
+    "./data/x/a.jpg", "data/x/a.jpg" and "/workspace/repo/data/x/a.jpg" all map
+    to "a.jpg". Rows written on another machine root are matched by the last
+    path component named like --image_dir. Without --image_dir the normalized
+    path is used as is.
+    """
+    path = Path(os.path.normpath(image))
+    if image_dir is None:
+        return path.as_posix()
+    try:
+        return Path(os.path.abspath(path)).relative_to(os.path.abspath(image_dir)).as_posix()
+    except ValueError:
+        pass
+    name = Path(os.path.abspath(image_dir)).name
+    if name in path.parts[:-1]:
+        i = len(path.parts) - 1 - path.parts[::-1].index(name)
+        return Path(*path.parts[i + 1 :]).as_posix()
+    return path.as_posix()
+
+
+def read_done(path: Path, image_dir: Path) -> set[str]:
+    """Images (image_key) already labeled in an existing output CSV.
+
+    A crash can leave a half-written last line; it is cut off here so the
+    image is labeled again and appended rows start on a fresh line.
+    """
+    if not path.exists():
+        return set()
+    data = path.read_bytes()
+    if data and not data.endswith(b"\n"):
+        with path.open("r+b") as f:
+            f.truncate(data.rfind(b"\n") + 1)
+    with path.open("r", newline="", encoding="utf-8") as f:
+        return {image_key(row["image"], image_dir) for row in csv.DictReader(f) if row.get("image")}
+
+
+def merge_csv(inputs: list[Path], out: Path, image_dir: Path | None = None) -> int:
+    """Combine label CSVs into `out` in folder order, keeping one row per image.
+
+    Rows are keyed by image_key; with image_dir every image column is also
+    rewritten as <dir_prefix>/<key>, so shards from different roots agree.
+    """
+    rows = {}
+    for path in inputs:
+        with path.open("r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("image"):
+                    key = image_key(row["image"], image_dir)
+                    if image_dir is not None:
+                        row["image"] = f"{dir_prefix(image_dir)}/{key}"
+                    rows[key] = row
+    tmp = out.with_name(out.name + ".tmp")
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=HEADER, extrasaction="ignore")
+        w.writeheader()
+        for key in sorted(rows, key=Path):
+            w.writerow(rows[key])
+    os.replace(tmp, out)
+    return len(rows)
+
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--image_dir", required=True)
+    ap.add_argument("--image_dir", help="Image folder (also used by --merge to match rows across roots)")
     ap.add_argument("--out", required=True)
     ap.add_argument("--model", default="Qwen/Qwen2-VL-7B-Instruct")
     ap.add_argument("--load_4bit", action="store_true", help="Load model in 4bit to reduce VRAM")
+    ap.add_argument("--batch", type=int, default=int(os.environ.get("BATCH", "1")), help="Images per generate call")
+    ap.add_argument("--dtype", choices=["bfloat16", "float16", "float32"], default="bfloat16")
+    ap.add_argument("--max_pixels", type=int, default=None, help="Cap image resolution in the processor")
+    ap.add_argument("--limit", type=int, default=None, help="Only label the first N images")
+    ap.add_argument("--shard", type=parse_shard, default=None, help="Label only shard i of n (e.g. 0/4)")
+    ap.add_argument("--overwrite", action="store_true", help="Relabel everything instead of resuming")
+    ap.add_argument("--merge", action="store_true", help="Combine <out stem>.shard-*-of-*.csv into --out and exit")
     args = ap.parse_args()
 
-    image_dir = Path(args.image_dir)
     out = Path(args.out)
     out.parent.mkdir(parents=True, exist_ok=True)
 
+    if args.merge:
+        shards = sorted(out.parent.glob(f"{out.stem}.shard-*-of-*{out.suffix}"))
+        if not shards:
+            raise SystemExit(f"No shard files found for: {out}")
+        n = merge_csv(shards, out, Path(args.image_dir) if args.image_dir else None)
+        print(f"[OK] merged {len(shards)} shards: {out} ({n} rows)")
+        return
+
+    if not args.image_dir:
+        ap.error("--image_dir is required unless --merge is given")
+    image_dir = Path(args.image_dir)
+
     exts = {".jpg", ".jpeg", ".png", ".webp"}
     images = sorted([p for p in image_dir.rglob("*") if p.suffix.lower() in exts])
     if not images:
         raise SystemExit(f"No images found under: {image_dir}")
+    if args.limit:
+        images = images[: args.limit]
+    if args.shard:
+        images = [p for p in images if in_shard(p.relative_to(image_dir).as_posix(), args.shard)]
+        out = shard_path(out, args.shard)
+
+    if args.overwrite and out.exists():
+        out.unlink()
+    done = read_done(out, image_dir)
+    total = len(images)
+    images = [p for p in images if p.relative_to(image_dir).as_posix() not in done]
+    print(f"[INFO] {out}: {total - len(images)} already labeled, {len(images)} to go")
+    if not images:
+        print(f"[OK] nothing to do: {out}")
+        return
 
     from transformers import Qwen2VLForConditionalGeneration, BitsAndBytesConfig
 
-    processor = AutoProcessor.from_pretrained(args.model)
+    processor_kwargs = {"max_pixels": args.max_pixels} if args.max_pixels else {}
+    processor = AutoProcessor.from_pretrained(args.model, **processor_kwargs)
+    # generation appends after the last prompt token, so pad on the left
+    processor.tokenizer.padding_side = "left"
+    dtype = getattr(torch, args.dtype)
     quant_cfg = None
     if args.load_4bit:
         quant_cfg = BitsAndBytesConfig(
             load_in_4bit=True,
             bnb_4bit_quant_type="nf4",
             bnb_4bit_use_double_quant=True,
-            bnb_4bit_compute_dtype=torch.bfloat16,
+            bnb_4bit_compute_dtype=dtype,
         )
 
     model = Qwen2VLForConditionalGeneration.from_pretrained(
         args.model,
-        torch_dtype=torch.bfloat16,
+        torch_dtype=dtype,
         device_map="auto",
         quantization_config=quant_cfg,
     )
@@ -125,43 +342,48 @@ def main():
         "{\"has_sticker\":true/false,\"color\":string|null,\"number\":string|null}"
     )
 
-    with out.open("w", newline="", encoding="utf-8") as f:
+    batch = max(1, args.batch)
+    batches = [images[i : i + batch] for i in range(0, len(images), batch)]
+
+    resumed = bool(done)
+    prefix = dir_prefix(image_dir)
+    with out.open("a", newline="", encoding="utf-8") as f, ThreadPoolExecutor(max_workers=1) as loader:
         w = csv.writer(f)
-        w.writerow(["image", "has_sticker", "color", "number", "raw"])
-
-        for p in images:
-            img = Image.open(p).convert("RGB")
-            messages = [
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "image", "image": img},
-                        {"type": "text", "text": question},
-                    ],
-                }
-            ]
-
-            prompt = processor.apply_chat_template(messages, tokenize=False, add_generation_prompt=True)
-            inputs = processor(text=[prompt], images=[img], return_tensors="pt").to(model.device)
-
-            with torch.no_grad():
-                out_ids = model.generate(**inputs, max_new_tokens=max_new_tokens, temperature=0.1)
-
-            decoded = processor.batch_decode(out_ids, skip_special_tokens=True)[0]
-            obj = parse_json_from_text(decoded)
-
-            has = False
-            color = None
-            number = None
-            if obj is not None:
-                has = bool(obj.get("has_sticker", False))
-                color = norm_color(obj.get("color")) if has else None
-                number = norm_number(obj.get("number")) if has else None
-
-            rel = p.as_posix()
-            w.writerow([rel, str(has).lower(), color or "", number or "", decoded.replace("\n", " ")])
-
-    print(f"[OK] wrote pseudo labels: {out} ({len(images)} rows)")
+        if f.tell() == 0:
+            w.writerow(HEADER)
+
+        # decode the next batch's JPEGs while the current one is on the accelerator
+        pending = loader.submit(load_images, batches[0])
+        labeled = 0
+        for k, paths in enumerate(batches):
+            imgs = pending.result()
+            if k + 1 < len(batches):
+                pending = loader.submit(load_images, batches[k + 1])
+
+            texts, batch = generate_with_backoff(model, processor, imgs, question, max_new_tokens, batch)
+
+            for p, decoded in zip(paths, texts):
+                obj = parse_json_from_text(decoded)
+
+                has = False
+                color = None
+                number = None
+                if obj is not None:
+                    has = bool(obj.get("has_sticker", False))
+                    color = norm_color(obj.get("color")) if has else None
+                    number = norm_number(obj.get("number")) if has else None
+
+                rel = f"{prefix}/{p.relative_to(image_dir).as_posix()}"
+                w.writerow([rel, str(has).lower(), color or "", number or "", decoded.replace("\n", " ")])
+            # a crash after this point loses nothing that was already generated
+            f.flush()
+            labeled += len(paths)
+            print(f"[{labeled}/{len(images)}] BATCH={batch}", flush=True)
+
+    if resumed:
+        # appended rows went to the end; put the file back in folder order
+        merge_csv([out], out, image_dir)
+    print(f"[OK] wrote pseudo labels: {out} ({len(images)} new rows, {len(images) + len(done)} total)")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+"""
+폴더 일괄 분석 CLI
+
+HTTP 업로드 없이 폴더의 이미지를 워커와 같은 경로(저장 → 3개씩 그룹 →
+analyze_image_group → results.json 저장)로 바로 분석합니다.
+
+    python -m analyze_folder ../data/motor_checker --concurrency 16
+
+- 그룹 단위로 최대 --concurrency개를 동시에 분석 (Vision API 동시 요청 수 = concurrency)
+- 분석이 끝난 그룹은 판정(정상/오류)과 상관없이 상태 파일에 기록하므로 중간에 멈추면
+  다시 실행할 때 이어서 분석 (이미지 처리/Vision API가 실패한 그룹만 다시 분석)
+- 끝나면 초당 이미지 수와 토큰 사용량(가격을 주면 비용)을 출력
+
+결과 저장은 서버와 같은 저장소 잠금(data/results.lock)을 쓰므로 같은 data/를 쓰는
+서버(app.py)가 실행 중이어도 됩니다.
+"""
+import argparse
+import hashlib
+import json
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+import config
+import log
+import metrics
+import storage
+import tracing
+from worker import analyze_image_group
+
+
+logger = log.get_logger("analyze_folder")
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.webp")
+GROUP_SIZE = 3
+
+
+def find_images(folder: Path, recursive: bool = False) -> list:
+    """폴더의 이미지 파일 (이름순)"""
+    files = set()
+    for pattern in IMAGE_PATTERNS:
+        for candidate in (pattern, pattern.upper()):
+            files.update(folder.rglob(candidate) if recursive else folder.glob(candidate))
+    return sorted(files)
+
+
+def default_state_file(folder: Path) -> Path:
+    digest = hashlib.sha1(str(folder.resolve()).encode("utf-8")).hexdigest()[:12]
+    return config.DATA_DIR / "analyze_folder" / f"{digest}.done.jsonl"
+
+
+def load_done(state_file: Path) -> set:
+    """이미 분석한 이미지 (폴더 기준 상대 경로)"""
+    done = set()
+    if not state_file.exists():
+        return done
+    with open(state_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.update(json.loads(line)["images"])
+            except (ValueError, KeyError):
+                continue  # 쓰다가 멈춘 마지막 줄
+    return done
+
+
+def _token_totals() -> dict:
+    totals = {"prompt": 0, "completion": 0}
+    for key, value in metrics.VLM_TOKENS.snapshot().items():
+        kind = dict(json.loads(key)).get("kind")
+        if kind in totals:
+            totals[kind] += value
+    return totals
+
+
+class FolderRun:
+    """한 번의 일괄 분석 실행 (진행 상황, 상태 파일 기록)"""
+
+    def __init__(self, folder: Path, state_file: Path):
+        self.folder = folder
+        self.state_file = state_file
+        self._state_lock = threading.Lock()
+        self.images_done = 0
+        self.groups_done = 0
+        self.groups_failed = 0
+        self.error_groups = 0
+        self.retry_groups = 0
+
+    def _prepare(self, paths: list) -> list:
+        images = []
+        for path in paths:
+            stored = storage.save_upload(path.read_bytes(), path.name)
+            images.append({
+                "filename": path.name,
+                "path": str(stored),
+                "upload_key": storage.upload_key(stored),
+                "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                "trace": tracing.Trace(filename=path.name, source="analyze_folder"),
+            })
+        return images
+
+    def _mark_done(self, paths: list, group_result: dict):
+        """분석이 끝난 그룹을 상태 파일에 기록 (이미지 분석이 실패한 그룹은 다음 실행에서 다시 분석)"""
+        entry = {
+            "images": [path.relative_to(self.folder).as_posix() for path in paths],
+            "group_id": group_result["group_id"],
+            "status": group_result["status"],
+        }
+        with self._state_lock:
+            self.images_done += len(paths)
+            self.groups_done += 1
+            if group_result["status"] != "정상":
+                self.error_groups += 1
+            if any("error" in image for image in group_result["images"]):
+                self.retry_groups += 1
+                logger.warning("folder.group_retry_later", group_id=group_result["group_id"], images=entry["images"])
+                return
+            with open(self.state_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def analyze(self, paths: list):
+        """그룹 하나 분석 (스레드풀에서 실행)"""
+        group_result = analyze_image_group(self._prepare(paths))
+        self._mark_done(paths, group_result)
+        return group_result
+
+
+def run(folder: Path, concurrency: int = 8, state_file: Path = None, limit: int = None,
+        recursive: bool = False, restart: bool = False) -> dict:
+    """
+    폴더 일괄 분석
+
+    Returns:
+        실행 요약 (images, groups, error_groups, retry_groups, failed_groups, seconds, images_per_s, tokens)
+    """
+    folder = folder.resolve()
+    state_file = state_file or default_state_file(folder)
+    state_file.parent.mkdir(parents=True, exist_ok=True)
+    if restart and state_file.exists():
+        state_file.unlink()
+
+    done = load_done(state_file)
+    paths = [path for path in find_images(folder, recursive) if path.relative_to(folder).as_posix() not in done]
+    if limit:
+        paths = paths[:limit]
+    # 마지막 3개 미만 이미지는 다음 실행으로 넘김 (워커와 같은 3개 그룹 규칙)
+    groups = [paths[i:i + GROUP_SIZE] for i in range(0, len(paths) - len(paths) % GROUP_SIZE, GROUP_SIZE)]
+
+    print(f"폴더: {folder}")
+    print(f"이미지 {len(paths)}개 (이미 분석 {len(done)}개 건너뜀) → 그룹 {len(groups)}개, 동시 {concurrency}개")
+    print(f"상태 파일: {state_file}")
+
+    job = FolderRun(folder, state_file)
+    tokens_before = _token_totals()
+    started = time.perf_counter()
+    last_report = started
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="analyze-folder") as executor:
+        futures = {executor.submit(job.analyze, group): group for group in groups}
+        for future in as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                job.groups_failed += 1
+                logger.error("folder.group_error", exc_info=True, images=[p.name for p in futures[future]], error=str(e))
+
+            now = time.perf_counter()
+            if now - last_report >= 5:
+                last_report = now
+                rate = job.images_done / (now - started)
+                print(f"  {job.groups_done}/{len(groups)} 그룹, {rate:.2f} img/s", flush=True)
+
+    elapsed = time.perf_counter() - started
+    tokens_after = _token_totals()
+    tokens = {kind: tokens_after[kind] - tokens_before[kind] for kind in tokens_after}
+    return {
+        "images": job.images_done,
+        "groups": job.groups_done,
+        "error_groups": job.error_groups,
+        "retry_groups": job.retry_groups,
+        "failed_groups": job.groups_failed,
+        "leftover_images": len(paths) % GROUP_SIZE,
+        "seconds": round(elapsed, 2),
+        "images_per_s": round(job.images_done / elapsed, 3) if elapsed > 0 else 0.0,
+        "tokens": tokens,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="폴더의 이미지를 워커 파이프라인으로 일괄 분석")
+    parser.add_argument("folder", help="이미지 폴더")
+    parser.add_argument("--concurrency", type=int, default=8, help="동시에 분석할 그룹 수")
+    parser.add_argument("--recursive", action="store_true", help="하위 폴더까지 포함")
+    parser.add_argument("--limit", type=int, default=None, help="이번에 분석할 최대 이미지 수")
+    parser.add_argument("--state", default=None, help="진행 상태 파일 (기본: data/analyze_folder/<폴더 해시>.done.jsonl)")
+    parser.add_argument("--restart", action="store_true", help="상태 파일을 지우고 처음부터")
+    parser.add_argument("--price-prompt", type=float, default=None, help="입력 토큰 100만 개당 가격 (USD)")
+    parser.add_argument("--price-completion", type=float, default=None, help="출력 토큰 100만 개당 가격 (USD)")
+    args = parser.parse_args()
+
+    folder = Path(args.folder)
+    if not folder.is_dir():
+        parser.error(f"폴더가 없습니다: {folder}")
+
+    summary = run(
+        folder,
+        concurrency=max(1, args.concurrency),
+        state_file=Path(args.state) if args.state else None,
+        limit=args.limit,
+        recursive=args.recursive,
+        restart=args.restart,
+    )
+
+    tokens = summary["tokens"]
+    print("=" * 70)
+    print(f"이미지 {summary['images']}개 / 그룹 {summary['groups']}개 "
+          f"(오류 판정 {summary['error_groups']}개, 분석 실패 {summary['retry_groups']}개, "
+          f"예외 {summary['failed_groups']}개)")
+    print(f"소요 시간: {summary['seconds']}초, 처리량: {summary['images_per_s']} img/s")
+    print(f"토큰: 입력 {tokens['prompt']:,} / 출력 {tokens['completion']:,}")
+    if args.price_prompt is not None or args.price_completion is not None:
+        cost = (tokens["prompt"] * (args.price_prompt or 0) + tokens["completion"] * (args.price_completion or 0)) / 1e6
+        print(f"예상 비용: ${cost:.4f}")
+    if summary["retry_groups"] or summary["failed_groups"]:
+        print("분석 실패/예외 그룹은 완료로 기록하지 않았으니 다시 실행하면 다시 분석합니다.")
+    if summary["leftover_images"]:
+        print(f"남은 이미지 {summary['leftover_images']}개는 3개가 안 되어 다음 실행으로 넘깁니다.")
+    print("=" * 70)
+    sys.exit(1 if summary["failed_groups"] else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,22 +3,50 @@ Motor Sticker Detection API Server
 
 이미지를 업로드하면 백그라운드에서 3개씩 그룹으로 분석합니다.
 """
+import json
 import threading
+import time
+from contextlib import asynccontextmanager
 from datetime import datetime
 from collections import deque
+from typing import Optional
 
 import uvicorn
-import gradio as gr
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 
+import backend
 import config
-from models import load_results
+import export
+import log
+import metrics
+import profiler
+import reanalysis
+import result_index
+import rollups
+import shadow
+import storage
+import thumbnails
+import tracing
+from models import load_results, store_etag, store_version
 from worker import image_queue, background_worker
 
 
+logger = log.get_logger("app")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """서버 시작 시 데이터 디렉토리와 로깅 구성 (import만으로는 파일이나 스레드를 만들지 않음)"""
+    config.ensure_dirs()
+    log.setup()
+    yield
+
+
 # FastAPI 앱 생성
-app = FastAPI(title="Motor Sticker Detection API")
+app = FastAPI(title="Motor Sticker Detection API", lifespan=lifespan)
 
 # CORS 설정 (로컬 테스트용)
 app.add_middleware(
@@ -32,6 +60,45 @@ app.add_middleware(
 # 최근 업로드된 이미지 버퍼 (디버깅용)
 image_buffer = deque(maxlen=1000)
 
+# 저장소 버전별 응답 캐시 (모든 클라이언트가 공유)
+_response_cache = {}
+_response_cache_lock = threading.Lock()
+
+
+def etag_matches(request: Request, tag: str) -> bool:
+    """If-None-Match 헤더에 tag가 있는지 확인 (약한 비교, 여러 값 허용)"""
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(value.strip().removeprefix("W/") == tag for value in header.split(","))
+
+
+def versioned_response(request: Request, cache_key: tuple, build) -> Response:
+    """
+    저장소 버전으로 캐시하는 JSON 응답
+
+    버전이 그대로면 If-None-Match 요청에 저장소를 읽지 않고 304로 응답하고,
+    아니면 같은 버전 동안 build(version) 결과를 모든 클라이언트가 공유합니다.
+    버전은 요청마다 한 번, 저장소를 읽기 전에 구하므로 본문이 태그보다 오래될 수 없습니다.
+    """
+    version = store_version()
+    tag = store_etag(version)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if etag_matches(request, tag):
+        return Response(status_code=304, headers=headers)
+
+    with _response_cache_lock:
+        cached = _response_cache.get(cache_key)
+    if cached is None or cached[0] != version:
+        body = json.dumps(build(version), ensure_ascii=False).encode("utf-8")
+        cached = (version, body)
+        with _response_cache_lock:
+            _response_cache[cache_key] = cached
+
+    return Response(cached[1], media_type="application/json", headers=headers)
+
 
 @app.get("/")
 def health_check():
@@ -54,48 +121,357 @@ async def upload_image(file: UploadFile = File(...)):
     Returns:
         업로드 성공 메시지 및 큐 상태
     """
+    started = time.perf_counter()
+    upload_start_ns = time.time_ns()
+
     if not file.content_type or not file.content_type.startswith("image/"):
+        metrics.UPLOADS.inc(status="rejected")
         raise HTTPException(status_code=400, detail="이미지 파일만 업로드 가능합니다.")
 
     if file.size and file.size > 10 * 1024 * 1024:
+        metrics.UPLOADS.inc(status="rejected")
         raise HTTPException(status_code=400, detail="파일 크기는 10MB 이하여야 합니다.")
 
     try:
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
         filename = f"{timestamp}_{file.filename}"
-        file_path = config.UPLOAD_DIR / filename
 
-        # 파일 저장
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        # 파일 저장 (날짜/해시 샤드 경로, 해시 계산과 쓰기는 스레드풀에서)
+        content = await file.read()
+        file_path = await run_in_threadpool(storage.save_upload, content, file.filename)
+
+        # 이미지별 trace 시작 (업로드 → 분석 → 저장까지 추적)
+        trace = tracing.Trace(start_ns=upload_start_ns, filename=filename)
+        trace.add_span("upload", upload_start_ns, time.time_ns(), bytes=len(content))
 
         # 큐에 추가 (백그라운드 워커가 처리)
         image_info = {
             "filename": filename,
             "path": str(file_path),
-            "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            "upload_key": storage.upload_key(file_path),
+            "upload_time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "trace": trace,
+            "enqueued_ns": time.time_ns()
         }
 
-        print(f"[업로드] 큐에 추가하기 전 - 큐 크기: {image_queue.qsize()}")
+        result_index.mark_pending(filename, trace.trace_id)
         image_queue.put(image_info)
-        print(f"[업로드] 큐에 추가한 후 - 큐 크기: {image_queue.qsize()}")
         image_buffer.append(image_info)
+        queue_size = image_queue.qsize()
 
-        print(f"[업로드 완료] {filename} | 큐 크기: {image_queue.qsize()}")
+        logger.debug("upload.done", filename=filename, queue_size=queue_size, trace_id=trace.trace_id)
+
+        metrics.UPLOADS.inc(status="ok")
+        metrics.UPLOAD_SECONDS.observe(time.perf_counter() - started)
 
         return {
             "success": True,
             "message": "이미지 업로드 완료",
             "filename": filename,
-            "queue_size": image_queue.qsize()
+            "trace_id": trace.trace_id,
+            "queue_size": queue_size
         }
 
     except Exception as e:
-        print(f"[업로드 오류] {str(e)}")
+        metrics.UPLOADS.inc(status="error")
+        metrics.ERRORS.inc(type="upload")
+        logger.error("upload.error", exc_info=True, filename=file.filename, error=str(e))
         raise HTTPException(status_code=500, detail=f"업로드 중 오류 발생: {str(e)}")
 
 
+def build_stats(version: str) -> dict:
+    """전체 처리 현황 (그룹 수, 불량 수준별 개수 등)"""
+    data = load_results()
+    groups = data.get("groups", [])
+    defects = {level: 0 for level in ("정상", "경미한 불량", "심각한 불량")}
+    for group in groups:
+        level = group.get("defect_level")
+        if level in defects:
+            defects[level] += 1
+
+    return {
+        "total_images": data.get("total_images", 0),
+        "total_groups": len(groups),
+        "error_groups": sum(1 for group in groups if group.get("status") != "정상"),
+        "defects": defects,
+        "last_updated": groups[-1]["timestamp"] if groups else None,
+        "version": version
+    }
+
+
+@app.get("/stats")
+def get_stats(request: Request):
+    """
+    전체 처리 현황 (ETag 지원, 결과가 바뀌지 않았으면 304)
+
+    Returns:
+        총 이미지/그룹 수, 오류 그룹 수, 불량 수준별 그룹 수, 마지막 저장 시각
+    """
+    return versioned_response(request, ("stats",), build_stats)
+
+
+@app.get("/results/recent")
+def get_recent_results(request: Request, limit: int = 20):
+    """
+    최근 분석 결과 (ETag 지원, 결과가 바뀌지 않았으면 304)
+
+    Args:
+        limit: 최대 개수 (최대 100)
+
+    Returns:
+        최근 결과 목록 (최신순)
+    """
+    limit = max(1, min(limit, 100))
+
+    def build(version: str):
+        results = load_results().get("results", [])
+        return {"results": results[-limit:][::-1], "version": version}
+
+    return versioned_response(request, ("results_recent", limit), build)
+
+
+@app.get("/results/{key}")
+async def get_image_result(key: str, wait: float = 0):
+    """
+    이미지 한 장의 분석 상태/결과 조회
+
+    Args:
+        key: /upload 응답의 filename 또는 trace_id
+        wait: 아직 분석 전이면 결과가 나올 때까지 최대 wait초 대기 (long-poll)
+
+    Returns:
+        완료: 200 + 그룹 결과 중 이 이미지 결과 (latency_s: 업로드 → 저장 시간)
+        대기 중: 202 + {"status": "pending"}
+    """
+    wait = max(0.0, min(wait, config.RESULT_WAIT_MAX))
+    entry = await result_index.wait_for(key, wait)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="해당 이미지를 찾을 수 없습니다.")
+    if entry["status"] != "done":
+        return JSONResponse(entry, status_code=202)
+    return entry
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus 스크레이프용 메트릭 (텍스트 노출 형식)"""
+    return PlainTextResponse(
+        metrics.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def check_admin(request: Request):
+    """관리자 엔드포인트 접근 확인 (ADMIN_TOKEN 헤더 또는 로컬호스트)"""
+    if config.ADMIN_TOKEN:
+        if request.headers.get("X-Admin-Token") != config.ADMIN_TOKEN:
+            raise HTTPException(status_code=403, detail="관리자 토큰이 올바르지 않습니다.")
+    elif not request.client or request.client.host not in ("127.0.0.1", "::1"):
+        raise HTTPException(status_code=403, detail="ADMIN_TOKEN이 없으면 로컬에서만 호출할 수 있습니다.")
+
+
+@app.post("/admin/profile")
+def start_profile(request: Request, seconds: float = config.PROFILE_SECONDS, format: str = "collapsed"):
+    """
+    실행 중인 프로세스의 모든 스레드를 N초 동안 샘플링 프로파일링
+
+    Args:
+        seconds: 프로파일링 시간 (1~300초로 맞춤)
+        format: collapsed / speedscope
+
+    Returns:
+        결과 파일 경로와 실제 프로파일링 시간 (프로파일링은 백그라운드에서 진행)
+    """
+    check_admin(request)
+    try:
+        path = profiler.start(seconds, fmt=format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    return {
+        "success": True,
+        "message": "프로파일링 시작",
+        "file": str(path),
+        "seconds": profiler.duration(seconds)
+    }
+
+
+@app.post("/admin/reanalysis", status_code=202)
+def create_reanalysis(
+    request: Request,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    group_from: Optional[int] = None,
+    group_to: Optional[int] = None,
+    model: Optional[str] = None
+):
+    """
+    이전 업로드 재분석 작업 등록 (낮은 우선순위 레인, 결과는 그룹의 새 버전으로 저장)
+
+    Args:
+        since, until: 그룹 저장 시각 구간 (예: "2026-10-18")
+        group_from, group_to: 그룹 ID 구간 (양 끝 포함)
+        model: 재분석에 쓸 모델 (기본 MODEL_NAME)
+
+    Returns:
+        작업 정보 (job_id, total, state ...)
+    """
+    check_admin(request)
+    try:
+        job = reanalysis.submit(since, until, group_from, group_to, model)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return job.to_dict()
+
+
+@app.get("/admin/reanalysis")
+def list_reanalysis(request: Request):
+    """재분석 작업 목록과 Vision API 슬롯 사용 현황"""
+    check_admin(request)
+    return {"jobs": reanalysis.list_jobs(), "slots": backend.slots.snapshot()}
+
+
+@app.get("/admin/reanalysis/{job_id}")
+def get_reanalysis(request: Request, job_id: str):
+    """재분석 작업 진행 상황"""
+    check_admin(request)
+    job = reanalysis.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+
+@app.delete("/admin/reanalysis/{job_id}")
+def cancel_reanalysis(request: Request, job_id: str):
+    """재분석 작업 취소 (분석 중인 그룹은 끝까지 처리)"""
+    check_admin(request)
+    job = reanalysis.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다.")
+    return job.to_dict()
+
+
+@app.get("/admin/shadow")
+def get_shadow_report(request: Request, since: Optional[str] = None, until: Optional[str] = None):
+    """
+    섀도 모델 비교 리포트 (기존 모델 대비 필드별 일치율, 지연시간, 최근 불일치 사례)
+
+    Args:
+        since, until: 비교 시각 구간 (예: "2026-10-18")
+    """
+    check_admin(request)
+    return shadow.report(since, until)
+
+
+@app.get("/rollups")
+def get_rollups(
+    resolution: str = "minute",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    limit: int = 120
+):
+    """
+    처리량 / 불량률 시계열 조회 (커밋 시점에 미리 집계된 버킷)
+
+    Args:
+        resolution: minute / hour / day
+        since: 시작 시각 (예: "2026-10-18 09:00")
+        until: 끝 시각
+        limit: 최대 버킷 개수 (최대 1440)
+
+    Returns:
+        버킷별 이미지 수, 그룹 수, 불량 수준별 개수, 오류 그룹 수, 분석 지연시간
+    """
+    if resolution not in rollups.RESOLUTIONS:
+        raise HTTPException(status_code=400, detail="resolution은 minute/hour/day 중 하나여야 합니다.")
+
+    buckets = rollups.query(resolution, since=since, until=until, limit=max(1, min(limit, 1440)))
+    return {
+        "resolution": resolution,
+        "buckets": buckets
+    }
+
+
+@app.get("/export")
+def export_results(
+    request: Request,
+    format: str = "csv",
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    gzip: bool = False,
+    versions: bool = False
+):
+    """
+    결과 이력 스트리밍 내보내기 (그룹 단위, 메모리 사용량 일정)
+
+    Args:
+        format: csv / jsonl / parquet
+        since: 시작 시각 (예: "2026-10-18 09:00")
+        until: 끝 시각
+        gzip: gzip 압축 여부
+        versions: 재분석 버전을 그룹의 versions에 포함 (jsonl만)
+
+    Returns:
+        파일 다운로드 스트림 (그룹 로그와 조건이 그대로면 If-None-Match 요청에 304)
+    """
+    try:
+        export.check_format(format, versions)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    tag, limits = export.snapshot(format, since=since, until=until, compress=gzip, versions=versions)
+    if etag_matches(request, tag):
+        return Response(status_code=304, headers={"ETag": tag, "Cache-Control": "no-cache"})
+
+    filename = f"results.{format}" + (".gz" if gzip else "")
+    headers = {"Content-Disposition": f'attachment; filename="{filename}"', "ETag": tag, "Cache-Control": "no-cache"}
+    media_type = "application/gzip" if gzip else export.FORMATS[format]
+    return StreamingResponse(
+        export.stream(format, since=since, until=until, compress=gzip, versions=versions, limits=limits),
+        media_type=media_type,
+        headers=headers
+    )
+
+
+@app.get("/thumbnails/{key:path}")
+def get_thumbnail(key: str, request: Request, size: int = 160, format: str = "webp"):
+    """
+    업로드 이미지 썸네일 (처음 요청 시 생성, 이후 메모리/디스크 캐시)
+
+    Args:
+        key: 업로드 저장 키 (결과의 upload_key)
+        size: 긴 변 픽셀 (80 / 160 / 320)
+        format: webp / jpeg
+
+    Returns:
+        썸네일 이미지 (If-None-Match가 일치하면 304)
+    """
+    try:
+        # 잘못된 요청은 ETag가 맞아도 304가 아니라 400/404
+        thumbnails.check(key, size, format)
+        tag = thumbnails.etag(key, size, format)
+        headers = {"ETag": tag, "Cache-Control": "public, max-age=31536000, immutable"}
+        if etag_matches(request, tag):
+            return Response(status_code=304, headers=headers)
+        data = thumbnails.get(key, size, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="이미지를 찾을 수 없습니다.")
+
+    return Response(data, media_type=thumbnails.FORMATS[format], headers=headers)
+
+
+def thumbnail_html(upload_key: Optional[str]) -> str:
+    """대시보드 표에 넣을 지연 로딩 썸네일 태그"""
+    if not upload_key:
+        return "-"
+    src = f"{config.PUBLIC_API_URL}/thumbnails/{upload_key}?size=80"
+    return f'<img src="{src}" loading="lazy" decoding="async" width="80" alt="">'
+
+
 def get_dashboard_data():
     """
     대시보드에 표시할 데이터 가져오기
@@ -115,6 +491,7 @@ def get_dashboard_data():
     table_data = []
     for r in recent_results:
         table_data.append([
+            thumbnail_html(r.get("upload_key")),
             r["id"],
             r["timestamp"],
             r["filename"],
@@ -139,8 +516,34 @@ def get_dashboard_data():
     return table_data, stats, total, normal, minor, severe
 
 
+def get_rollup_chart_data(resolution: str = "minute"):
+    """
+    대시보드 차트용 시계열 데이터 (최근 버킷만 읽음)
+
+    Returns:
+        처리량 DataFrame, 불량률 DataFrame
+    """
+    import pandas as pd
+
+    limits = {"minute": 120, "hour": 48, "day": 60}
+    buckets = rollups.query(resolution, limit=limits[resolution])
+
+    throughput = pd.DataFrame(
+        [{"시간": b["t"], "이미지 수": b["images"]} for b in buckets],
+        columns=["시간", "이미지 수"]
+    )
+    defect_rate = pd.DataFrame(
+        [{"시간": b["t"], "불량률 (%)": round(b["defect_rate"] * 100, 1)} for b in buckets],
+        columns=["시간", "불량률 (%)"]
+    )
+    return throughput, defect_rate
+
+
 def create_gradio_interface():
     """Gradio 대시보드 UI 생성"""
+    # HEADLESS 모드에서는 import하지 않도록 여기서 import (수 초 걸림)
+    import gradio as gr
+
     with gr.Blocks(title="Motor Sticker Detection Dashboard") as demo:
         gr.Markdown("# Motor Sticker Detection Dashboard")
         gr.Markdown("실시간 이미지 분석 결과를 확인할 수 있습니다.")
@@ -156,29 +559,52 @@ def create_gradio_interface():
 
         gr.Markdown("## 최근 분석 결과 (최대 20개)")
         results_table = gr.Dataframe(
-            headers=["ID", "시간", "파일명", "스티커 유무", "번호", "색상", "불량 수준"],
-            datatype=["number", "str", "str", "str", "str", "str", "str"],
+            headers=["이미지", "ID", "시간", "파일명", "스티커 유무", "번호", "색상", "불량 수준"],
+            datatype=["html", "number", "str", "str", "str", "str", "str", "str"],
             row_count=20,
-            col_count=(7, "fixed"),
+            col_count=(8, "fixed"),
         )
 
-        def update_dashboard():
+        gr.Markdown("## 처리량 / 불량률 추이")
+        resolution = gr.Radio(
+            choices=[("분", "minute"), ("시간", "hour"), ("일", "day")],
+            value="minute",
+            label="집계 단위"
+        )
+        with gr.Row():
+            throughput_plot = gr.LinePlot(x="시간", y="이미지 수", title="처리량")
+            defect_rate_plot = gr.LinePlot(x="시간", y="불량률 (%)", title="불량률")
+
+        def update_dashboard(resolution_value):
             """대시보드 데이터 업데이트"""
             table_data, stats, total, normal, minor, severe = get_dashboard_data()
-            return table_data, total, normal, minor, severe
+            throughput, defect_rate = get_rollup_chart_data(resolution_value)
+            return table_data, total, normal, minor, severe, throughput, defect_rate
+
+        dashboard_outputs = [
+            results_table, total_count, normal_count, minor_count, severe_count,
+            throughput_plot, defect_rate_plot
+        ]
 
         # 새로고침 버튼 클릭 시
         refresh_btn.click(
             fn=update_dashboard,
-            inputs=[],
-            outputs=[results_table, total_count, normal_count, minor_count, severe_count]
+            inputs=[resolution],
+            outputs=dashboard_outputs
+        )
+
+        # 집계 단위 변경 시
+        resolution.change(
+            fn=update_dashboard,
+            inputs=[resolution],
+            outputs=dashboard_outputs
         )
 
         # 페이지 로드 시 자동 업데이트
         demo.load(
             fn=update_dashboard,
-            inputs=[],
-            outputs=[results_table, total_count, normal_count, minor_count, severe_count]
+            inputs=[resolution],
+            outputs=dashboard_outputs
         )
 
     return demo
@@ -203,19 +629,29 @@ if __name__ == "__main__":
     print(f"Model: {config.MODEL_NAME}")
     print(f"API Key: {config.API_KEY[:20]}..." if len(config.API_KEY) > 20 else "API Key: [설정되지 않음]")
     print(f"FastAPI 포트: {config.SERVER_PORT}")
-    print(f"Gradio 포트: {config.GRADIO_PORT}")
+    print(f"Gradio 포트: {config.GRADIO_PORT}" if not config.HEADLESS else "Gradio: [HEADLESS 모드, 실행 안 함]")
     print("="*70)
 
+    config.ensure_dirs()
+
+    # kill -USR2 <pid> 로 프로파일링 시작
+    profiler.install_signal_handler()
+
+    # 업로드 보존 기간 / 할당량 정리 (설정된 경우만)
+    storage.start_compactor()
+
     # 백그라운드 워커 시작 (3개씩 그룹 분석)
     worker_thread = threading.Thread(target=background_worker, daemon=True)
     worker_thread.start()
 
-    # Gradio 대시보드 시작
-    gradio_thread = threading.Thread(target=run_gradio, daemon=True)
-    gradio_thread.start()
+    # Gradio 대시보드 시작 (HEADLESS 모드에서는 건너뜀)
+    if not config.HEADLESS:
+        gradio_thread = threading.Thread(target=run_gradio, daemon=True)
+        gradio_thread.start()
 
     print(f"\n✓ FastAPI 서버: http://localhost:{config.SERVER_PORT}")
-    print(f"✓ Gradio 대시보드: http://localhost:{config.GRADIO_PORT}")
+    if not config.HEADLESS:
+        print(f"✓ Gradio 대시보드: http://localhost:{config.GRADIO_PORT}")
     print(f"✓ 백그라운드 워커: 실행 중 (3개씩 그룹 분석)\n")
 
     # FastAPI 서버 실행
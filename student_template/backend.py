@@ -0,0 +1,66 @@
+"""
+Vision API 동시 요청 슬롯
+
+GPU 서버가 동시에 처리할 수 있는 요청 수(VLM_MAX_CONCURRENCY)를 실시간 업로드(live)와
+재분석(backfill)이 나눠 씁니다.
+
+- live: 빈 슬롯이 있으면 바로 사용, 기다리는 live 요청이 있으면 backfill보다 먼저 받음
+- backfill: live 요청이 기다리지 않을 때만, 전체의 REANALYSIS_SHARE 비율까지만 사용
+"""
+import threading
+from contextlib import contextmanager
+
+import config
+
+
+LANES = ("live", "backfill")
+
+
+class BackendSlots:
+    """우선순위가 있는 세마포어"""
+
+    def __init__(self, total: int, backfill_share: float):
+        self.total = max(1, total)
+        self.backfill_limit = max(1, int(self.total * backfill_share)) if backfill_share > 0 else 0
+        self._cond = threading.Condition()
+        self._in_use = {lane: 0 for lane in LANES}
+        self._live_waiting = 0
+
+    def _can_acquire(self, lane: str) -> bool:
+        if sum(self._in_use.values()) >= self.total:
+            return False
+        if lane == "backfill":
+            return self._live_waiting == 0 and self._in_use["backfill"] < self.backfill_limit
+        return True
+
+    @contextmanager
+    def acquire(self, lane: str = "live"):
+        """슬롯 하나를 잡고 with 블록이 끝나면 반환"""
+        with self._cond:
+            if lane == "live":
+                self._live_waiting += 1
+                try:
+                    self._cond.wait_for(lambda: self._can_acquire(lane))
+                finally:
+                    self._live_waiting -= 1
+            else:
+                self._cond.wait_for(lambda: self._can_acquire(lane))
+            self._in_use[lane] += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_use[lane] -= 1
+                self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "total": self.total,
+                "backfill_limit": self.backfill_limit,
+                "in_use": dict(self._in_use),
+                "live_waiting": self._live_waiting,
+            }
+
+
+slots = BackendSlots(config.VLM_MAX_CONCURRENCY, config.REANALYSIS_SHARE)
@@ -0,0 +1,35 @@
+"""
+이미지 전처리 마이크로 벤치마크
+
+data/motor_checker의 실제 이미지로 models.resize_image / encode_image의
+이미지 한 장당 시간을 측정합니다.
+"""
+import statistics
+import time
+
+from common import median_ms, metric, sample_images
+
+
+def run(images: int = 20, repeat: int = 3) -> dict:
+    from models import encode_image, resize_image
+
+    paths = sample_images(images)
+
+    def per_image(function):
+        timings = []
+        for path in paths:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                function(path)
+                timings.append(time.perf_counter() - start)
+        return timings
+
+    resize = per_image(resize_image)
+    encode = per_image(encode_image)
+    sizes = [len(resize_image(path)) for path in paths]
+
+    return {
+        "images.resize_ms": median_ms(resize),
+        "images.encode_ms": median_ms(encode),
+        "images.resized_kb": metric(statistics.mean(sizes) / 1024, "KB"),
+    }
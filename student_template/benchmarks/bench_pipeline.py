@@ -0,0 +1,79 @@
+"""
+전체 파이프라인 처리량 벤치마크
+
+모의 Vision API(mock_vlm)를 띄우고 학생 서버의 업로드 → 큐 → 워커(3개씩 그룹)
+→ 결과 저장까지 돌려서 초당 처리 이미지 수와 업로드 → 결과 저장 지연시간을 측정합니다.
+"""
+import asyncio
+import socket
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from common import metric, percentile, sample_images, use_data_dir
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _upload(app, files: list, images: int) -> list:
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        names = []
+        for i in range(images):
+            name, content = files[i % len(files)]
+            response = await client.post("/upload", files={"file": (name, content, "image/jpeg")})
+            response.raise_for_status()
+            names.append(response.json()["filename"])
+        return names
+
+
+def run(images: int = 90, latency: str = "fixed:0.05", timeout: float = 300) -> dict:
+    import mock_vlm
+
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        use_data_dir(Path(tmp))
+        import config
+
+        port = _free_port()
+        server = mock_vlm.serve_in_thread(port, latency=latency)
+        config.API_BASE_URL = f"http://127.0.0.1:{port}/v1"
+        config.API_KEY = "benchmark"
+
+        import app
+        import result_index
+        import worker
+
+        worker.client = None
+        threading.Thread(target=worker.background_worker, name="bench-worker", daemon=True).start()
+
+        files = [(path.name, path.read_bytes()) for path in sample_images(12)]
+        start = time.perf_counter()
+        names = asyncio.run(_upload(app.app, files, images))
+
+        deadline = time.monotonic() + timeout
+        entries = []
+        for name in names:
+            while True:
+                entry = result_index.lookup(name)
+                if entry is not None and entry["status"] == "done":
+                    entries.append(entry)
+                    break
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"{timeout}초 안에 끝나지 않음 ({len(entries)}/{images})")
+                time.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        server.should_exit = True
+
+    latencies = [entry["latency_s"] for entry in entries if "latency_s" in entry]
+    return {
+        "pipeline.images_per_s": metric(images / elapsed, "img/s", "higher"),
+        "pipeline.latency_p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "pipeline.latency_p95_ms": metric(percentile(latencies, 95) * 1000, "ms"),
+    }
@@ -0,0 +1,103 @@
+"""
+시작 시간 벤치마크
+
+새 프로세스에서 `python -X importtime -c "import app"`을 여러 번 실행해
+app import 시간(누적)과 오래 걸린 모듈을 측정합니다.
+gradio / openai는 필요할 때 import하므로 `import app`에서 import되면 실패로 표시합니다.
+
+    python benchmarks/bench_startup.py --runs 5
+
+benchmarks/run.py에서는 run()의 결과가 기준값(baseline)과 비교됩니다.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+
+APP_DIR = Path(__file__).resolve().parent.parent
+LAZY_MODULES = ("gradio", "openai")
+
+
+def parse_importtime(stderr: str) -> dict:
+    """-X importtime 출력 → {모듈: (깊이, 누적 마이크로초)}"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        try:
+            cumulative = int(cumulative)
+        except ValueError:
+            continue  # 헤더 줄
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        modules[name.strip()] = (depth, cumulative)
+    return modules
+
+
+def measure_once() -> dict:
+    env = dict(os.environ)
+    env.update({
+        "HEADLESS": "true",
+        "API_KEY": env.get("API_KEY", "benchmark"),
+        "LOG_FILE": "",
+        "LOG_CONSOLE": "false",
+    })
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app"],
+        cwd=APP_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import app 실패:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def report(runs: int = 5) -> dict:
+    """
+    app import 시간 측정
+
+    Returns:
+        {"import_app_ms": 중앙값, "runs_ms": [...], "top_modules_ms": {...}, "eager_imports": [...]}
+    """
+    samples = [measure_once() for _ in range(runs)]
+    totals = [modules.get("app", (0, 0))[1] / 1000 for modules in samples]
+
+    # app이 직접 import한 모듈 중 오래 걸린 순
+    last = samples[-1]
+    direct = [(name, us) for name, (depth, us) in last.items() if depth == 1]
+    top = sorted(direct, key=lambda item: item[1], reverse=True)[:10]
+
+    return {
+        "import_app_ms": round(statistics.median(totals), 1),
+        "runs_ms": [round(t, 1) for t in totals],
+        "top_modules_ms": {name: round(us / 1000, 1) for name, us in top},
+        "eager_imports": [name for name in LAZY_MODULES if name in last],
+    }
+
+
+def run(runs: int = 5) -> dict:
+    """벤치마크 스위트 형식 결과"""
+    result = report(runs)
+    return {
+        "startup.import_app_ms": {"value": result["import_app_ms"], "unit": "ms", "better": "lower"},
+        "startup.eager_imports": {"value": len(result["eager_imports"]), "unit": "modules", "better": "lower"},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app import 시간 측정 (-X importtime)")
+    parser.add_argument("--runs", type=int, default=5, help="반복 횟수 (중앙값 사용)")
+    args = parser.parse_args()
+
+    result = report(args.runs)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if result["eager_imports"]:
+        print(f"import app에서 import되면 안 되는 모듈: {result['eager_imports']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+결과 저장소 벤치마크
+
+행 수가 다른 가상 results.json(그룹 1개 = 결과 1행)을 만들어
+load_results와 get_dashboard_data(대시보드 새로고침 1회) 시간을 측정합니다.
+"""
+import json
+import tempfile
+from pathlib import Path
+
+from common import measure, median_ms, metric, use_data_dir
+
+COLORS = ("초록색", "노란색", "빨간색")
+LEVELS = ("정상", "경미한 불량", "심각한 불량")
+
+
+def _group(i: int) -> dict:
+    minute, second = divmod(i % 3600, 60)
+    timestamp = f"2026-10-{1 + i // 86400 % 28:02d} {i // 3600 % 24:02d}:{minute:02d}:{second:02d}"
+    filename = f"20261001_000000_{i:07d}_image.jpg"
+    color = COLORS[i % 3]
+    return {
+        "group_id": i + 1,
+        "timestamp": timestamp,
+        "images": [
+            {"filename": filename, "has_sticker": True, "sticker_number": str(i % 100), "sticker_color": color},
+            {"filename": f"x{i}_1.jpg", "has_sticker": False, "sticker_number": None, "sticker_color": None},
+            {"filename": f"x{i}_2.jpg", "has_sticker": False, "sticker_number": None, "sticker_color": None},
+        ],
+        "sticker_info": {"filename": filename, "number": str(i % 100), "color": color},
+        "defect_level": LEVELS[i % 3],
+        "status": "정상",
+        "analysis_time": 1.5,
+    }
+
+
+def _result(i: int, group: dict) -> dict:
+    return {
+        "id": i + 1,
+        "timestamp": group["timestamp"],
+        "filename": group["sticker_info"]["filename"],
+        "group_id": group["group_id"],
+        "has_sticker": True,
+        "sticker_number": group["sticker_info"]["number"],
+        "sticker_color": group["sticker_info"]["color"],
+        "defect_level": group["defect_level"],
+    }
+
+
+def write_store(path: Path, rows: int):
+    """rows행짜리 results.json을 메모리에 다 올리지 않고 씀"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(f'{{"total_images": {rows * 3}, "groups": [')
+        for i in range(rows):
+            f.write(("," if i else "") + json.dumps(_group(i), ensure_ascii=False))
+        f.write('], "results": [')
+        for i in range(rows):
+            f.write(("," if i else "") + json.dumps(_result(i, _group(i)), ensure_ascii=False))
+        f.write("]}")
+
+
+def run(sizes=(10_000, 100_000, 1_000_000)) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="bench_store_") as tmp:
+        use_data_dir(Path(tmp))
+        import config
+        from models import load_results
+        from app import get_dashboard_data
+
+        for rows in sizes:
+            write_store(config.RESULTS_FILE, rows)
+            repeat = 5 if rows <= 10_000 else 3 if rows <= 100_000 else 1
+            label = f"{rows // 1_000_000}m" if rows >= 1_000_000 else f"{rows // 1000}k"
+            results[f"store.{label}.file_mb"] = metric(config.RESULTS_FILE.stat().st_size / 1e6, "MB")
+            results[f"store.{label}.load_results_ms"] = median_ms(measure(load_results, repeat))
+            results[f"store.{label}.dashboard_ms"] = median_ms(measure(get_dashboard_data, repeat))
+    return results
@@ -0,0 +1,54 @@
+"""
+/upload 처리량 벤치마크
+
+인프로세스 ASGI 클라이언트(httpx.ASGITransport)로 실제 이미지를 동시에 업로드해
+초당 요청 수와 요청 지연시간을 측정합니다. 워커는 돌리지 않습니다 (업로드 경로만).
+"""
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from common import metric, percentile, sample_images, use_data_dir
+
+
+async def _upload_all(app, files: list, requests: int, concurrency: int) -> list:
+    import httpx
+
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            name, content = files[i % len(files)]
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/upload", files={"file": (name, content, "image/jpeg")})
+                latencies.append(time.perf_counter() - start)
+                response.raise_for_status()
+
+        await asyncio.gather(*(one(i) for i in range(requests)))
+    return latencies
+
+
+def run(requests: int = 500, concurrency: int = 16) -> dict:
+    with tempfile.TemporaryDirectory(prefix="bench_upload_") as tmp:
+        use_data_dir(Path(tmp))
+        import app
+        from worker import image_queue
+
+        files = [(path.name, path.read_bytes()) for path in sample_images(10)]
+        asyncio.run(_upload_all(app.app, files[:1], concurrency, concurrency))  # 워밍업
+
+        start = time.perf_counter()
+        latencies = asyncio.run(_upload_all(app.app, files, requests, concurrency))
+        elapsed = time.perf_counter() - start
+
+        while not image_queue.empty():
+            image_queue.get_nowait()
+
+    return {
+        "upload.rps": metric(requests / elapsed, "req/s", "higher"),
+        "upload.p50_ms": metric(percentile(latencies, 50) * 1000, "ms"),
+        "upload.p95_ms": metric(percentile(latencies, 95) * 1000, "ms"),
+    }
@@ -0,0 +1,75 @@
+"""
+벤치마크 공용 도구
+
+- 학생 서버 모듈을 import할 수 있도록 sys.path 설정
+- 실제 data/를 건드리지 않도록 config의 데이터 경로를 임시 디렉토리로 교체
+- 결과 항목 형식: {"value": 숫자, "unit": "ms", "better": "lower" | "higher"}
+"""
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+APP_DIR = BENCH_DIR.parent
+REPO_DIR = APP_DIR.parent
+IMAGE_DIR = REPO_DIR / "data" / "motor_checker"
+
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+
+def use_data_dir(data_dir: Path):
+    """config의 모든 데이터 경로를 data_dir 아래로 바꿈 (다른 모듈 import 전에 호출)"""
+    import config
+
+    data_dir = Path(data_dir)
+    config.DATA_DIR = data_dir
+    config.UPLOAD_DIR = data_dir / "uploads"
+    config.RESULTS_FILE = data_dir / "results.json"
+    config.RESULTS_LOG_FILE = data_dir / "results.jsonl"
+    config.RESULTS_VERSIONS_FILE = data_dir / "results.versions.jsonl"
+    config.STORE_LOCK_FILE = data_dir / "results.lock"
+    config.GROUP_ID_FILE = data_dir / "group_id"
+    config.ROLLUPS_FILE = data_dir / "rollups.json"
+    config.ROLLUPS_LOG_FILE = data_dir / "rollups.jsonl"
+    config.TRACES_FILE = data_dir / "traces.jsonl"
+    config.PROFILE_DIR = data_dir / "profiles"
+    config.THUMBNAIL_DIR = data_dir / "thumbnails"
+    config.LOG_FILE = None
+    config.LOG_CONSOLE = False
+    config._dirs_ready = False
+
+
+def sample_images(limit: int = 20) -> list:
+    """벤치마크에 쓸 실제 이미지 (data/motor_checker)"""
+    images = sorted(IMAGE_DIR.glob("*.jpg"))[:limit]
+    if not images:
+        raise FileNotFoundError(f"이미지가 없습니다: {IMAGE_DIR}")
+    return images
+
+
+def measure(function, repeat: int = 5) -> list:
+    """function()을 repeat번 실행한 시간 목록 (초)"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def metric(value: float, unit: str, better: str = "lower") -> dict:
+    return {"value": round(value, 3), "unit": unit, "better": better}
+
+
+def median_ms(timings: list) -> dict:
+    return metric(statistics.median(timings) * 1000, "ms")
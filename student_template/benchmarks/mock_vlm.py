@@ -0,0 +1,267 @@
+"""
+OpenAI 호환 Vision API 모의 서버
+
+GPU 서버(vLLM) 없이 학생 서버 전체 파이프라인을 부하 테스트하기 위한 대역입니다.
+`/v1/chat/completions`에 이미지가 들어오면 정해진 지연시간 분포만큼 기다린 뒤
+항상 같은 답(JSON)과 토큰 사용량을 돌려줍니다.
+
+- 답: 라벨 CSV(runpod/labels.csv 형식)가 있으면 그 라벨, 없으면 이미지 해시로 결정
+- 지연시간: fixed:0.5 / uniform:0.2,1.5 / normal:0.8,0.2 / lognormal:-0.5,0.4
+- 오류: --error-rate 비율만큼 500, --timeout-rate 비율만큼 --hang-seconds 동안 응답 안 함
+  (그때까지 클라이언트가 끊지 않으면 504, 늦게라도 성공 응답은 보내지 않음)
+- 동시 처리: --max-concurrency 개까지만 동시에 "추론" (나머지는 대기, GPU 배치 슬롯 흉내)
+
+    python benchmarks/mock_vlm.py --port 9000 --latency lognormal:-0.5,0.4 \\
+        --labels ../runpod/labels.csv --image-root ..
+    # 학생 서버 .env: API_BASE_URL=http://localhost:9000/v1
+
+라벨 매칭: 워커는 원본을 resize_image()로 줄여서 보내므로, 시작할 때 라벨 CSV의
+이미지마다 같은 축소본을 만들어 sha256 → 라벨 표를 만들어 둡니다.
+"""
+import argparse
+import asyncio
+import base64
+import contextlib
+import csv
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+
+APP_DIR = Path(__file__).resolve().parent.parent
+if str(APP_DIR) not in sys.path:
+    sys.path.insert(0, str(APP_DIR))
+
+
+COLORS = ("초록색", "노란색", "빨간색")
+_DATA_URL = re.compile(r"^data:[^;]+;base64,(.*)$", re.S)
+
+
+def parse_latency(spec: str):
+    """
+    지연시간 분포 문자열 → 샘플 함수 (초)
+
+    Raises:
+        ValueError: 잘못된 형식
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",")] if params else []
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1])
+    if kind == "normal" and len(values) == 2:
+        return lambda rng: max(0.0, rng.gauss(values[0], values[1]))
+    if kind == "lognormal" and len(values) == 2:
+        return lambda rng: rng.lognormvariate(values[0], values[1])
+    raise ValueError(f"지원하지 않는 지연시간 분포: {spec}")
+
+
+def _to_bool(value: str) -> bool:
+    return (value or "").strip().lower() in {"1", "true", "t", "yes", "y", "o"}
+
+
+def _norm_color(value: str):
+    value = (value or "").strip()
+    if not value:
+        return None
+    for color in COLORS:
+        if value[0] == color[0]:
+            return color
+    return {"green": "초록색", "yellow": "노란색", "red": "빨간색"}.get(value.lower(), value)
+
+
+def load_labels(labels_csv: Path, image_root: Path) -> dict:
+    """라벨 CSV → {축소본 sha256: 답}"""
+    from models import resize_image
+
+    labels = {}
+    with open(labels_csv, "r", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            image = (row.get("image") or "").strip()
+            if not image:
+                continue
+            path = Path(image) if Path(image).is_absolute() else image_root / image
+            if not path.exists():
+                continue
+            has_sticker = _to_bool(row.get("has_sticker"))
+            number = "".join(ch for ch in (row.get("number") or "") if ch.isdigit()) or None
+            digest = hashlib.sha256(resize_image(path)).hexdigest()
+            labels[digest] = {
+                "has_sticker": has_sticker,
+                "number": number if has_sticker else None,
+                "color": _norm_color(row.get("color")) if has_sticker else None,
+            }
+    return labels
+
+
+def _hash_answer(digest: str) -> dict:
+    """라벨이 없는 이미지: 해시로 정해지는 답 (약 1/3은 스티커 있음)"""
+    value = int(digest[:8], 16)
+    if value % 3:
+        return {"has_sticker": False, "number": None, "color": None}
+    return {"has_sticker": True, "number": str(value % 100), "color": COLORS[(value // 3) % 3]}
+
+
+def _image_payloads(messages: list):
+    for message in messages:
+        content = message.get("content")
+        if not isinstance(content, list):
+            continue
+        for part in content:
+            if part.get("type") == "image_url":
+                match = _DATA_URL.match((part.get("image_url") or {}).get("url", ""))
+                if match:
+                    yield base64.b64decode(match.group(1))
+
+
+def _text_length(messages: list) -> int:
+    length = 0
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            length += len(content)
+        elif isinstance(content, list):
+            length += sum(len(part.get("text", "")) for part in content if part.get("type") == "text")
+    return length
+
+
+def create_app(latency: str = "fixed:0.5", error_rate: float = 0.0, timeout_rate: float = 0.0,
+               hang_seconds: float = 120.0, max_concurrency: int = 0, labels: dict = None,
+               seed: int = 0) -> FastAPI:
+    """모의 서버 FastAPI 앱 생성"""
+    sample_latency = parse_latency(latency)
+    labels = labels or {}
+    rng = random.Random(seed)
+    stats = {"requests": 0, "errors": 0, "timeouts": 0, "labeled": 0, "inflight": 0, "max_inflight": 0}
+    app = FastAPI(title="Mock Vision API")
+    app.state.stats = stats
+    semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency > 0 else None
+
+    @app.get("/v1/models")
+    def list_models():
+        return {"object": "list", "data": [{"id": "mock-vlm", "object": "model", "owned_by": "mock"}]}
+
+    @app.get("/mock/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        messages = body.get("messages", [])
+        images = list(_image_payloads(messages))
+        if not images:
+            raise HTTPException(status_code=400, detail="image_url(data URL)이 없습니다.")
+
+        stats["requests"] += 1
+        roll = rng.random()
+        delay = sample_latency(rng)
+
+        if roll < timeout_rate:
+            stats["timeouts"] += 1
+            await asyncio.sleep(hang_seconds)
+            raise HTTPException(status_code=504, detail="mock: injected timeout")
+        if roll < timeout_rate + error_rate:
+            stats["errors"] += 1
+            await asyncio.sleep(delay)
+            raise HTTPException(status_code=500, detail="mock: injected error")
+
+        # 슬롯을 얻은 요청만 "추론 중"으로 셈 (대기 중인 요청은 제외)
+        async with semaphore if semaphore is not None else contextlib.nullcontext():
+            stats["inflight"] += 1
+            stats["max_inflight"] = max(stats["max_inflight"], stats["inflight"])
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                stats["inflight"] -= 1
+
+        digest = hashlib.sha256(images[0]).hexdigest()
+        answer = labels.get(digest)
+        if answer is not None:
+            stats["labeled"] += 1
+        else:
+            answer = _hash_answer(digest)
+        content = json.dumps(answer, ensure_ascii=False)
+
+        # 대략적인 토큰 수: 텍스트 4자당 1토큰 + 이미지 768px 타일당 170토큰 (JPEG 크기로 근사)
+        image_tokens = sum(85 + 170 * max(1, len(image) // 100_000) for image in images)
+        prompt_tokens = _text_length(messages) // 4 + image_tokens
+        completion_tokens = max(1, len(content) // 4)
+
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock-vlm"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
+
+    return app
+
+
+def serve_in_thread(port: int, **options) -> uvicorn.Server:
+    """
+    모의 서버를 백그라운드 스레드에서 실행 (벤치마크에서 사용)
+
+    Returns:
+        uvicorn 서버 (종료: server.should_exit = True)
+    """
+    server = uvicorn.Server(uvicorn.Config(create_app(**options), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, name="mock-vlm", daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI 호환 Vision API 모의 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--latency", default="fixed:0.5", help="fixed:S / uniform:A,B / normal:M,SD / lognormal:MU,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500 응답 비율 (0~1)")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="응답하지 않는 요청 비율 (0~1)")
+    parser.add_argument("--hang-seconds", type=float, default=120.0, help="timeout 요청이 멈춰 있는 시간 (지나면 504)")
+    parser.add_argument("--max-concurrency", type=int, default=0, help="동시에 처리할 요청 수 (0: 제한 없음)")
+    parser.add_argument("--labels", default=None, help="라벨 CSV (image,has_sticker,color,number)")
+    parser.add_argument("--image-root", default=str(APP_DIR.parent), help="라벨 CSV의 상대 경로 기준 디렉토리")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    labels = {}
+    if args.labels:
+        labels = load_labels(Path(args.labels), Path(args.image_root))
+        print(f"라벨 {len(labels)}개 로드: {args.labels}")
+
+    app = create_app(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        hang_seconds=args.hang_seconds,
+        max_concurrency=args.max_concurrency,
+        labels=labels,
+        seed=args.seed,
+    )
+    print(f"Mock Vision API: http://{args.host}:{args.port}/v1 (latency={args.latency})")
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""
+벤치마크 스위트 실행 + 기준값 비교
+
+    python benchmarks/run.py                      # 전체 실행, baseline.json과 비교
+    python benchmarks/run.py --quick              # 작은 크기로 빠르게
+    python benchmarks/run.py --only images,upload
+    python benchmarks/run.py --update-baseline    # 현재 결과를 기준값으로 저장
+
+벤치마크마다 별도 프로세스에서 실행하고(모듈 상태/메모리가 섞이지 않도록),
+결과는 --out(기본 benchmarks/results/latest.json)에 저장합니다.
+기준값보다 --threshold(기본 20%) 이상 나빠진 항목이 있으면 종료 코드 1.
+
+| 이름     | 내용                                                   |
+|----------|--------------------------------------------------------|
+| startup  | import app 시간 (-X importtime)                        |
+| images   | resize_image / encode_image (data/motor_checker)       |
+| store    | load_results / get_dashboard_data (10k/100k/1M행)      |
+| upload   | /upload 초당 요청 수 (인프로세스 ASGI)                  |
+| pipeline | 업로드 → 워커 → 저장 처리량 (모의 Vision API)           |
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+BENCHMARKS = ("startup", "images", "store", "upload", "pipeline")
+
+FULL_OPTIONS = {
+    "startup": {"runs": 5},
+    "images": {"images": 20, "repeat": 3},
+    "store": {"sizes": [10_000, 100_000, 1_000_000]},
+    "upload": {"requests": 500, "concurrency": 16},
+    "pipeline": {"images": 90},
+}
+QUICK_OPTIONS = {
+    "startup": {"runs": 2},
+    "images": {"images": 5, "repeat": 1},
+    "store": {"sizes": [10_000]},
+    "upload": {"requests": 100, "concurrency": 8},
+    "pipeline": {"images": 30},
+}
+
+
+def run_child(name: str, options: dict):
+    """(자식 프로세스) 벤치마크 하나를 실행하고 결과 JSON을 마지막 줄에 출력"""
+    sys.path.insert(0, str(BENCH_DIR))
+    module = __import__(f"bench_{name}")
+    result = module.run(**options)
+    sys.stdout.write("\n" + json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def run_benchmark(name: str, options: dict) -> dict:
+    proc = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--child", name, "--options", json.dumps(options)],
+        capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{name} 벤치마크 실패:\n{proc.stderr[-3000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """
+    기준값과 비교
+
+    Returns:
+        [(이름, 기준값, 현재값, 변화율, 회귀 여부)]
+    """
+    rows = []
+    for name, entry in current.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        before, after = base["value"], entry["value"]
+        change = (after - before) / before if before else (0.0 if after == before else float("inf"))
+        if entry["better"] == "higher":
+            regressed = after < before * (1 - threshold)
+        else:
+            regressed = after > before * (1 + threshold)
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="학생 서버 벤치마크 스위트")
+    parser.add_argument("--only", default=None, help=f"실행할 벤치마크 (쉼표로 구분: {','.join(BENCHMARKS)})")
+    parser.add_argument("--quick", action="store_true", help="작은 크기로 빠르게 실행")
+    parser.add_argument("--baseline", default=str(BENCH_DIR / "baseline.json"))
+    parser.add_argument("--out", default=str(BENCH_DIR / "results" / "latest.json"))
+    parser.add_argument("--threshold", type=float, default=0.2, help="회귀로 판단할 변화율 (기본 0.2 = 20%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="결과를 기준값으로 저장")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--options", default="{}", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, json.loads(args.options))
+        return
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"알 수 없는 벤치마크: {unknown}")
+    options = QUICK_OPTIONS if args.quick else FULL_OPTIONS
+
+    results = {}
+    for name in names:
+        print(f"▶ {name} ...", flush=True)
+        results.update(run_benchmark(name, options[name]))
+
+    document = {
+        "meta": {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    out = Path(args.out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(document, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(f"\n결과 저장: {out}")
+
+    baseline_path = Path(args.baseline)
+    if args.update_baseline:
+        previous = {}
+        if baseline_path.exists():
+            previous = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+        baseline = {"meta": document["meta"], "results": {**previous, **results}}
+        baseline_path.write_text(json.dumps(baseline, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"기준값 갱신: {baseline_path}")
+        return
+
+    if not baseline_path.exists():
+        for name, entry in results.items():
+            print(f"  {name:<32} {entry['value']:>12} {entry['unit']}")
+        print("기준값 파일이 없어 비교하지 않음 (--update-baseline으로 생성)")
+        return
+
+    baseline = json.loads(baseline_path.read_text(encoding="utf-8"))["results"]
+    rows = compare(results, baseline, args.threshold)
+    print(f"\n{'항목':<32} {'기준값':>12} {'현재값':>12} {'변화':>8}")
+    for name, before, after, change, regressed in rows:
+        mark = "  ✗ 회귀" if regressed else ""
+        print(f"{name:<32} {before:>12} {after:>12} {change:>+8.1%}{mark}")
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n{len(regressions)}개 항목이 기준값보다 {args.threshold:.0%} 이상 나빠졌습니다: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
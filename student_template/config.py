@@ -11,19 +11,108 @@ MODEL_NAME = os.getenv("MODEL_NAME", "gpt-4o")
 SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
 GRADIO_PORT = int(os.getenv("GRADIO_PORT", "7860"))
 
+# API만 실행 (Gradio 대시보드를 import하지 않아 시작이 빠름)
+HEADLESS = os.getenv("HEADLESS", "false").lower() == "true"
+
 BASE_DIR = Path(__file__).parent
 DATA_DIR = BASE_DIR / "data"
 UPLOAD_DIR = DATA_DIR / "uploads"
 RESULTS_FILE = DATA_DIR / "results.json"
+RESULTS_LOG_FILE = DATA_DIR / "results.jsonl"
+# 재분석 버전 추가 전용 로그 (그룹 ID + 버전, /export jsonl에서 그룹에 합침)
+RESULTS_VERSIONS_FILE = DATA_DIR / "results.versions.jsonl"
+# 결과 저장소 프로세스 간 잠금, 마지막으로 발급한 그룹 ID
+STORE_LOCK_FILE = DATA_DIR / "results.lock"
+GROUP_ID_FILE = DATA_DIR / "group_id"
+ROLLUPS_FILE = DATA_DIR / "rollups.json"
+ROLLUPS_LOG_FILE = DATA_DIR / "rollups.jsonl"
+TRACES_FILE = DATA_DIR / "traces.jsonl"
+SHADOW_FILE = DATA_DIR / "shadow.jsonl"
+
+PROFILE_DIR = DATA_DIR / "profiles"
+THUMBNAIL_DIR = DATA_DIR / "thumbnails"
+
+# 업로드 원본 보존 (0이면 사용 안 함)
+# - UPLOAD_RETENTION_DAYS가 지난 원본은 recompress(분석용 축소본으로 교체) 또는 delete
+# - UPLOAD_QUOTA_MB를 넘으면 오래된 날짜부터 축소 → 삭제
+UPLOAD_RETENTION_DAYS = int(os.getenv("UPLOAD_RETENTION_DAYS", "0"))
+UPLOAD_RETENTION_MODE = os.getenv("UPLOAD_RETENTION_MODE", "recompress")
+UPLOAD_QUOTA_MB = int(os.getenv("UPLOAD_QUOTA_MB", "0"))
+UPLOAD_COMPACT_INTERVAL = int(os.getenv("UPLOAD_COMPACT_INTERVAL", "3600"))
+
+# 썸네일 메모리 캐시 크기, 대시보드에서 썸네일을 불러올 API 주소
+THUMBNAIL_CACHE_MB = int(os.getenv("THUMBNAIL_CACHE_MB", "32"))
+PUBLIC_API_URL = os.getenv("PUBLIC_API_URL", f"http://localhost:{SERVER_PORT}").rstrip("/")
+
+# GET /results/{filename} 인덱스에 보관할 최근 이미지 수, 최대 대기 시간 (초)
+# 분석 대기(pending) 항목도 최대 RESULT_INDEX_MAX개, RESULT_PENDING_TTL초까지만 보관
+RESULT_INDEX_MAX = int(os.getenv("RESULT_INDEX_MAX", "100000"))
+RESULT_WAIT_MAX = float(os.getenv("RESULT_WAIT_MAX", "60"))
+RESULT_PENDING_TTL = float(os.getenv("RESULT_PENDING_TTL", "3600"))
+
+# Vision API 동시 요청 수 (GPU 서버 처리 용량), 그중 재분석이 쓸 수 있는 비율
+VLM_MAX_CONCURRENCY = int(os.getenv("VLM_MAX_CONCURRENCY", "16"))
+REANALYSIS_SHARE = float(os.getenv("REANALYSIS_SHARE", "0.25"))
+REANALYSIS_WORKERS = int(os.getenv("REANALYSIS_WORKERS", "4"))
+
+# 섀도 모델 비교 (SHADOW_API_BASE_URL과 SHADOW_SAMPLE_RATE > 0일 때만 동작)
+# - 분석이 끝난 이미지 중 SHADOW_SAMPLE_RATE 비율을 후보 모델에도 보내 결과를 비교
+# - 동시 요청 SHADOW_CONCURRENCY개, 대기 SHADOW_QUEUE_MAX개를 넘으면 버림
+SHADOW_API_BASE_URL = os.getenv("SHADOW_API_BASE_URL", "")
+SHADOW_API_KEY = os.getenv("SHADOW_API_KEY", API_KEY)
+SHADOW_MODEL_NAME = os.getenv("SHADOW_MODEL_NAME", MODEL_NAME)
+SHADOW_SAMPLE_RATE = float(os.getenv("SHADOW_SAMPLE_RATE", "0"))
+SHADOW_CONCURRENCY = int(os.getenv("SHADOW_CONCURRENCY", "2"))
+SHADOW_QUEUE_MAX = int(os.getenv("SHADOW_QUEUE_MAX", "100"))
+SHADOW_TIMEOUT = float(os.getenv("SHADOW_TIMEOUT", "30"))
+
+# 로깅 (JSON Lines 파일 + 콘솔, 파일은 LOG_MAX_BYTES마다 회전)
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+_log_file = os.getenv("LOG_FILE", str(DATA_DIR / "logs" / "app.log"))
+LOG_FILE = Path(_log_file) if _log_file else None
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+LOG_BACKUP_COUNT = int(os.getenv("LOG_BACKUP_COUNT", "5"))
+LOG_CONSOLE = os.getenv("LOG_CONSOLE", "true").lower() == "true"
+# 이벤트별 샘플링 비율 (예: "upload.done=0.01,worker.image_received=0.1")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+
+# 관리자 엔드포인트 토큰 (비어 있으면 로컬호스트 요청만 허용)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# 샘플링 프로파일러 (SIGUSR2 / POST /admin/profile)
+PROFILE_SECONDS = float(os.getenv("PROFILE_SECONDS", "30"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))
+
+# 이미지별 trace 로그 기록 여부
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "true").lower() == "true"
+
+# 시계열 롤업 보존 기간 (일 단위 버킷은 계속 보존)
+ROLLUP_MINUTE_RETENTION_HOURS = int(os.getenv("ROLLUP_MINUTE_RETENTION_HOURS", "48"))
+ROLLUP_HOUR_RETENTION_DAYS = int(os.getenv("ROLLUP_HOUR_RETENTION_DAYS", "90"))
+# rollups.jsonl(커밋별 증분)이 이 크기를 넘으면 rollups.json에 합침
+ROLLUP_COMPACT_BYTES = int(os.getenv("ROLLUP_COMPACT_BYTES", str(4 * 1024 * 1024)))
+
+# 멀티 프로세스 실행 시 메트릭 스냅샷을 공유할 디렉토리 (지정하지 않으면 단일 프로세스)
+METRICS_MULTIPROC_DIR = Path(os.environ["METRICS_MULTIPROC_DIR"]) if os.getenv("METRICS_MULTIPROC_DIR") else None
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))
+
+_dirs_ready = False
+
+
+def ensure_dirs():
+    """데이터 디렉토리와 빈 results.json 생성 (처음 한 번만, import 시에는 만들지 않음)"""
+    global _dirs_ready
+    if _dirs_ready:
+        return
+    DATA_DIR.mkdir(exist_ok=True)
+    UPLOAD_DIR.mkdir(exist_ok=True)
 
-DATA_DIR.mkdir(exist_ok=True)
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-if not RESULTS_FILE.exists():
-    import json
-    with open(RESULTS_FILE, "w", encoding="utf-8") as f:
-        json.dump({
-            "total_images": 0,
-            "groups": [],
-            "results": []
-        }, f, ensure_ascii=False, indent=2)
+    if not RESULTS_FILE.exists():
+        import json
+        with open(RESULTS_FILE, "w", encoding="utf-8") as f:
+            json.dump({
+                "total_images": 0,
+                "groups": [],
+                "results": []
+            }, f, ensure_ascii=False, indent=2)
+    _dirs_ready = True
@@ -0,0 +1,246 @@
+"""
+결과 이력 내보내기
+
+그룹 로그(data/results.jsonl)를 한 줄씩 읽어 CSV / JSONL / Parquet 바이트 청크로
+변환합니다. JSONL은 요청하면(versions) 재분석 버전 로그(data/results.versions.jsonl)의
+버전을 그룹의 "versions"에 합쳐서 내보냅니다. 전체 결과를 메모리에 올리지 않고, 읽는 동안 file_lock을 잡지
+않으므로 수백만 행을 내보내도 워커의 결과 저장을 막지 않습니다.
+"""
+import csv
+import hashlib
+import io
+import json
+import zlib
+
+import log
+from models import group_log_stat, iter_group_log, iter_version_log, timestamp_in_range, version_log_stat
+
+
+logger = log.get_logger("export")
+
+FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+COLUMNS = [
+    "group_id", "timestamp", "status", "defect_level",
+    "sticker_filename", "sticker_number", "sticker_color",
+    "images", "error_images", "analysis_time",
+]
+
+CHUNK_ROWS = 1000
+PARQUET_ROW_GROUP = 10000
+
+
+def _iter_groups(since: str = None, until: str = None, end: int = None):
+    for group in iter_group_log(end):
+        if timestamp_in_range(group.get("timestamp", ""), since, until):
+            yield group
+
+
+def _load_versions(end: int = None) -> dict:
+    """그룹 ID → 재분석 버전 목록 (재분석한 그룹만 메모리에 올림)"""
+    versions = {}
+    for record in iter_version_log(end):
+        versions.setdefault(record.pop("group_id", None), []).append(record)
+    return versions
+
+
+def _merge_versions(groups, versions: dict):
+    for group in groups:
+        extra = versions.get(group.get("group_id"))
+        if extra:
+            # results.json에서 만든 그룹 로그에는 버전이 이미 들어 있을 수 있음
+            known = {version.get("version") for version in group.get("versions", [])}
+            group["versions"] = group.get("versions", []) + [v for v in extra if v.get("version") not in known]
+        yield group
+
+
+def _flat_row(group: dict) -> dict:
+    sticker = group.get("sticker_info") or {}
+    images = group.get("images", [])
+    return {
+        "group_id": group.get("group_id"),
+        "timestamp": group.get("timestamp"),
+        "status": group.get("status"),
+        "defect_level": group.get("defect_level"),
+        "sticker_filename": sticker.get("filename"),
+        "sticker_number": sticker.get("number"),
+        "sticker_color": sticker.get("color"),
+        "images": len(images),
+        "error_images": sum(1 for image in images if "error" in image),
+        "analysis_time": group.get("analysis_time"),
+    }
+
+
+def _csv_chunks(groups):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=COLUMNS)
+    writer.writeheader()
+    rows = 0
+    for group in groups:
+        writer.writerow(_flat_row(group))
+        rows += 1
+        if rows % CHUNK_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _jsonl_chunks(groups):
+    lines = []
+    for group in groups:
+        lines.append(json.dumps(group, ensure_ascii=False, separators=(",", ":")))
+        if len(lines) >= CHUNK_ROWS:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """ParquetWriter가 쓴 바이트를 모아 두었다가 청크로 꺼내는 출력 대상"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_chunks(groups):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ("group_id", pa.int64()),
+        ("timestamp", pa.string()),
+        ("status", pa.string()),
+        ("defect_level", pa.string()),
+        ("sticker_filename", pa.string()),
+        ("sticker_number", pa.string()),
+        ("sticker_color", pa.string()),
+        ("images", pa.int32()),
+        ("error_images", pa.int32()),
+        ("analysis_time", pa.float64()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="snappy")
+
+    def write_rows(rows):
+        writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+
+    rows = []
+    for group in groups:
+        row = _flat_row(group)
+        if row["sticker_number"] is not None:
+            row["sticker_number"] = str(row["sticker_number"])
+        rows.append(row)
+        if len(rows) >= PARQUET_ROW_GROUP:
+            write_rows(rows)
+            rows = []
+            yield sink.drain()
+    if rows:
+        write_rows(rows)
+    writer.close()
+    yield sink.drain()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def check_format(fmt: str, versions: bool = False):
+    """
+    내보내기 형식 확인
+
+    Raises:
+        ValueError: 지원하지 않는 형식, parquet인데 pyarrow가 없음, jsonl이 아닌데 versions 요청
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt} (csv/jsonl/parquet)")
+    if versions and fmt != "jsonl":
+        raise ValueError("재분석 버전(versions)은 jsonl 내보내기에만 포함할 수 있습니다.")
+    if fmt == "parquet":
+        try:
+            import pyarrow.parquet  # noqa: F401
+        except ImportError:
+            raise ValueError("parquet 내보내기에는 pyarrow가 필요합니다 (pip install pyarrow)")
+
+
+def snapshot(fmt: str, since: str = None, until: str = None, compress: bool = False, versions: bool = False):
+    """
+    현재 로그 기준 내보내기 ETag와 읽을 끝 위치
+
+    태그는 그룹 로그(versions면 버전 로그도)의 (수정 시각, 크기)와 요청 조건으로 만들고,
+    stream(limits=...)은 그 크기까지만 읽으므로 본문이 태그와 항상 일치합니다.
+    내보내는 도중 워커가 추가한 그룹은 이번 내보내기에 섞이지 않고 다음 요청에 포함되며,
+    버전을 요청하지 않은 내보내기의 태그는 재분석으로 바뀌지 않습니다.
+
+    Returns:
+        (ETag, {"groups": 그룹 로그 크기, "versions": 버전 로그 크기})
+    """
+    stats = {"groups": group_log_stat()}
+    if versions:
+        stats["versions"] = version_log_stat()
+    query = json.dumps([fmt, since, until, compress, versions])
+    digest = hashlib.sha1(query.encode("utf-8")).hexdigest()[:12]
+    version = "-".join(f"{stat.st_mtime_ns:x}.{stat.st_size:x}" for stat in stats.values())
+    return f'"{version}-{digest}"', {name: stat.st_size for name, stat in stats.items()}
+
+
+def stream(fmt: str, since: str = None, until: str = None, compress: bool = False, versions: bool = False,
+           limits: dict = None):
+    """
+    결과 이력을 바이트 청크로 내보내는 제너레이터
+
+    Args:
+        fmt: csv / jsonl / parquet
+        since: 시작 시각 (포함, 예: "2026-10-18 09:00")
+        until: 끝 시각 (포함, 앞부분만 비교)
+        compress: gzip 압축 여부
+        versions: 재분석 버전을 그룹의 "versions"에 합침 (jsonl만)
+        limits: 로그를 이 바이트 위치까지만 읽음 (snapshot()의 두 번째 값)
+    """
+    limits = limits or {}
+    groups = _iter_groups(since, until, limits.get("groups"))
+    if versions:
+        groups = _merge_versions(groups, _load_versions(limits.get("versions")))
+    if fmt == "csv":
+        chunks = _csv_chunks(groups)
+    elif fmt == "jsonl":
+        chunks = _jsonl_chunks(groups)
+    else:
+        chunks = _parquet_chunks(groups)
+
+    if compress:
+        chunks = _gzip(chunks)
+
+    total = 0
+    for chunk in chunks:
+        total += len(chunk)
+        yield chunk
+    logger.info("export.done", format=fmt, since=since, until=until, gzip=compress, bytes=total)
@@ -0,0 +1,158 @@
+"""
+비동기 구조화 로깅
+
+print 대신 이벤트 이름 + 필드로 로그를 남깁니다.
+
+- 호출한 스레드는 레코드를 큐에 넣기만 하고, 포맷팅과 파일/콘솔 쓰기는
+  별도 리스너 스레드가 처리합니다 (업로드 경로에서 stdout을 기다리지 않음)
+- 파일에는 JSON Lines로 기록하고 LOG_MAX_BYTES마다 회전합니다
+- 레벨이 꺼진 이벤트는 레코드를 만들기 전에 버려지고,
+  LOG_SAMPLE_RATES로 이벤트별 샘플링 비율을 줄 수 있습니다
+
+- import나 get_logger만으로는 아무것도 만들지 않고, 서버 시작(app lifespan) 또는
+  첫 로그를 남길 때 setup()이 로그 디렉토리와 리스너 스레드를 만듭니다
+
+사용 예:
+    logger = log.get_logger("worker")
+    logger.info("group.done", group_id=3, defect_level="정상")
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import sys
+import threading
+from datetime import datetime, timezone
+
+import config
+
+
+_setup_lock = threading.Lock()
+_listener = None
+_sample_rates = {}
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """같은 프로세스 안의 큐이므로 포맷팅을 리스너 스레드로 미룸"""
+
+    def prepare(self, record):
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 JSON 객체 하나"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.msg,
+            "thread": record.threadName,
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """콘솔용 한 줄 형식: 시각 레벨 [로거] 이벤트 key=value ..."""
+
+    def format(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in getattr(record, "fields", {}).items())
+        line = f"{self.formatTime(record, '%H:%M:%S')} {record.levelname:<7} [{record.name}] {record.msg} {fields}".rstrip()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def _parse_sample_rates(value: str) -> dict:
+    rates = {}
+    for item in value.split(","):
+        if "=" not in item:
+            continue
+        event, rate = item.split("=", 1)
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+def setup():
+    """큐 핸들러와 리스너 스레드 구성 (여러 번 호출해도 한 번만 적용)"""
+    global _listener, _sample_rates
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        _sample_rates = _parse_sample_rates(config.LOG_SAMPLE_RATES)
+
+        handlers = []
+        if config.LOG_FILE is not None:
+            config.LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
+            file_handler = logging.handlers.RotatingFileHandler(
+                config.LOG_FILE,
+                maxBytes=config.LOG_MAX_BYTES,
+                backupCount=config.LOG_BACKUP_COUNT,
+                encoding="utf-8"
+            )
+            file_handler.setFormatter(JsonFormatter())
+            handlers.append(file_handler)
+
+        if config.LOG_CONSOLE:
+            console_handler = logging.StreamHandler(sys.stdout)
+            console_handler.setFormatter(ConsoleFormatter())
+            handlers.append(console_handler)
+
+        log_queue = queue.SimpleQueue()
+        root = logging.getLogger("motorchecker")
+        root.setLevel(config.LOG_LEVEL)
+        root.propagate = False
+        root.addHandler(_QueueHandler(log_queue))
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+class EventLogger:
+    """이벤트 이름과 필드를 받는 얇은 로거 래퍼"""
+
+    def __init__(self, logger: logging.Logger):
+        self._logger = logger
+
+    def _log(self, level: int, event: str, exc_info, fields: dict):
+        if _listener is None:
+            setup()
+        if not self._logger.isEnabledFor(level):
+            return
+        rate = _sample_rates.get(event)
+        if rate is not None:
+            if random.random() >= rate:
+                return
+            fields["sample_rate"] = rate
+        if exc_info is True:
+            exc_info = sys.exc_info()
+        # findCaller(스택 탐색)를 건너뛰고 레코드를 직접 만듦
+        record = self._logger.makeRecord(
+            self._logger.name, level, "", 0, event, (), exc_info, extra={"fields": fields}
+        )
+        self._logger.handle(record)
+
+    def debug(self, event: str, **fields):
+        self._log(logging.DEBUG, event, None, fields)
+
+    def info(self, event: str, **fields):
+        self._log(logging.INFO, event, None, fields)
+
+    def warning(self, event: str, exc_info=None, **fields):
+        self._log(logging.WARNING, event, exc_info, fields)
+
+    def error(self, event: str, exc_info=None, **fields):
+        self._log(logging.ERROR, event, exc_info, fields)
+
+
+def get_logger(name: str) -> EventLogger:
+    """motorchecker.<name> 로거 (로깅 구성은 첫 로그를 남길 때)"""
+    return EventLogger(logging.getLogger(f"motorchecker.{name}"))
@@ -0,0 +1,276 @@
+"""
+Prometheus 텍스트 형식 메트릭
+
+업로드 → 전처리 → Vision API → JSON 파싱 → 결과 저장까지의 카운터, 게이지,
+히스토그램을 메모리에 기록하고 /metrics 엔드포인트에서 내보냅니다.
+
+기록은 락 하나와 딕셔너리 갱신뿐이라 업로드 경로에서 써도 부담이 없습니다.
+여러 프로세스로 실행할 때는 METRICS_MULTIPROC_DIR을 지정하면 프로세스마다
+주기적으로 스냅샷 파일을 쓰고, /metrics가 모든 프로세스의 값을 합쳐서 보여줍니다.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import config
+import log
+
+
+# 초 단위 지연시간 기본 버킷
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_registry = []
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key, extra: str = "") -> str:
+    parts = []
+    for name, value in key:
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str):
+        self.name = f"motorchecker_{name}"
+        self.help = help_text
+        self._lock = threading.Lock()
+        self._values = {}
+        _registry.append(self)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """현재 값 게이지 (값 또는 조회 함수)"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str):
+        super().__init__(name, help_text)
+        self._function = None
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        """내보낼 때마다 function()을 호출해 값을 구함 (예: 큐 크기)"""
+        self._function = function
+
+    @contextmanager
+    def track_inprogress(self, **labels):
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def snapshot(self) -> dict:
+        if self._function is not None:
+            self.set(self._function())
+        return super().snapshot()
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            idx = len(self.buckets)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    idx = i
+                    break
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                json.dumps(key): [list(counts), total, count]
+                for key, (counts, total, count) in self._values.items()
+            }
+
+
+# ---------------------------------------------------------------------------
+# 파이프라인 메트릭
+# ---------------------------------------------------------------------------
+
+UPLOADS = Counter("uploads_total", "업로드 요청 수 (status: ok/rejected/error)")
+GROUPS = Counter("groups_total", "분석 완료된 그룹 수 (status: ok/error)")
+ERRORS = Counter("errors_total", "단계별 오류 수 (type: upload/preprocess/vlm_request/json_parse/worker)")
+VLM_TOKENS = Counter("vlm_tokens_total", "Vision API 토큰 사용량 (kind: prompt/completion)")
+
+QUEUE_DEPTH = Gauge("queue_depth", "분석 대기 큐 크기")
+VLM_INFLIGHT = Gauge("vlm_inflight", "진행 중인 Vision API 호출 수")
+
+UPLOAD_SECONDS = Histogram("upload_seconds", "업로드 처리 시간 (초)")
+PREPROCESS_SECONDS = Histogram("preprocess_seconds", "리사이즈 + base64 인코딩 시간 (초)")
+VLM_REQUEST_SECONDS = Histogram("vlm_request_seconds", "Vision API 왕복 시간 (초)")
+JSON_PARSE_SECONDS = Histogram("json_parse_seconds", "모델 응답 JSON 파싱 시간 (초)")
+STORE_COMMIT_SECONDS = Histogram("store_commit_seconds", "그룹 결과 저장 시간 (초)")
+
+SHADOW_REQUESTS = Counter("shadow_requests_total", "섀도 모델 비교 요청 수 (result: ok/error/dropped)")
+SHADOW_REQUEST_SECONDS = Histogram("shadow_request_seconds", "섀도 모델 Vision API 왕복 시간 (초)")
+
+
+# ---------------------------------------------------------------------------
+# 멀티 프로세스 지원
+# ---------------------------------------------------------------------------
+
+def _snapshot_all() -> dict:
+    return {metric.name: metric.snapshot() for metric in _registry}
+
+
+def _snapshot_file(pid: int):
+    return config.METRICS_MULTIPROC_DIR / f"metrics_{pid}.json"
+
+
+def flush():
+    """현재 프로세스의 스냅샷을 공유 디렉토리에 기록"""
+    if config.METRICS_MULTIPROC_DIR is None:
+        return
+    config.METRICS_MULTIPROC_DIR.mkdir(parents=True, exist_ok=True)
+    path = _snapshot_file(os.getpid())
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(_snapshot_all(), f)
+    os.replace(tmp_path, path)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(config.METRICS_FLUSH_SECONDS)
+        try:
+            flush()
+        except OSError as e:
+            log.get_logger("metrics").warning("metrics.flush_error", error=str(e))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _collect() -> dict:
+    """모든 프로세스의 스냅샷 합산 (종료된 프로세스의 게이지는 제외)"""
+    snapshots = [_snapshot_all()]
+    if config.METRICS_MULTIPROC_DIR is not None and config.METRICS_MULTIPROC_DIR.exists():
+        own_pid = os.getpid()
+        for path in config.METRICS_MULTIPROC_DIR.glob("metrics_*.json"):
+            pid = int(path.stem.split("_")[1])
+            if pid == own_pid:
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _pid_alive(pid):
+                snapshot = {
+                    metric.name: snapshot.get(metric.name, {})
+                    for metric in _registry if metric.kind != "gauge"
+                }
+            snapshots.append(snapshot)
+
+    merged = {}
+    for metric in _registry:
+        values = {}
+        for snapshot in snapshots:
+            for key, value in snapshot.get(metric.name, {}).items():
+                if metric.kind == "histogram":
+                    if key not in values:
+                        values[key] = [list(value[0]), value[1], value[2]]
+                    else:
+                        current = values[key]
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                        current[2] += value[2]
+                else:
+                    values[key] = values.get(key, 0) + value
+        merged[metric.name] = values
+    return merged
+
+
+def render() -> str:
+    """Prometheus 텍스트 노출 형식(0.0.4)으로 변환"""
+    merged = _collect()
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for raw_key, value in sorted(merged[metric.name].items()):
+            key = tuple(tuple(pair) for pair in json.loads(raw_key))
+            if metric.kind == "histogram":
+                counts, total, count = value
+                cumulative = 0
+                for bound, n in zip(metric.buckets, counts):
+                    cumulative += n
+                    labels = _format_labels(key, f'le="{bound}"')
+                    lines.append(f"{metric.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(key, 'le="+Inf"')
+                lines.append(f"{metric.name}_bucket{labels} {count}")
+                lines.append(f"{metric.name}_sum{_format_labels(key)} {total}")
+                lines.append(f"{metric.name}_count{_format_labels(key)} {count}")
+            else:
+                lines.append(f"{metric.name}{_format_labels(key)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+if config.METRICS_MULTIPROC_DIR is not None:
+    threading.Thread(target=_flush_loop, daemon=True).start()
+    atexit.register(flush)
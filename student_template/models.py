@@ -3,6 +3,7 @@
 """
 import base64
 import json
+import os
 import threading
 from datetime import datetime
 from pathlib import Path
@@ -14,8 +15,50 @@ from PIL import Image
 
 import config
 
+try:
+    import fcntl
+except ImportError:  # Windows: 프로세스 안에서만 잠금
+    fcntl = None
 
-file_lock = threading.Lock()
+
+class StoreLock:
+    """
+    결과 저장소 잠금 (스레드 + 프로세스)
+
+    프로세스 안에서는 threading.Lock, 프로세스 사이에서는 data/results.lock의
+    fcntl.flock으로 잠가서 서버(uvicorn 워커 여러 개)와 analyze_folder가
+    같은 data/에 동시에 결과를 써도 results.json/results.jsonl이 깨지지 않습니다.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+
+    def __enter__(self):
+        self._lock.acquire()
+        if fcntl is None:
+            return self
+        try:
+            config.STORE_LOCK_FILE.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(config.STORE_LOCK_FILE, "a")
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        except BaseException:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        if self._file is not None:
+            self._file.close()  # 닫으면 flock도 풀림
+            self._file = None
+        self._lock.release()
+        return False
+
+
+file_lock = StoreLock()
 
 
 class AnalysisResult(BaseModel):
@@ -31,6 +74,7 @@ class AnalysisResult(BaseModel):
 
 def load_results_unsafe():
     """락 없이 파일 읽기 (내부 사용)"""
+    config.ensure_dirs()
     with open(config.RESULTS_FILE, "r", encoding="utf-8") as f:
         data = json.load(f)
         # 구 형식 호환성 체크
@@ -47,6 +91,47 @@ def load_results():
         return load_results_unsafe()
 
 
+def next_group_id() -> int:
+    """
+    새 그룹 ID 발급 (동시에 분석 중인 그룹끼리, 다른 프로세스와도 겹치지 않음)
+
+    마지막으로 발급한 ID를 data/group_id에 두고 저장소 잠금 안에서 늘립니다.
+    파일이 없으면 results.json의 마지막 ID부터 이어갑니다.
+    """
+    with file_lock:
+        try:
+            last = int(config.GROUP_ID_FILE.read_text(encoding="utf-8"))
+        except (FileNotFoundError, ValueError):
+            groups = load_results_unsafe().get("groups", [])
+            last = max((group.get("group_id", 0) for group in groups), default=0)
+        group_id = last + 1
+        config.GROUP_ID_FILE.write_text(str(group_id), encoding="utf-8")
+        return group_id
+
+
+def _file_version(path: Path) -> str:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return "0"
+    return f"{stat.st_mtime_ns:x}.{stat.st_size:x}"
+
+
+def store_version() -> str:
+    """
+    현재 저장소 버전 (락 없이 읽음)
+
+    results.json/results.jsonl의 (수정 시각, 크기)로 만들기 때문에
+    analyze_folder나 다른 uvicorn 워커 등 어느 프로세스가 써도 바뀝니다.
+    """
+    return f"{_file_version(config.RESULTS_FILE)}-{_file_version(config.RESULTS_LOG_FILE)}"
+
+
+def store_etag(version: Optional[str] = None) -> str:
+    """저장소 버전 기반 ETag (version을 주면 그 값으로 만듦)"""
+    return f'"{version or store_version()}"'
+
+
 def save_result(result: dict):
     """결과를 JSON 파일에 저장 (deprecated - 그룹 분석으로 대체)"""
     with file_lock:
@@ -62,6 +147,118 @@ def save_result(result: dict):
     return result
 
 
+def _write_jsonl(path: Path, records, mode: str):
+    config.ensure_dirs()
+    with open(path, mode, encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def _iter_jsonl(path: Path, end: Optional[int] = None):
+    position = 0
+    with open(path, "rb") as f:
+        for line in f:
+            position += len(line)
+            if end is not None and position > end:
+                return
+            try:
+                yield json.loads(line)
+            except ValueError:
+                return
+
+
+def _write_group_log(groups: list, mode: str):
+    _write_jsonl(config.RESULTS_LOG_FILE, groups, mode)
+
+
+def append_group_log_unsafe(group_result: dict, data: dict):
+    """
+    그룹 결과를 추가 전용 로그(results.jsonl)에 한 줄 추가 (file_lock 안에서 호출)
+
+    로그가 아직 없으면 data(이 그룹 포함)의 그룹 전체로 새로 만듭니다.
+    """
+    if config.RESULTS_LOG_FILE.exists():
+        _write_group_log([group_result], "a")
+    else:
+        _write_group_log(data.get("groups", []), "w")
+
+
+def ensure_group_log():
+    """그룹 로그가 없으면 results.json의 그룹으로 한 번 생성"""
+    if config.RESULTS_LOG_FILE.exists():
+        return
+    with file_lock:
+        if not config.RESULTS_LOG_FILE.exists():
+            _write_group_log(load_results_unsafe().get("groups", []), "w")
+
+
+def group_log_stat() -> os.stat_result:
+    """그룹 로그의 현재 상태 (없으면 results.json으로 먼저 생성)"""
+    ensure_group_log()
+    return os.stat(config.RESULTS_LOG_FILE)
+
+
+def iter_group_log(end: Optional[int] = None):
+    """
+    그룹 로그를 한 줄씩 읽기 (락 없이, 메모리 사용량 일정)
+
+    추가 중인 마지막 줄이 잘려 있으면 거기서 멈춥니다.
+    end를 주면 그 바이트 위치까지 끝나는 줄만 읽습니다 (그 뒤에 추가된 줄은 무시).
+    """
+    ensure_group_log()
+    yield from _iter_jsonl(config.RESULTS_LOG_FILE, end)
+
+
+def _version_records(groups: list):
+    for group in groups:
+        for version in group.get("versions", []):
+            yield {"group_id": group.get("group_id"), **version}
+
+
+def append_version_log_unsafe(records: list, data: dict):
+    """
+    재분석 버전을 버전 로그(results.versions.jsonl)에 추가 (file_lock 안에서 호출)
+
+    Args:
+        records: {"group_id", "version", ...} 목록
+        data: 이번 버전까지 반영한 results.json 데이터 (로그가 없으면 이 데이터의 모든 버전으로 생성)
+    """
+    if config.RESULTS_VERSIONS_FILE.exists():
+        _write_jsonl(config.RESULTS_VERSIONS_FILE, records, "a")
+    else:
+        _write_jsonl(config.RESULTS_VERSIONS_FILE, _version_records(data.get("groups", [])), "w")
+
+
+def ensure_version_log():
+    """버전 로그가 없으면 results.json의 재분석 버전으로 한 번 생성"""
+    if config.RESULTS_VERSIONS_FILE.exists():
+        return
+    with file_lock:
+        if not config.RESULTS_VERSIONS_FILE.exists():
+            _write_jsonl(config.RESULTS_VERSIONS_FILE, _version_records(load_results_unsafe().get("groups", [])), "w")
+
+
+def version_log_stat() -> os.stat_result:
+    """버전 로그의 현재 상태 (없으면 results.json으로 먼저 생성)"""
+    ensure_version_log()
+    return os.stat(config.RESULTS_VERSIONS_FILE)
+
+
+def iter_version_log(end: Optional[int] = None):
+    """버전 로그를 한 줄씩 읽기 (iter_group_log와 같은 규칙)"""
+    ensure_version_log()
+    yield from _iter_jsonl(config.RESULTS_VERSIONS_FILE, end)
+
+
+def timestamp_in_range(timestamp: str, since: str = None, until: str = None) -> bool:
+    """since/until은 "2026-10-18", "2026-10-18 09" 처럼 앞부분만 줘도 됨 (양 끝 포함)"""
+    if since and timestamp < since:
+        return False
+    if until and timestamp[:len(until)] > until:
+        return False
+    return True
+
+
 def resize_image(image_path: Path, max_size: int = 1024) -> bytes:
     """
     이미지를 리사이즈하고 JPEG로 압축
@@ -0,0 +1,182 @@
+"""
+샘플링 프로파일러
+
+실행 중인 서버를 재시작하지 않고 N초 동안 모든 스레드(워커, Gradio, FastAPI)의
+스택을 주기적으로 샘플링해서 data/profiles/에 저장합니다.
+
+- collapsed: flamegraph.pl / speedscope에서 바로 여는 "스택;스택 개수" 형식
+- speedscope: https://www.speedscope.app 에서 여는 JSON 형식
+
+프로파일링 중이 아닐 때는 아무 스레드도 돌지 않으므로 항상 켜 두어도 됩니다.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+
+import config
+import log
+
+
+logger = log.get_logger("profiler")
+
+FORMATS = ("collapsed", "speedscope")
+MIN_SECONDS = 1.0
+MAX_SECONDS = 300
+
+_lock = threading.Lock()
+_running = None  # 진행 중인 프로파일 출력 경로
+
+
+def _frame_name(code) -> str:
+    parts = Path(code.co_filename).parts[-2:]
+    return f"{code.co_name} ({'/'.join(parts)}:{code.co_firstlineno})"
+
+
+def _sample(stacks: Counter, own_ident: int):
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    for ident, frame in sys._current_frames().items():
+        if ident == own_ident:
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(_frame_name(frame.f_code))
+            frame = frame.f_back
+        stack.append(names.get(ident, f"thread-{ident}"))
+        stacks[tuple(reversed(stack))] += 1
+
+
+def _write_collapsed(stacks: Counter, path: Path):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(";".join(frame.replace(";", ":") for frame in stack) + f" {count}\n")
+
+
+def _write_speedscope(stacks: Counter, path: Path, interval: float, duration: float):
+    frames = []
+    frame_index = {}
+    profiles = {}
+
+    for stack, count in stacks.items():
+        thread_name, frame_names = stack[0], stack[1:]
+        indices = []
+        for name in frame_names:
+            if name not in frame_index:
+                frame_index[name] = len(frames)
+                frames.append({"name": name})
+            indices.append(frame_index[name])
+        profile = profiles.setdefault(thread_name, {
+            "type": "sampled",
+            "name": thread_name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": duration,
+            "samples": [],
+            "weights": [],
+        })
+        profile["samples"].append(indices)
+        profile["weights"].append(count * interval)
+
+    document = {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "shared": {"frames": frames},
+        "profiles": list(profiles.values()),
+        "name": path.stem,
+        "exporter": "motorchecker.profiler",
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(document, f, ensure_ascii=False)
+
+
+def _run(path: Path, seconds: float, interval: float, fmt: str):
+    global _running
+    stacks = Counter()
+    own_ident = threading.get_ident()
+    started = time.perf_counter()
+    deadline = started + seconds
+    samples = 0
+
+    try:
+        while time.perf_counter() < deadline:
+            _sample(stacks, own_ident)
+            samples += 1
+            time.sleep(interval)
+
+        duration = time.perf_counter() - started
+        if fmt == "speedscope":
+            _write_speedscope(stacks, path, interval, duration)
+        else:
+            _write_collapsed(stacks, path)
+        logger.info("profile.done", file=str(path), samples=samples, seconds=round(duration, 1))
+    except Exception as e:
+        logger.error("profile.error", exc_info=True, error=str(e))
+    finally:
+        with _lock:
+            _running = None
+
+
+def duration(seconds: float) -> float:
+    """start()가 실제로 쓰는 프로파일링 시간 (MIN_SECONDS~MAX_SECONDS로 맞춤)"""
+    return max(MIN_SECONDS, min(float(seconds), MAX_SECONDS))
+
+
+def start(seconds: float = 30, interval: float = None, fmt: str = "collapsed") -> Path:
+    """
+    백그라운드 스레드에서 프로파일링 시작
+
+    Args:
+        seconds: 프로파일링 시간 (초, duration()으로 MIN_SECONDS~MAX_SECONDS에 맞춤)
+        interval: 샘플링 간격 (초, 기본 config.PROFILE_INTERVAL)
+        fmt: collapsed / speedscope
+
+    Returns:
+        결과가 저장될 파일 경로
+
+    Raises:
+        ValueError: 지원하지 않는 형식
+        RuntimeError: 이미 프로파일링 중
+    """
+    global _running
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+
+    seconds = duration(seconds)
+    interval = interval or config.PROFILE_INTERVAL
+    suffix = ".collapsed.txt" if fmt == "collapsed" else ".speedscope.json"
+
+    with _lock:
+        if _running is not None:
+            raise RuntimeError(f"이미 프로파일링 중입니다: {_running}")
+        config.PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        path = config.PROFILE_DIR / f"profile_{timestamp}_{os.getpid()}{suffix}"
+        _running = path
+
+    logger.info("profile.start", file=str(path), seconds=seconds, interval=interval)
+    threading.Thread(
+        target=_run,
+        args=(path, seconds, interval, fmt),
+        name="sampling-profiler",
+        daemon=True
+    ).start()
+    return path
+
+
+def install_signal_handler():
+    """SIGUSR2를 받으면 config.PROFILE_SECONDS 동안 프로파일링 (메인 스레드에서 호출)"""
+    import signal
+
+    if not hasattr(signal, "SIGUSR2"):
+        return
+
+    def _handler(signum, frame):
+        try:
+            start(config.PROFILE_SECONDS)
+        except RuntimeError as e:
+            logger.warning("profile.busy", error=str(e))
+
+    signal.signal(signal.SIGUSR2, _handler)
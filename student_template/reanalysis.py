@@ -0,0 +1,274 @@
+"""
+재분석 작업 (모델 교체 후 이전 업로드 다시 분석)
+
+날짜 구간이나 그룹 ID 구간으로 고른 그룹의 원본 업로드를 낮은 우선순위 레인에서
+다시 분석하고, 결과를 원래 그룹의 "versions" 목록에 새 버전으로 추가합니다
+(원래 결과는 그대로 둠).
+
+- 재분석 스레드 REANALYSIS_WORKERS개가 레인에서 그룹을 꺼내 분석
+- Vision API 호출은 backfill 슬롯을 쓰므로 실시간 업로드가 기다리면 항상 먼저 처리되고,
+  재분석은 전체 동시 요청 수의 REANALYSIS_SHARE 비율까지만 씀
+- results.json 쓰기는 REANALYSIS_BATCH 그룹씩 모아서 한 번에 (실시간 저장을 덜 막도록)
+- 새 버전은 버전 로그(results.versions.jsonl)에도 추가되어 /export jsonl에 포함됨
+"""
+import json
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from queue import Empty, Queue
+
+import config
+import log
+import storage
+from models import (
+    append_version_log_unsafe,
+    file_lock,
+    iter_group_log,
+    load_results_unsafe,
+    timestamp_in_range,
+)
+from worker import analyze_sticker, group_verdict
+
+
+logger = log.get_logger("reanalysis")
+
+REANALYSIS_BATCH = 50
+FLUSH_SECONDS = 5
+
+_lane = Queue()           # (작업, 그룹) 낮은 우선순위 레인
+_jobs = {}                # 작업 ID -> ReanalysisJob
+_jobs_lock = threading.Lock()
+_workers_started = False
+
+_pending_versions = []    # 저장 대기 중인 (작업, 그룹 ID, 버전)
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+class ReanalysisJob:
+    """재분석 작업 하나의 진행 상황"""
+
+    def __init__(self, model: str, selector: dict):
+        self.id = uuid.uuid4().hex[:12]
+        self.model = model
+        self.selector = selector
+        self.created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self.state = "queued"
+        self.total = 0
+        self.done = 0
+        self.failed = 0
+        self.skipped = 0
+        self.cancelled = False
+        self._lock = threading.Lock()
+
+    def _start_one(self):
+        with self._lock:
+            if self.state == "queued":
+                self.state = "running"
+
+    def _finish_one(self, field: str):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + 1)
+            if self.done + self.failed + self.skipped >= self.total:
+                self.state = "cancelled" if self.cancelled else "done"
+            elif self.state == "queued":
+                self.state = "running"
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "model": self.model,
+            "selector": self.selector,
+            "created": self.created,
+            "state": self.state,
+            "total": self.total,
+            "done": self.done,
+            "failed": self.failed,
+            "skipped": self.skipped,
+        }
+
+
+def select_groups(since: str = None, until: str = None, group_from: int = None, group_to: int = None) -> list:
+    """그룹 로그에서 구간에 맞는 그룹 선택"""
+    groups = []
+    for group in iter_group_log():
+        group_id = group.get("group_id", 0)
+        if group_from is not None and group_id < group_from:
+            continue
+        if group_to is not None and group_id > group_to:
+            continue
+        if not timestamp_in_range(group.get("timestamp", ""), since, until):
+            continue
+        groups.append({"group_id": group_id, "images": group.get("images", [])})
+    return groups
+
+
+def _reanalyze(job: ReanalysisJob, group: dict):
+    """그룹 하나의 이미지를 backfill 레인으로 다시 분석해 새 버전 생성 (원본이 없으면 None)"""
+    started = time.perf_counter()
+    results = []
+    for image in group["images"]:
+        entry = {"filename": image.get("filename"), "upload_key": image.get("upload_key")}
+        try:
+            path = storage.resolve(image["upload_key"]) if image.get("upload_key") else None
+        except ValueError:
+            path = None
+        if path is None or not path.exists():
+            results.append({**entry, "has_sticker": False, "error": "원본 없음"})
+            continue
+        sticker_info = analyze_sticker(Path(path), model=job.model, lane="backfill")
+        results.append({
+            **entry,
+            "has_sticker": sticker_info["has_sticker"],
+            "sticker_number": sticker_info.get("number"),
+            "sticker_color": sticker_info.get("color"),
+            **({"error": sticker_info["error"]} if "error" in sticker_info else {}),
+        })
+
+    if all(result.get("error") == "원본 없음" for result in results):
+        return None
+
+    return {
+        "model": job.model,
+        "job_id": job.id,
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "images": results,
+        **group_verdict(results),
+        "analysis_time": round(time.perf_counter() - started, 3),
+    }
+
+
+def flush(force: bool = False):
+    """
+    모아 둔 새 버전을 results.json과 버전 로그에 저장 (REANALYSIS_BATCH개 또는 FLUSH_SECONDS마다)
+
+    작업의 done은 여기서 저장한 뒤에 늘리므로 "done" 상태인 작업의 버전은 모두 /export로 읽을 수 있습니다.
+    """
+    global _pending_versions, _last_flush
+    with _pending_lock:
+        due = len(_pending_versions) >= REANALYSIS_BATCH or time.monotonic() - _last_flush >= FLUSH_SECONDS
+        if not _pending_versions or not (force or due):
+            return
+        batch, _pending_versions = _pending_versions, []
+        _last_flush = time.monotonic()
+
+    outcomes = []
+    try:
+        with file_lock:
+            data = load_results_unsafe()
+            by_id = {group.get("group_id"): group for group in data["groups"]}
+            records = []
+            for job, group_id, version in batch:
+                group = by_id.get(group_id)
+                if group is None:
+                    outcomes.append((job, "skipped"))
+                    continue
+                versions = group.setdefault("versions", [])
+                version["version"] = len(versions) + 2  # 원래 결과가 1
+                versions.append(version)
+                records.append({"group_id": group_id, **version})
+                outcomes.append((job, "done"))
+
+            with open(config.RESULTS_FILE, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+
+            # /export가 읽는 버전 로그 (그룹 로그는 건드리지 않아 CSV/Parquet 내보내기 ETag는 그대로)
+            append_version_log_unsafe(records, data)
+    except Exception as e:
+        logger.error("reanalysis.flush_error", exc_info=True, groups=len(batch), error=str(e))
+        for job, _, _ in batch:
+            job._finish_one("failed")
+        return
+
+    for job, field in outcomes:
+        job._finish_one(field)
+    logger.info("reanalysis.flushed", groups=len(batch))
+
+
+def _worker_loop():
+    while True:
+        try:
+            job, group = _lane.get(timeout=1)
+        except Empty:
+            flush(force=True)
+            continue
+
+        if job.cancelled:
+            job._finish_one("skipped")
+            continue
+
+        job._start_one()
+        try:
+            version = _reanalyze(job, group)
+        except Exception as e:
+            logger.error("reanalysis.group_error", exc_info=True, job_id=job.id, group_id=group["group_id"], error=str(e))
+            job._finish_one("failed")
+            continue
+
+        if version is None:
+            job._finish_one("skipped")
+        else:
+            # done은 flush()에서 저장한 뒤에 셈
+            with _pending_lock:
+                _pending_versions.append((job, group["group_id"], version))
+        flush()
+
+
+def _ensure_workers():
+    global _workers_started
+    with _jobs_lock:
+        if _workers_started:
+            return
+        for i in range(max(1, config.REANALYSIS_WORKERS)):
+            threading.Thread(target=_worker_loop, name=f"reanalysis-{i}", daemon=True).start()
+        _workers_started = True
+
+
+def submit(since: str = None, until: str = None, group_from: int = None, group_to: int = None,
+           model: str = None) -> ReanalysisJob:
+    """
+    재분석 작업 등록
+
+    Raises:
+        ValueError: 구간이 없거나 재분석이 꺼져 있음 (REANALYSIS_SHARE=0)
+    """
+    if since is None and until is None and group_from is None and group_to is None:
+        raise ValueError("since/until 또는 group_from/group_to 중 하나는 지정해야 합니다.")
+    if config.REANALYSIS_SHARE <= 0:
+        raise ValueError("REANALYSIS_SHARE가 0이라 재분석을 할 수 없습니다.")
+
+    selector = {"since": since, "until": until, "group_from": group_from, "group_to": group_to}
+    job = ReanalysisJob(model or config.MODEL_NAME, {k: v for k, v in selector.items() if v is not None})
+    groups = select_groups(since, until, group_from, group_to)
+    job.total = len(groups)
+    if not groups:
+        job.state = "done"
+
+    with _jobs_lock:
+        _jobs[job.id] = job
+    _ensure_workers()
+    for group in groups:
+        _lane.put((job, group))
+
+    logger.info("reanalysis.submitted", job_id=job.id, model=job.model, groups=job.total, **job.selector)
+    return job
+
+
+def get(job_id: str):
+    with _jobs_lock:
+        return _jobs.get(job_id)
+
+
+def list_jobs() -> list:
+    with _jobs_lock:
+        return [job.to_dict() for job in _jobs.values()]
+
+
+def cancel(job_id: str):
+    """남은 그룹을 건너뛰도록 표시 (이미 분석 중인 그룹은 끝까지 처리)"""
+    job = get(job_id)
+    if job is not None:
+        job.cancelled = True
+    return job
@@ -0,0 +1,157 @@
+"""
+이미지별 결과 조회 인덱스
+
+업로드 파일명(또는 trace ID) → 분석 상태/결과를 메모리에 들고 있어서
+GET /results/{filename}이 results.json을 읽지 않고 바로 응답합니다.
+
+- 업로드 시 pending으로 등록, 그룹 결과를 저장하면 done으로 바뀜
+- 처음 조회할 때 그룹 로그(results.jsonl)로 이전 결과를 채움
+- 최근 RESULT_INDEX_MAX개 이미지만 보관 (오래된 것부터 제거), 그룹이 되지 못한
+  pending 항목도 RESULT_INDEX_MAX개 / RESULT_PENDING_TTL초가 지나면 제거
+- wait_for()로 결과가 나올 때까지 기다릴 수 있음 (이벤트 루프 스레드를 막지 않음)
+"""
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from models import iter_group_log
+
+
+_lock = threading.Lock()
+_done = OrderedDict()    # 파일명/trace ID -> 결과 항목
+_pending = OrderedDict()  # 파일명/trace ID -> 대기 항목 (등록 순)
+_waiters = {}            # 파일명/trace ID -> [(loop, future)]
+_loaded = False
+
+
+def _entries(group: dict, completed_at: float = None):
+    """그룹 결과를 이미지별 인덱스 항목으로 변환"""
+    for image in group.get("images", []):
+        entry = {
+            "filename": image.get("filename"),
+            "trace_id": image.get("trace_id"),
+            "status": "done",
+            "group_id": group.get("group_id"),
+            "group_status": group.get("status"),
+            "defect_level": group.get("defect_level"),
+            "timestamp": group.get("timestamp"),
+            "result": image,
+            "sticker_info": group.get("sticker_info"),
+        }
+        if completed_at is not None:
+            entry["completed_at"] = completed_at
+        yield entry
+
+
+def _put_unsafe(entry: dict):
+    for key in (entry["filename"], entry.get("trace_id")):
+        if not key:
+            continue
+        _done[key] = entry
+        _done.move_to_end(key)
+    while len(_done) > config.RESULT_INDEX_MAX * 2:
+        _done.popitem(last=False)
+
+
+def _ensure_loaded():
+    global _loaded
+    if _loaded:
+        return
+    with _lock:
+        if _loaded:
+            return
+        for group in iter_group_log():
+            for entry in _entries(group):
+                _put_unsafe(entry)
+        _loaded = True
+
+
+def _expire_pending_unsafe(now: float):
+    """오래되었거나 너무 많은 pending 항목 제거 (등록 순이므로 앞에서부터)"""
+    cutoff = now - config.RESULT_PENDING_TTL
+    while _pending:
+        entry = next(iter(_pending.values()))
+        if len(_pending) <= config.RESULT_INDEX_MAX * 2 and entry["uploaded_at"] >= cutoff:
+            break
+        _pending.popitem(last=False)
+
+
+def mark_pending(filename: str, trace_id: str = None):
+    """업로드 직후 분석 대기 상태로 등록"""
+    now = time.time()
+    entry = {
+        "filename": filename,
+        "trace_id": trace_id,
+        "status": "pending",
+        "uploaded_at": now,
+    }
+    with _lock:
+        for key in (filename, trace_id):
+            if key:
+                _pending[key] = entry
+                _pending.move_to_end(key)
+        _expire_pending_unsafe(now)
+
+
+def _resolve(future, entry: dict):
+    if not future.done():
+        future.set_result(entry)
+
+
+def record_group(group_result: dict):
+    """저장된 그룹 결과를 인덱스에 반영하고 기다리는 요청을 깨움"""
+    _ensure_loaded()
+    now = time.time()
+    woken = []
+    with _lock:
+        for entry in _entries(group_result, completed_at=now):
+            pending = _pending.pop(entry["filename"], None)
+            if entry.get("trace_id"):
+                pending = _pending.pop(entry["trace_id"], None) or pending
+            if pending is not None:
+                entry["uploaded_at"] = pending["uploaded_at"]
+                entry["latency_s"] = round(now - pending["uploaded_at"], 3)
+            _put_unsafe(entry)
+            for key in (entry["filename"], entry.get("trace_id")):
+                for loop, future in _waiters.pop(key, []):
+                    woken.append((loop, future, entry))
+
+    for loop, future, entry in woken:
+        loop.call_soon_threadsafe(_resolve, future, entry)
+
+
+def lookup(key: str):
+    """파일명 또는 trace ID로 조회 (없으면 None)"""
+    _ensure_loaded()
+    with _lock:
+        return _done.get(key) or _pending.get(key)
+
+
+async def wait_for(key: str, timeout: float):
+    """
+    결과가 나올 때까지 최대 timeout초 대기
+
+    Returns:
+        결과 항목 (대기 중이면 pending 항목, 모르는 키면 None)
+    """
+    await asyncio.get_running_loop().run_in_executor(None, _ensure_loaded)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _done.get(key) or _pending.get(key)
+        if entry is None or entry["status"] == "done" or timeout <= 0:
+            return entry
+        future = loop.create_future()
+        _waiters.setdefault(key, []).append((loop, future))
+
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        with _lock:
+            waiters = _waiters.get(key, [])
+            if (loop, future) in waiters:
+                waiters.remove((loop, future))
+            if not waiters:
+                _waiters.pop(key, None)
+            return _done.get(key) or _pending.get(key)
@@ -0,0 +1,291 @@
+"""
+처리량 / 불량률 시계열 롤업
+
+그룹 분석 결과를 저장하는 시점(커밋)에 분/시간/일 단위 버킷을 함께 갱신합니다.
+커밋마다 바뀐 값만 rollups.jsonl에 한 줄 덧붙이고, 로그가 커지면 rollups.json에
+합칩니다 (전체 버킷을 매번 다시 쓰지 않음).
+대시보드와 /rollups 엔드포인트는 results.json 전체를 읽지 않고
+화면에 보여줄 버킷 수만큼만 읽습니다.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import config
+
+
+# 해상도별 버킷 키 길이 ("2026-10-18 13:05" 형식의 타임스탬프 앞부분)
+RESOLUTIONS = {
+    "minute": 16,
+    "hour": 13,
+    "day": 10,
+}
+
+# 분석 지연시간 히스토그램 경계 (초) - p95 추정용
+LATENCY_BOUNDS = [0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 45, 60, 90, 120]
+
+DEFECT_LEVELS = ["정상", "경미한 불량", "심각한 불량", "미확인"]
+
+_lock = threading.Lock()
+_buckets = None  # {resolution: {bucket_key: bucket}}
+_generation = None  # rollups.json 세대 (압축할 때마다 바뀜, 로그 줄의 "g"와 같아야 반영)
+_file_id = None  # 마지막으로 읽거나 쓴 rollups.json의 (inode, mtime_ns, size)
+_log_offset = 0  # rollups.jsonl에서 반영한 바이트 수
+
+
+def _new_bucket(key: str) -> dict:
+    return {
+        "t": key,
+        "images": 0,
+        "groups": 0,
+        "error_groups": 0,
+        "defects": {level: 0 for level in DEFECT_LEVELS},
+        "latency_sum": 0.0,
+        "latency_count": 0,
+        "latency_max": 0.0,
+        "latency_hist": [0] * (len(LATENCY_BOUNDS) + 1),
+    }
+
+
+def _delta(group: dict, analysis_time=None) -> dict:
+    """그룹 결과에서 버킷 갱신에 필요한 값만 추림 (rollups.jsonl 한 줄)"""
+    return {
+        "timestamp": group["timestamp"],
+        "images": len(group.get("images", [])),
+        "error": group.get("status") != "정상",
+        "defect_level": group.get("defect_level") or "미확인",
+        "analysis_time": analysis_time,
+    }
+
+
+def _add_to_bucket(bucket: dict, delta: dict):
+    bucket["images"] += delta["images"]
+    bucket["groups"] += 1
+    if delta["error"]:
+        bucket["error_groups"] += 1
+
+    level = delta["defect_level"]
+    bucket["defects"][level] = bucket["defects"].get(level, 0) + 1
+
+    analysis_time = delta["analysis_time"]
+    if analysis_time is not None:
+        bucket["latency_sum"] += analysis_time
+        bucket["latency_count"] += 1
+        bucket["latency_max"] = max(bucket.get("latency_max", 0.0), analysis_time)
+        idx = len(LATENCY_BOUNDS)
+        for i, bound in enumerate(LATENCY_BOUNDS):
+            if analysis_time <= bound:
+                idx = i
+                break
+        bucket["latency_hist"][idx] += 1
+
+
+def _apply(buckets: dict, delta: dict):
+    for resolution, width in RESOLUTIONS.items():
+        key = delta["timestamp"][:width]
+        bucket = buckets[resolution].get(key)
+        if bucket is None:
+            bucket = buckets[resolution][key] = _new_bucket(key)
+        _add_to_bucket(bucket, delta)
+
+
+def _prune(now: datetime):
+    """보존 기간이 지난 분/시간 버킷 제거 (키가 시간순이므로 앞에서부터)"""
+    cutoffs = {
+        "minute": now - timedelta(hours=config.ROLLUP_MINUTE_RETENTION_HOURS),
+        "hour": now - timedelta(days=config.ROLLUP_HOUR_RETENTION_DAYS),
+    }
+    for resolution, cutoff in cutoffs.items():
+        cutoff_key = cutoff.strftime("%Y-%m-%d %H:%M:%S")[:RESOLUTIONS[resolution]]
+        buckets = _buckets[resolution]
+        while buckets:
+            oldest = next(iter(buckets))
+            if oldest >= cutoff_key:
+                break
+            del buckets[oldest]
+
+
+def _rebuild(store_data: dict) -> dict:
+    """롤업 파일이 없을 때 기존 그룹 결과로 한 번만 재구성"""
+    rebuilt = {resolution: {} for resolution in RESOLUTIONS}
+    for group in sorted(store_data.get("groups", []), key=lambda g: g.get("timestamp", "")):
+        if group.get("timestamp"):
+            _apply(rebuilt, _delta(group, group.get("analysis_time")))
+    return rebuilt
+
+
+def _stat_id(stat: os.stat_result) -> tuple:
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _ensure_loaded(store_data: dict) -> bool:
+    """
+    롤업을 디스크와 맞춤 (file_lock → _lock 순서로 잡은 상태에서 호출)
+
+    서버와 analyze_folder가 같은 롤업 파일에 쓰므로, 다른 프로세스가 rollups.json을
+    다시 썼으면 처음부터 읽고 아니면 rollups.jsonl에 새로 붙은 줄만 읽어 반영합니다.
+
+    Args:
+        store_data: 이미 읽어둔 results.json 데이터 (파일이 없을 때 재구성용)
+
+    Returns:
+        rollups.json이 없어서 store_data로 재구성했으면 True
+    """
+    global _buckets, _generation, _file_id, _log_offset
+    try:
+        file_id = _stat_id(os.stat(config.ROLLUPS_FILE))
+    except FileNotFoundError:
+        _buckets = _rebuild(store_data or {})
+        _compact()
+        return True
+
+    if _buckets is None or file_id != _file_id:
+        with open(config.ROLLUPS_FILE, "r", encoding="utf-8") as f:
+            loaded = json.load(f)
+        _buckets = {resolution: loaded.get(resolution, {}) for resolution in RESOLUTIONS}
+        _generation = loaded.get("generation")
+        _file_id = file_id
+        _log_offset = 0
+
+    try:
+        with open(config.ROLLUPS_LOG_FILE, "rb") as f:
+            f.seek(_log_offset)
+            chunk = f.read()
+    except FileNotFoundError:
+        return False
+
+    # 쓰는 중인 마지막 줄은 다음에 읽음
+    chunk = chunk[:chunk.rfind(b"\n") + 1]
+    _log_offset += len(chunk)
+    for line in chunk.splitlines():
+        try:
+            delta = json.loads(line)
+        except ValueError:
+            continue
+        # 압축 도중 멈춰서 rollups.json에 이미 합쳐진 줄은 건너뜀
+        if delta.get("g") == _generation:
+            _apply(_buckets, delta)
+    return False
+
+
+def _compact():
+    """
+    메모리 버킷을 rollups.json에 통째로 쓰고 rollups.jsonl을 비움
+
+    새 세대 번호로 저장하므로 rollups.json 교체 후 로그를 비우기 전에 멈춰도
+    남은 로그 줄(이전 세대)은 다시 반영되지 않습니다.
+    """
+    global _generation, _file_id, _log_offset
+    config.ensure_dirs()
+    _prune(datetime.now())
+    _generation = time.time_ns()
+    tmp_file = config.ROLLUPS_FILE.with_suffix(".tmp")
+    with open(tmp_file, "w", encoding="utf-8") as f:
+        json.dump({"generation": _generation, **_buckets}, f, ensure_ascii=False, separators=(",", ":"))
+    os.replace(tmp_file, config.ROLLUPS_FILE)
+    open(config.ROLLUPS_LOG_FILE, "wb").close()
+    _file_id = _stat_id(os.stat(config.ROLLUPS_FILE))
+    _log_offset = 0
+
+
+def record_group(group_result: dict, analysis_time: float = None, store_data: dict = None):
+    """
+    그룹 결과 하나를 분/시간/일 버킷에 반영 (그룹 커밋 시 file_lock 안에서 호출)
+
+    rollups.jsonl에 한 줄만 덧붙이고, 로그가 ROLLUP_COMPACT_BYTES를 넘으면
+    rollups.json에 합칩니다.
+
+    Args:
+        group_result: analyze_image_group()이 만든 그룹 결과
+        analysis_time: 그룹 분석에 걸린 시간 (초)
+        store_data: 커밋 중인 results.json 데이터 (group_result가 이미 포함됨)
+    """
+    global _log_offset
+    with _lock:
+        if _ensure_loaded(store_data):
+            # 커밋 중인 데이터에 이 그룹이 이미 들어 있으므로 재구성만으로 반영됨
+            return
+
+        delta = _delta(group_result, analysis_time)
+        line = json.dumps({"g": _generation, **delta}, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with open(config.ROLLUPS_LOG_FILE, "ab") as f:
+            f.write(line.encode("utf-8"))
+        _log_offset += len(line.encode("utf-8"))
+        _apply(_buckets, delta)
+
+        if _log_offset >= config.ROLLUP_COMPACT_BYTES:
+            _compact()
+        else:
+            _prune(datetime.now())
+
+
+def _latency_p95(bucket: dict):
+    count = bucket["latency_count"]
+    if count == 0:
+        return None
+    target = count * 0.95
+    seen = 0
+    for i, n in enumerate(bucket["latency_hist"]):
+        seen += n
+        if seen >= target:
+            if i < len(LATENCY_BOUNDS):
+                return LATENCY_BOUNDS[i]
+            return round(bucket.get("latency_max", LATENCY_BOUNDS[-1]), 3)
+    return None
+
+
+def _summarize(bucket: dict) -> dict:
+    groups = bucket["groups"]
+    defects = bucket["defects"]
+    defective = defects.get("경미한 불량", 0) + defects.get("심각한 불량", 0)
+    count = bucket["latency_count"]
+    return {
+        "t": bucket["t"],
+        "images": bucket["images"],
+        "groups": groups,
+        "error_groups": bucket["error_groups"],
+        "defects": dict(defects),
+        "defect_rate": round(defective / groups, 4) if groups else 0.0,
+        "latency_mean": round(bucket["latency_sum"] / count, 3) if count else None,
+        "latency_p95": _latency_p95(bucket),
+    }
+
+
+def query(resolution: str = "minute", since: str = None, until: str = None, limit: int = 120) -> list:
+    """
+    롤업 버킷 조회 (최신 버킷부터 limit개까지만 확인)
+
+    Args:
+        resolution: minute / hour / day
+        since: 이 시각 이후 버킷만 ("2026-10-18 09:00" 형식, 앞부분만 써도 됨)
+        until: 이 시각 이전 버킷만
+        limit: 최대 버킷 개수
+
+    Returns:
+        오래된 순으로 정렬된 버킷 요약 리스트
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"지원하지 않는 해상도: {resolution}")
+
+    from models import file_lock, load_results_unsafe
+
+    width = RESOLUTIONS[resolution]
+    # 다른 프로세스가 쓴 버킷도 보이도록 저장소 잠금 안에서 파일과 맞춤 (락 순서: file_lock → _lock)
+    with file_lock, _lock:
+        store_data = None if config.ROLLUPS_FILE.exists() else load_results_unsafe()
+        _ensure_loaded(store_data)
+        buckets = _buckets[resolution]
+        selected = []
+        for key in reversed(buckets):
+            if len(selected) >= limit:
+                break
+            if until and key > until[:width]:
+                continue
+            if since and key < since[:width]:
+                break
+            selected.append(_summarize(buckets[key]))
+
+    selected.reverse()
+    return selected
@@ -0,0 +1,268 @@
+"""
+섀도 모델 비교 (MODEL_NAME을 바꾸기 전에 후보 모델을 실시간 트래픽으로 평가)
+
+분석이 끝난 그룹의 이미지 중 SHADOW_SAMPLE_RATE 비율을 두 번째 OpenAI 호환
+서버(SHADOW_API_BASE_URL)에도 보내고, 기존 결과와의 일치 여부(has_sticker,
+number, color)와 지연시간을 data/shadow.jsonl에 한 줄씩 기록합니다.
+
+- 그룹 결과를 저장한 뒤에 큐에 넣기만 하므로 실시간 분석 지연에는 영향 없음
+- 섀도 스레드 SHADOW_CONCURRENCY개가 자체 클라이언트로 요청 (GPU 서버 슬롯을 쓰지 않음)
+- 대기열이 SHADOW_QUEUE_MAX개를 넘으면 새 이미지는 버림 (재시도 없음)
+"""
+import base64
+import json
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+from queue import Full, Queue
+
+import config
+import log
+import metrics
+from models import resize_image, timestamp_in_range
+
+
+logger = log.get_logger("shadow")
+
+FIELDS = ("has_sticker", "number", "color")
+
+_queue = None
+_client = None
+_start_lock = threading.Lock()
+_write_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return bool(config.SHADOW_API_BASE_URL) and config.SHADOW_SAMPLE_RATE > 0
+
+
+def _get_client():
+    from openai import OpenAI
+
+    return OpenAI(
+        base_url=config.SHADOW_API_BASE_URL,
+        api_key=config.SHADOW_API_KEY or "shadow",
+        timeout=config.SHADOW_TIMEOUT,
+        max_retries=0,
+    )
+
+
+def _ensure_started() -> Queue:
+    global _queue, _client
+    if _queue is not None:
+        return _queue
+    with _start_lock:
+        if _queue is None:
+            _client = _get_client()
+            queue = Queue(maxsize=max(1, config.SHADOW_QUEUE_MAX))
+            for i in range(max(1, config.SHADOW_CONCURRENCY)):
+                threading.Thread(target=_worker_loop, args=(queue,), name=f"shadow-{i}", daemon=True).start()
+            _queue = queue
+    return _queue
+
+
+def _span_seconds(trace, name: str):
+    """trace에서 이름이 name인 마지막 span의 길이 (초)"""
+    if trace is None:
+        return None
+    for span in reversed(trace.spans):
+        if span["name"] == name:
+            return round((int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e9, 3)
+    return None
+
+
+def submit(group_id: int, images: list, results: list, traces: list):
+    """
+    그룹 분석 결과 중 샘플을 섀도 대기열에 추가 (워커가 결과를 저장한 뒤 호출)
+
+    기존 분석이 실패한 이미지(이미지 처리나 Vision API 호출이 실패해 결과에
+    "error"가 있는 이미지)는 비교할 수 없으므로 보내지 않습니다.
+    """
+    if not enabled():
+        return
+    queue = _ensure_started()
+    for img_info, result, trace in zip(images, results, traces):
+        if "error" in result or random.random() >= config.SHADOW_SAMPLE_RATE:
+            continue
+        item = {
+            "group_id": group_id,
+            "filename": result["filename"],
+            "path": img_info["path"],
+            "trace_id": result.get("trace_id"),
+            "primary": {
+                "has_sticker": result["has_sticker"],
+                "number": result.get("sticker_number"),
+                "color": result.get("sticker_color"),
+                "latency_s": _span_seconds(trace, "vlm_request"),
+            },
+        }
+        try:
+            queue.put_nowait(item)
+        except Full:
+            metrics.SHADOW_REQUESTS.inc(result="dropped")
+            logger.warning("shadow.dropped", group_id=group_id, filename=result["filename"], queued=queue.qsize())
+
+
+def _normalize(value):
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _agreement(primary: dict, candidate: dict) -> dict:
+    """필드별 일치 여부 (number/color는 둘 다 스티커가 있다고 했을 때만 비교)"""
+    both_sticker = bool(primary["has_sticker"]) and bool(candidate["has_sticker"])
+    agree = {"has_sticker": bool(primary["has_sticker"]) == bool(candidate["has_sticker"])}
+    for field in ("number", "color"):
+        agree[field] = _normalize(primary[field]) == _normalize(candidate[field]) if both_sticker else None
+    agree["all"] = agree["has_sticker"] and all(agree[field] is not False for field in ("number", "color"))
+    return agree
+
+
+def _compare(item: dict) -> dict:
+    from worker import build_messages, parse_sticker_json
+
+    record = {
+        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "group_id": item["group_id"],
+        "filename": item["filename"],
+        "trace_id": item["trace_id"],
+        "primary_model": config.MODEL_NAME,
+        "shadow_model": config.SHADOW_MODEL_NAME,
+        "primary": item["primary"],
+    }
+    try:
+        image_bytes = resize_image(Path(item["path"]))
+        base64_image = base64.b64encode(image_bytes).decode("utf-8")
+
+        started = time.perf_counter()
+        response = _client.chat.completions.create(
+            model=config.SHADOW_MODEL_NAME,
+            messages=build_messages(base64_image),
+            max_tokens=150,
+            temperature=0.1
+        )
+        latency = time.perf_counter() - started
+        metrics.SHADOW_REQUEST_SECONDS.observe(latency)
+
+        parsed = parse_sticker_json(response.choices[0].message.content.strip())
+        candidate = {
+            "has_sticker": bool(parsed.get("has_sticker")),
+            "number": parsed.get("number"),
+            "color": parsed.get("color"),
+            "latency_s": round(latency, 3),
+        }
+    except Exception as e:
+        metrics.SHADOW_REQUESTS.inc(result="error")
+        logger.warning("shadow.error", group_id=item["group_id"], filename=item["filename"], error=str(e))
+        record["shadow"] = {"error": str(e)}
+        return record
+
+    metrics.SHADOW_REQUESTS.inc(result="ok")
+    record["shadow"] = candidate
+    record["agree"] = _agreement(item["primary"], candidate)
+    return record
+
+
+def _worker_loop(queue: Queue):
+    while True:
+        item = queue.get()
+        record = _compare(item)
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        try:
+            config.ensure_dirs()
+            with _write_lock:
+                with open(config.SHADOW_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+        except OSError as e:
+            # 기록에 실패해도 섀도 스레드는 계속 (디스크가 가득 찬 경우 등)
+            logger.error("shadow.write_error", group_id=item["group_id"], filename=item["filename"], error=str(e))
+
+
+def _percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct / 100))], 3)
+
+
+def _latency_summary(values: list) -> dict:
+    return {
+        "p50": _percentile(values, 50),
+        "p95": _percentile(values, 95),
+        "mean": round(sum(values) / len(values), 3) if values else None,
+    }
+
+
+def report(since: str = None, until: str = None) -> dict:
+    """
+    data/shadow.jsonl을 섀도 모델별로 요약
+
+    Returns:
+        {"enabled", "sample_rate", "queued", "dropped", "models": {모델: {compared, errors, agreement, latency_s, disagreements}}}
+    """
+    models = {}
+    if config.SHADOW_FILE.exists():
+        with open(config.SHADOW_FILE, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 쓰다가 멈춘 마지막 줄
+                if not timestamp_in_range(record.get("timestamp", ""), since, until):
+                    continue
+
+                entry = models.setdefault(record.get("shadow_model"), {
+                    "compared": 0, "errors": 0,
+                    "_agree": {field: [0, 0] for field in FIELDS + ("all",)},
+                    "_primary_latency": [], "_shadow_latency": [],
+                    "disagreements": deque(maxlen=20),
+                })
+                if "agree" not in record:
+                    entry["errors"] += 1
+                    continue
+
+                entry["compared"] += 1
+                for field, value in record["agree"].items():
+                    if value is not None:
+                        entry["_agree"][field][0] += int(value)
+                        entry["_agree"][field][1] += 1
+                if record["primary"].get("latency_s") is not None:
+                    entry["_primary_latency"].append(record["primary"]["latency_s"])
+                entry["_shadow_latency"].append(record["shadow"]["latency_s"])
+                if not record["agree"]["all"]:
+                    entry["disagreements"].append({
+                        key: record[key] for key in ("timestamp", "group_id", "filename", "primary", "shadow")
+                    })
+
+    summary = {}
+    for model, entry in models.items():
+        summary[model] = {
+            "compared": entry["compared"],
+            "errors": entry["errors"],
+            "agreement": {
+                field: {"rate": round(agreed / total, 4) if total else None, "count": total}
+                for field, (agreed, total) in entry["_agree"].items()
+            },
+            "latency_s": {
+                "primary": _latency_summary(entry["_primary_latency"]),
+                "shadow": _latency_summary(entry["_shadow_latency"]),
+            },
+            "disagreements": list(entry["disagreements"]),
+        }
+
+    dropped = sum(
+        value for key, value in metrics.SHADOW_REQUESTS.snapshot().items()
+        if dict(json.loads(key)).get("result") == "dropped"
+    )
+    return {
+        "enabled": enabled(),
+        "sample_rate": config.SHADOW_SAMPLE_RATE,
+        "queued": _queue.qsize() if _queue is not None else 0,
+        "dropped": dropped,
+        "models": summary,
+    }
@@ -0,0 +1,262 @@
+"""
+업로드 이미지 저장소
+
+업로드 원본을 날짜 + 내용 해시로 나눈 디렉토리에 저장합니다.
+
+    data/uploads/2026/10/18/ab/ab3f...e1.jpg
+                 ───날짜───  ─┬  ──sha256──
+                              └ 해시 앞 2자리 (한 디렉토리당 파일 수 제한)
+
+같은 날 같은 내용이 다시 올라오면 파일을 새로 쓰지 않습니다.
+보존 기간이 지난 날짜 디렉토리는 분석용 축소본(최대 1024px JPEG)으로 다시
+압축하거나 삭제하고, 디스크 할당량을 넘으면 오래된 날짜부터 정리합니다.
+축소본은 자기 내용 해시 + .jpg 이름으로 같은 날짜 아래에 저장하고, 원래 키 → 축소본
+키 대응을 날짜 디렉토리의 .derivatives.json에 남겨 resolve()가 옛 키도 찾아 줍니다.
+"""
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import config
+import log
+from models import resize_image
+
+
+logger = log.get_logger("storage")
+
+IMAGE_SUFFIXES = {".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif"}
+COMPACTED_MARKER = ".compacted"
+DERIVATIVES_FILE = ".derivatives.json"
+
+
+def save_upload(content: bytes, original_name: str, now: datetime = None) -> Path:
+    """
+    업로드 원본을 날짜/해시 샤드 경로에 저장
+
+    Args:
+        content: 파일 내용
+        original_name: 업로드된 원래 파일명 (확장자만 사용)
+        now: 저장 날짜 (기본: 현재 시각)
+
+    Returns:
+        저장된 파일 경로
+    """
+    now = now or datetime.now()
+    digest = hashlib.sha256(content).hexdigest()
+    suffix = Path(original_name or "").suffix.lower()
+    if suffix not in IMAGE_SUFFIXES:
+        suffix = ".img"
+
+    directory = config.UPLOAD_DIR / now.strftime("%Y/%m/%d") / digest[:2]
+    path = directory / f"{digest}{suffix}"
+    if path.exists():
+        return path
+
+    directory.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    return path
+
+
+def upload_key(path: Path) -> str:
+    """UPLOAD_DIR 기준 상대 경로 (결과에 저장하는 키)"""
+    return Path(path).relative_to(config.UPLOAD_DIR).as_posix()
+
+
+def resolve(key: str) -> Path:
+    """
+    저장 키를 실제 경로로 변환 (UPLOAD_DIR 밖으로 나가는 키는 거부)
+
+    Raises:
+        ValueError: 잘못된 키
+    """
+    path = (config.UPLOAD_DIR / key).resolve()
+    if config.UPLOAD_DIR.resolve() not in path.parents:
+        raise ValueError(f"잘못된 저장 키: {key}")
+    if not path.exists():
+        # 원본이 축소본으로 바뀌었으면 축소본 경로
+        derivative = _load_derivatives(path.parent.parent).get(upload_key(path))
+        if derivative:
+            return config.UPLOAD_DIR / derivative
+    return path
+
+
+def _load_derivatives(directory: Path) -> dict:
+    """날짜 디렉토리의 원래 키 → 축소본 키 대응"""
+    try:
+        with open(directory / DERIVATIVES_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _save_derivatives(directory: Path, derivatives: dict):
+    tmp_path = directory / f"{DERIVATIVES_FILE}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(derivatives, f, ensure_ascii=False)
+    os.replace(tmp_path, directory / DERIVATIVES_FILE)
+
+
+def _day_dirs():
+    """(날짜, 디렉토리) 목록을 오래된 순으로 반환"""
+    days = []
+    for year in sorted(config.UPLOAD_DIR.glob("[0-9][0-9][0-9][0-9]")):
+        for month in sorted(year.glob("[0-9][0-9]")):
+            for day in sorted(month.glob("[0-9][0-9]")):
+                try:
+                    date = datetime.strptime(f"{year.name}{month.name}{day.name}", "%Y%m%d")
+                except ValueError:
+                    continue
+                days.append((date, day))
+    return days
+
+
+def _dir_size(directory: Path) -> int:
+    return sum(path.stat().st_size for path in directory.rglob("*") if path.is_file())
+
+
+def _image_files(directory: Path):
+    for path in directory.rglob("*"):
+        if path.is_file() and not path.name.startswith("."):
+            yield path
+
+
+def _recompress_day(directory: Path) -> int:
+    """
+    날짜 디렉토리의 원본을 분석용 축소본으로 교체, 줄어든 바이트 수 반환
+
+    축소본을 <sha256>.jpg로 먼저 쓰고 대응표를 저장한 뒤에 원본을 지우므로,
+    중간에 멈춰도 원본이나 축소본 중 하나는 항상 남습니다.
+    """
+    saved = 0
+    derivatives = _load_derivatives(directory)
+    replaced = []
+    for path in list(_image_files(directory)):
+        try:
+            before = path.stat().st_size
+            derivative = resize_image(path)
+        except Exception as e:
+            logger.warning("storage.recompress_error", file=str(path), error=str(e))
+            continue
+        if len(derivative) >= before:
+            continue
+        digest = hashlib.sha256(derivative).hexdigest()
+        target = directory / digest[:2] / f"{digest}.jpg"
+        if target == path:
+            continue
+        target.parent.mkdir(exist_ok=True)
+        tmp_path = target.with_name(f".{target.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(derivative)
+        os.replace(tmp_path, target)
+        derivatives[upload_key(path)] = upload_key(target)
+        replaced.append(path)
+        saved += before - len(derivative)
+
+    if replaced:
+        _save_derivatives(directory, derivatives)
+        for path in replaced:
+            path.unlink(missing_ok=True)
+            try:
+                path.parent.rmdir()  # 비어 있는 해시 샤드 디렉토리
+            except OSError:
+                pass
+    (directory / COMPACTED_MARKER).touch()
+    return saved
+
+
+def _remove_day(directory: Path):
+    shutil.rmtree(directory, ignore_errors=True)
+    # 비어 있는 월/연 디렉토리 정리
+    for parent in (directory.parent, directory.parent.parent):
+        try:
+            parent.rmdir()
+        except OSError:
+            break
+
+
+def compact(now: datetime = None) -> dict:
+    """
+    보존 기간과 디스크 할당량에 맞춰 업로드 디렉토리 정리
+
+    - 보존 기간(UPLOAD_RETENTION_DAYS)이 지난 날짜: UPLOAD_RETENTION_MODE에 따라
+      recompress(축소본으로 교체) 또는 delete(삭제)
+    - 할당량(UPLOAD_QUOTA_MB) 초과: 오래된 날짜부터 축소 → 그래도 넘으면 삭제
+
+    Returns:
+        처리 요약 {recompressed_days, deleted_days, freed_bytes, total_bytes}
+    """
+    now = now or datetime.now()
+    summary = {"recompressed_days": 0, "deleted_days": 0, "freed_bytes": 0, "total_bytes": 0}
+    days = _day_dirs()
+
+    if config.UPLOAD_RETENTION_DAYS > 0:
+        cutoff = (now - timedelta(days=config.UPLOAD_RETENTION_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+        for date, directory in list(days):
+            if date >= cutoff:
+                break
+            if config.UPLOAD_RETENTION_MODE == "delete":
+                summary["freed_bytes"] += _dir_size(directory)
+                _remove_day(directory)
+                days.remove((date, directory))
+                summary["deleted_days"] += 1
+            elif not (directory / COMPACTED_MARKER).exists():
+                summary["freed_bytes"] += _recompress_day(directory)
+                summary["recompressed_days"] += 1
+
+    quota = config.UPLOAD_QUOTA_MB * 1024 * 1024
+    total = sum(_dir_size(directory) for _, directory in days)
+    if quota > 0 and total > quota:
+        # 가장 최근 날짜(오늘) 디렉토리는 남겨 둠
+        candidates = [directory for _, directory in days[:-1]]
+
+        # 1차: 오래된 날짜부터 축소본으로 교체
+        if config.UPLOAD_RETENTION_MODE != "delete":
+            for directory in candidates:
+                if total <= quota:
+                    break
+                if (directory / COMPACTED_MARKER).exists():
+                    continue
+                saved = _recompress_day(directory)
+                summary["recompressed_days"] += 1
+                summary["freed_bytes"] += saved
+                total -= saved
+
+        # 2차: 그래도 넘으면 오래된 날짜부터 삭제
+        for directory in candidates:
+            if total <= quota:
+                break
+            size = _dir_size(directory)
+            _remove_day(directory)
+            summary["deleted_days"] += 1
+            summary["freed_bytes"] += size
+            total -= size
+
+    summary["total_bytes"] = total
+    return summary
+
+
+def _compactor_loop():
+    while True:
+        try:
+            summary = compact()
+            logger.info("storage.compacted", **summary)
+        except Exception as e:
+            logger.error("storage.compact_error", exc_info=True, error=str(e))
+        time.sleep(config.UPLOAD_COMPACT_INTERVAL)
+
+
+def start_compactor():
+    """보존 기간이나 할당량이 설정된 경우 백그라운드 정리 스레드 시작"""
+    if config.UPLOAD_RETENTION_DAYS <= 0 and config.UPLOAD_QUOTA_MB <= 0:
+        return None
+    thread = threading.Thread(target=_compactor_loop, name="upload-compactor", daemon=True)
+    thread.start()
+    return thread
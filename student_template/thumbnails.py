@@ -0,0 +1,152 @@
+"""
+업로드 이미지 썸네일
+
+대시보드 결과 표에 보여줄 작은 미리보기를 처음 요청될 때 만들어 둡니다.
+
+- 메모리: 최근 썸네일을 THUMBNAIL_CACHE_MB 안에서 LRU로 보관
+- 디스크: data/thumbnails/<크기>/<해시 2자리>/<sha256>.<형식>
+- 원본 파일명이 내용 해시이므로 (저장 키, 크기, 형식)이 같으면 내용도 같음
+  → ETag로 그대로 쓰고 브라우저에는 오래 캐시하도록 응답
+
+같은 썸네일을 동시에 요청해도 원본 디코딩은 한 번만 합니다.
+"""
+import os
+import threading
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+
+from PIL import Image
+
+import config
+import log
+import storage
+
+
+logger = log.get_logger("thumbnails")
+
+FORMATS = {"webp": "image/webp", "jpeg": "image/jpeg"}
+SIZES = (80, 160, 320)
+
+_cache = OrderedDict()  # (key, size, fmt) -> bytes
+_cache_bytes = 0
+_cache_lock = threading.Lock()
+_inflight = {}  # (key, size, fmt) -> Lock (생성 중인 썸네일)
+
+
+def etag(key: str, size: int, fmt: str) -> str:
+    """저장 키의 내용 해시로 만든 ETag (원본을 읽지 않음)"""
+    return f'"{Path(key).stem}-{size}.{fmt}"'
+
+
+def _disk_path(key: str, size: int, fmt: str) -> Path:
+    digest = Path(key).stem
+    return config.THUMBNAIL_DIR / str(size) / digest[:2] / f"{digest}.{fmt}"
+
+
+def _cache_get(cache_key):
+    with _cache_lock:
+        data = _cache.get(cache_key)
+        if data is not None:
+            _cache.move_to_end(cache_key)
+        return data
+
+
+def _cache_put(cache_key, data: bytes):
+    global _cache_bytes
+    limit = config.THUMBNAIL_CACHE_MB * 1024 * 1024
+    if len(data) > limit:
+        return
+    with _cache_lock:
+        if cache_key in _cache:
+            return
+        _cache[cache_key] = data
+        _cache_bytes += len(data)
+        while _cache_bytes > limit:
+            _, evicted = _cache.popitem(last=False)
+            _cache_bytes -= len(evicted)
+
+
+def _render(source: Path, size: int, fmt: str) -> bytes:
+    img = Image.open(source)
+    # JPEG는 디코딩 단계에서 축소 (전체 해상도로 풀지 않음)
+    img.draft("RGB", (size, size))
+    img = img.convert("RGB")
+    img.thumbnail((size, size), Image.Resampling.LANCZOS)
+
+    buffer = BytesIO()
+    if fmt == "webp":
+        img.save(buffer, format="WEBP", quality=75, method=4)
+    else:
+        img.save(buffer, format="JPEG", quality=80, optimize=True)
+    return buffer.getvalue()
+
+
+def check(key: str, size: int, fmt: str) -> Path:
+    """
+    요청 확인 (원본을 디코딩하지 않음, ETag 비교 전에 호출)
+
+    Returns:
+        원본 경로
+
+    Raises:
+        ValueError: 잘못된 키, 크기, 형식
+        FileNotFoundError: 원본도 만들어 둔 썸네일도 없음
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+    if size not in SIZES:
+        raise ValueError(f"지원하지 않는 크기: {size} ({', '.join(map(str, SIZES))})")
+    source = storage.resolve(key)
+    if not source.exists() and _cache_get((key, size, fmt)) is None and not _disk_path(key, size, fmt).exists():
+        raise FileNotFoundError(key)
+    return source
+
+
+def get(key: str, size: int = 160, fmt: str = "webp") -> bytes:
+    """
+    썸네일 바이트 (메모리 → 디스크 → 원본에서 생성 순서로 조회)
+
+    Args:
+        key: 업로드 저장 키 (results의 upload_key)
+        size: 긴 변 픽셀 (SIZES 중 하나)
+        fmt: webp / jpeg
+
+    Raises:
+        ValueError: 잘못된 키, 크기, 형식
+        FileNotFoundError: 원본이 없음
+    """
+    source = check(key, size, fmt)
+
+    cache_key = (key, size, fmt)
+    data = _cache_get(cache_key)
+    if data is not None:
+        return data
+
+    with _cache_lock:
+        lock = _inflight.setdefault(cache_key, threading.Lock())
+
+    with lock:
+        data = _cache_get(cache_key)
+        if data is not None:
+            return data
+
+        path = _disk_path(key, size, fmt)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            if not source.exists():
+                raise
+            data = _render(source, size, fmt)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            logger.debug("thumbnail.created", key=key, size=size, format=fmt, bytes=len(data))
+
+        _cache_put(cache_key, data)
+
+    with _cache_lock:
+        _inflight.pop(cache_key, None)
+    return data
@@ -0,0 +1,151 @@
+"""
+이미지별 추적(trace)
+
+/upload에서 이미지마다 trace ID를 발급하고, 큐 대기 → 그룹 대기 → 리사이즈 →
+base64 → Vision API → JSON 파싱 → 결과 저장까지의 구간(span)을 기록합니다.
+그룹 분석이 끝나면 그룹의 모든 span을 OTLP 호환 JSON 한 줄로
+data/traces.jsonl에 추가합니다.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+import config
+
+
+SERVICE_NAME = "motorchecker"
+
+# 여러 이미지에서 겹치는 대기/저장 구간은 합계 대신 최댓값으로 요약
+OVERLAPPING_SPANS = {"upload", "queue_wait", "group_wait", "commit"}
+
+_write_lock = threading.Lock()
+
+
+def _new_span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list:
+    return [
+        {"key": key, "value": _otlp_value(value)}
+        for key, value in attributes.items()
+        if value is not None
+    ]
+
+
+class Trace:
+    """이미지 한 장의 trace (루트 span + 하위 span 목록)"""
+
+    def __init__(self, trace_id: str = None, start_ns: int = None, **attributes):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.root_span_id = _new_span_id()
+        self.start_ns = start_ns or time.time_ns()
+        self.attributes = attributes
+        self.spans = []
+
+    def add_span(self, name: str, start_ns: int, end_ns: int, parent_span_id: str = None,
+                 error: str = None, span_id: str = None, **attributes) -> str:
+        """이미 측정된 구간을 span으로 추가"""
+        span_id = span_id or _new_span_id()
+        span = {
+            "traceId": self.trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent_span_id or self.root_span_id,
+            "name": name,
+            "kind": 1,
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(end_ns),
+            "attributes": _otlp_attributes(attributes),
+        }
+        if error:
+            span["status"] = {"code": 2, "message": error}
+        self.spans.append(span)
+        return span_id
+
+    @contextmanager
+    def span(self, name: str, parent_span_id: str = None, **attributes):
+        """with 블록 구간을 span으로 기록 (예외 발생 시 오류 상태로 기록)"""
+        span_id = _new_span_id()
+        start_ns = time.time_ns()
+        error = None
+        try:
+            yield span_id
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.add_span(name, start_ns, time.time_ns(), parent_span_id, error, span_id, **attributes)
+
+    def finish(self) -> list:
+        """루트 span을 닫고 전체 span 목록 반환"""
+        root = {
+            "traceId": self.trace_id,
+            "spanId": self.root_span_id,
+            "name": "image",
+            "kind": 1,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(time.time_ns()),
+            "attributes": _otlp_attributes(self.attributes),
+        }
+        return [root] + self.spans
+
+
+def summarize(traces: list) -> dict:
+    """
+    그룹 결과에 저장할 trace 요약
+
+    Returns:
+        {"trace_ids": [...], "stages_ms": {span 이름: ms}}
+        순차 구간은 이미지별 합계, 겹치는 대기 구간은 최댓값
+    """
+    stages = {}
+    for trace in traces:
+        for span in trace.spans:
+            name = span["name"]
+            duration = (int(span["endTimeUnixNano"]) - int(span["startTimeUnixNano"])) / 1e6
+            if name in OVERLAPPING_SPANS:
+                stages[name] = max(stages.get(name, 0.0), duration)
+            else:
+                stages[name] = stages.get(name, 0.0) + duration
+    return {
+        "trace_ids": [trace.trace_id for trace in traces],
+        "stages_ms": {name: round(ms, 1) for name, ms in stages.items()},
+    }
+
+
+def export(traces: list, scope: str = "worker"):
+    """그룹의 trace들을 OTLP JSON(ExportTraceServiceRequest) 한 줄로 추가"""
+    if not config.TRACING_ENABLED:
+        return
+
+    spans = []
+    for trace in traces:
+        spans.extend(trace.finish())
+
+    payload = {
+        "resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{
+                "scope": {"name": f"{SERVICE_NAME}.{scope}"},
+                "spans": spans,
+            }],
+        }]
+    }
+    line = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    config.ensure_dirs()
+    with _write_lock:
+        with open(config.TRACES_FILE, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
@@ -4,50 +4,64 @@
 3개씩 이미지를 그룹으로 묶어 분석하고,
 스티커가 있는 이미지를 찾아 불량 수준을 판정합니다.
 """
+import base64
 import json
+import threading
+import time
 from datetime import datetime
 from pathlib import Path
 from queue import Queue
 
-from openai import OpenAI
-
+import backend
 import config
+import log
+import metrics
+import result_index
+import rollups
+import shadow
+import tracing
 from models import (
     file_lock,
     load_results_unsafe,
-    encode_image,
+    append_group_log_unsafe,
+    next_group_id,
+    resize_image,
     determine_defect_level
 )
 
 
-# OpenAI API를 사용할 때는 base_url이 기본값이면 설정하지 않음
-if config.API_BASE_URL == "https://api.openai.com/v1":
-    client = OpenAI(api_key=config.API_KEY)
-else:
-    # 커스텀 GPU 서버를 사용할 때만 base_url 설정
-    client = OpenAI(
-        base_url=config.API_BASE_URL,
-        api_key=config.API_KEY
-    )
+logger = log.get_logger("worker")
 
+# Vision API 클라이언트 (첫 분석 때 생성, import 시간을 줄이기 위해 지연)
+client = None
+_client_lock = threading.Lock()
 
-# 전역 큐 (app.py에서 이미지를 추가)
-image_queue = Queue()
 
+def get_client():
+    """OpenAI 호환 클라이언트 (처음 호출할 때 생성)"""
+    global client
+    if client is None:
+        with _client_lock:
+            if client is None:
+                from openai import OpenAI
 
-def analyze_sticker(image_path: Path) -> dict:
-    """
-    Vision Model API를 사용하여 이미지에서 스티커 정보 추출
+                # OpenAI API를 사용할 때는 base_url이 기본값이면 설정하지 않음
+                if config.API_BASE_URL == "https://api.openai.com/v1":
+                    client = OpenAI(api_key=config.API_KEY)
+                else:
+                    # 커스텀 GPU 서버를 사용할 때만 base_url 설정
+                    client = OpenAI(
+                        base_url=config.API_BASE_URL,
+                        api_key=config.API_KEY
+                    )
+    return client
 
-    Args:
-        image_path: 분석할 이미지 경로
 
-    Returns:
-        스티커 정보 딕셔너리 {has_sticker, number, color}
-    """
-    base64_image = encode_image(image_path)
+# 전역 큐 (app.py에서 이미지를 추가)
+image_queue = Queue()
+metrics.QUEUE_DEPTH.set_function(image_queue.qsize)
 
-    prompt = """
+STICKER_PROMPT = """
     이 이미지를 분석해주세요:
     1. 스티커가 있습니까? (예/아니오)
     2. 스티커가 있다면:
@@ -62,52 +76,119 @@ def analyze_sticker(image_path: Path) -> dict:
     }
     """
 
-    try:
-        response = client.chat.completions.create(
-            model=config.MODEL_NAME,
-            messages=[
+
+def build_messages(base64_image: str) -> list:
+    """스티커 분석 요청 메시지 (섀도 모델 비교에서도 같은 프롬프트 사용)"""
+    return [
+        {
+            "role": "system",
+            "content": "당신은 이미지 분석 전문가입니다. 스티커 정보를 정확히 추출하여 JSON 형식으로만 응답하세요."
+        },
+        {
+            "role": "user",
+            "content": [
                 {
-                    "role": "system",
-                    "content": "당신은 이미지 분석 전문가입니다. 스티커 정보를 정확히 추출하여 JSON 형식으로만 응답하세요."
+                    "type": "text",
+                    "text": STICKER_PROMPT
                 },
                 {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
+                    "type": "image_url",
+                    "image_url": {
+                        "url": f"data:image/jpeg;base64,{base64_image}"
+                    }
                 }
-            ],
-            max_tokens=150,
-            temperature=0.1
-        )
+            ]
+        }
+    ]
 
-        result_text = response.choices[0].message.content.strip()
-        print(f"[DEBUG] API 응답: {result_text}")
 
-        if "```json" in result_text:
-            result_text = result_text.split("```json")[1].split("```")[0].strip()
-        elif "```" in result_text:
-            result_text = result_text.split("```")[1].strip()
+def parse_sticker_json(result_text: str) -> dict:
+    """모델 응답에서 JSON 추출 (```json 코드 블록 허용)"""
+    if "```json" in result_text:
+        result_text = result_text.split("```json")[1].split("```")[0].strip()
+    elif "```" in result_text:
+        result_text = result_text.split("```")[1].strip()
+    return json.loads(result_text)
+
+
+def analyze_sticker(image_path: Path, trace: tracing.Trace = None, parent_span_id: str = None,
+                    model: str = None, lane: str = "live") -> dict:
+    """
+    Vision Model API를 사용하여 이미지에서 스티커 정보 추출
 
-        result = json.loads(result_text)
+    Args:
+        image_path: 분석할 이미지 경로
+        trace: 구간을 기록할 이미지 trace (없으면 기록하지 않음)
+        parent_span_id: 상위 span ID
+        model: 사용할 모델 (기본 config.MODEL_NAME)
+        lane: Vision API 슬롯 우선순위 (live / backfill)
+
+    Returns:
+        스티커 정보 딕셔너리 {has_sticker, number, color}
+    """
+    if trace is None:
+        trace = tracing.Trace()
+
+    with metrics.PREPROCESS_SECONDS.time():
+        with trace.span("resize", parent_span_id):
+            image_bytes = resize_image(image_path)
+        with trace.span("base64", parent_span_id, bytes=len(image_bytes)):
+            base64_image = base64.b64encode(image_bytes).decode('utf-8')
+
+    model = model or config.MODEL_NAME
+    stage = "vlm_request"
+    try:
+        with backend.slots.acquire(lane), metrics.VLM_INFLIGHT.track_inprogress(), \
+                metrics.VLM_REQUEST_SECONDS.time(), trace.span("vlm_request", parent_span_id, model=model, lane=lane):
+            response = get_client().chat.completions.create(
+                model=model,
+                messages=build_messages(base64_image),
+                max_tokens=150,
+                temperature=0.1
+            )
+
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics.VLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+            metrics.VLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+
+        result_text = response.choices[0].message.content.strip()
+        logger.debug("vlm.response", text=result_text)
+
+        stage = "json_parse"
+        with metrics.JSON_PARSE_SECONDS.time(), trace.span("json_parse", parent_span_id):
+            result = parse_sticker_json(result_text)
         return result
 
     except Exception as e:
-        import traceback
-        print(f"분석 오류: {e}")
-        print(f"상세 오류:\n{traceback.format_exc()}")
+        metrics.ERRORS.inc(type=stage)
+        logger.error("vlm.error", exc_info=True, stage=stage, image=image_path.name, error=str(e))
         return {"has_sticker": False, "number": None, "color": None, "error": str(e)}
 
 
+def group_verdict(results: list) -> dict:
+    """
+    이미지별 결과로 그룹 판정
+
+    Returns:
+        {sticker_info, defect_level, status} (스티커가 여러 장이면 마지막 이미지 기준)
+    """
+    sticker_found = None
+    for result in results:
+        if result.get("has_sticker"):
+            sticker_found = {
+                "filename": result["filename"],
+                "upload_key": result.get("upload_key"),
+                "number": result.get("sticker_number"),
+                "color": result.get("sticker_color")
+            }
+    return {
+        "sticker_info": sticker_found,
+        "defect_level": determine_defect_level(sticker_found["color"]) if sticker_found else None,
+        "status": "정상" if len(results) == 3 and sticker_found else "오류",
+    }
+
+
 def analyze_image_group(images: list) -> dict:
     """
     3개 이미지 그룹을 분석하여 스티커가 있는 이미지 찾기
@@ -118,58 +199,77 @@ def analyze_image_group(images: list) -> dict:
     Returns:
         그룹 분석 결과 딕셔너리
     """
-    # 그룹 ID 생성 (락 사용)
-    with file_lock:
-        data = load_results_unsafe()
-        group_id = len(data.get("groups", [])) + 1
+    started = time.perf_counter()
+
+    # 그룹 ID 발급 (여러 그룹을 동시에 분석해도 겹치지 않음)
+    group_id = next_group_id()
 
-    print(f"\n[그룹 {group_id} 분석 시작] 이미지 {len(images)}개")
+    logger.info("group.start", group_id=group_id, images=len(images))
 
     results = []
-    sticker_found = None
+
+    # 업로드 없이 들어온 이미지는 여기서 trace 시작
+    traces = [img_info.setdefault("trace", tracing.Trace(filename=img_info['filename'])) for img_info in images]
 
     # 각 이미지 분석
     for idx, img_info in enumerate(images):
-        print(f"  이미지 {idx+1}/{len(images)}: {img_info['filename']} 분석 중...")
+        logger.debug("group.image", group_id=group_id, index=idx + 1, filename=img_info['filename'])
+        trace = traces[idx]
 
         try:
-            sticker_info = analyze_sticker(Path(img_info['path']))
+            with trace.span("analyze_sticker", group_id=group_id) as sticker_span:
+                sticker_info = analyze_sticker(Path(img_info['path']), trace, sticker_span)
 
             if sticker_info["has_sticker"]:
-                sticker_found = {
-                    "filename": img_info['filename'],
-                    "number": sticker_info.get("number"),
-                    "color": sticker_info.get("color")
-                }
-                print(f"    ✓ 스티커 발견! (번호: {sticker_info.get('number')}, 색: {sticker_info.get('color')})")
+                logger.debug(
+                    "group.sticker_found",
+                    group_id=group_id,
+                    filename=img_info['filename'],
+                    number=sticker_info.get('number'),
+                    color=sticker_info.get('color')
+                )
 
             results.append({
                 "filename": img_info['filename'],
+                "upload_key": img_info.get('upload_key'),
+                "trace_id": trace.trace_id,
                 "has_sticker": sticker_info["has_sticker"],
                 "sticker_number": sticker_info.get("number"),
-                "sticker_color": sticker_info.get("color")
+                "sticker_color": sticker_info.get("color"),
+                # Vision API 호출/응답 파싱 실패 (스티커 없음과 구분)
+                **({"error": sticker_info["error"]} if "error" in sticker_info else {}),
             })
 
         except Exception as e:
-            print(f"    ✗ 분석 오류: {e}")
+            metrics.ERRORS.inc(type="preprocess")
+            logger.error("group.image_error", exc_info=True, group_id=group_id, filename=img_info['filename'], error=str(e))
             results.append({
                 "filename": img_info['filename'],
+                "upload_key": img_info.get('upload_key'),
+                "trace_id": trace.trace_id,
                 "has_sticker": False,
                 "error": str(e)
             })
 
     # 그룹 결과 구성
+    verdict = group_verdict(results)
+    sticker_found = verdict["sticker_info"]
     group_result = {
         "group_id": group_id,
         "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
         "images": results,
         "sticker_info": sticker_found,
-        "defect_level": determine_defect_level(sticker_found["color"]) if sticker_found else None,
-        "status": "정상" if len(results) == 3 and sticker_found else "오류"
+        "defect_level": verdict["defect_level"],
+        "status": verdict["status"],
+        "analysis_time": round(time.perf_counter() - started, 3),
+        "trace": tracing.summarize(traces)
     }
 
+    metrics.GROUPS.inc(status="ok" if group_result["status"] == "정상" else "error")
+
     # 결과 저장
-    with file_lock:
+    commit_start_ns = time.time_ns()
+    with file_lock, metrics.STORE_COMMIT_SECONDS.time():
         data = load_results_unsafe()
         if "groups" not in data:
             data["groups"] = []
@@ -185,6 +285,7 @@ def analyze_image_group(images: list) -> dict:
                 "id": len(data["results"]) + 1,
                 "timestamp": group_result["timestamp"],
                 "filename": sticker_found["filename"],
+                "upload_key": sticker_found["upload_key"],
                 "group_id": group_id,
                 "has_sticker": True,
                 "sticker_number": sticker_found["number"],
@@ -195,7 +296,31 @@ def analyze_image_group(images: list) -> dict:
         with open(config.RESULTS_FILE, "w", encoding="utf-8") as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
-    print(f"[그룹 {group_id} 완료] 불량 수준: {group_result['defect_level']}\n")
+        # 잠금 대기 + results.json 저장을 commit으로 기록하고 요약을 다시 계산
+        # (그룹 로그에는 commit이 포함된 요약이 들어감)
+        commit_end_ns = time.time_ns()
+        for trace in traces:
+            trace.add_span("commit", commit_start_ns, commit_end_ns, group_id=group_id)
+        group_result["trace"] = tracing.summarize(traces)
+
+        # 내보내기용 추가 전용 로그
+        append_group_log_unsafe(group_result, data)
+
+        # 분/시간/일 롤업 갱신 (대시보드 차트용)
+        rollups.record_group(group_result, group_result["analysis_time"], store_data=data)
+
+    result_index.record_group(group_result)
+    # 후보 모델 비교용 샘플 (켜져 있을 때만, 대기열에 넣기만 함)
+    shadow.submit(group_id, images, results, traces)
+    tracing.export(traces)
+
+    logger.info(
+        "group.done",
+        group_id=group_id,
+        status=group_result["status"],
+        defect_level=group_result["defect_level"],
+        analysis_time=group_result["analysis_time"]
+    )
 
     return group_result
 
@@ -206,8 +331,7 @@ def background_worker():
 
     큐에서 이미지를 가져와서 3개가 모이면 분석을 시작합니다.
     """
-    import traceback
-    print("[워커 시작] 이미지 분석 백그라운드 워커 실행 중...")
+    logger.info("worker.start")
 
     pending_images = []
 
@@ -215,26 +339,34 @@ def background_worker():
         try:
             # 큐에서 이미지 가져오기 (1초 타임아웃)
             img_info = image_queue.get(timeout=1)
+            img_info["dequeued_ns"] = time.time_ns()
+            trace = img_info.get("trace")
+            if trace is not None:
+                trace.add_span("queue_wait", img_info["enqueued_ns"], img_info["dequeued_ns"])
             pending_images.append(img_info)
 
-            print(f"[워커] 이미지 수신: {img_info['filename']} | 대기 중: {len(pending_images)}/3")
+            logger.debug("worker.image_received", filename=img_info['filename'], pending=len(pending_images))
 
             # 3개가 모이면 분석 시작
             if len(pending_images) >= 3:
-                print(f"[워커] 3개 모임! 분석 시작...")
                 group = pending_images[:3]
                 pending_images = pending_images[3:]
 
+                # 세 번째 이미지를 기다린 시간
+                grouped_ns = time.time_ns()
+                for member in group:
+                    if member.get("trace") is not None:
+                        member["trace"].add_span("group_wait", member["dequeued_ns"], grouped_ns)
+
                 try:
                     analyze_image_group(group)
                 except Exception as analysis_error:
-                    print(f"[워커 분석 오류] {analysis_error}")
-                    print(traceback.format_exc())
+                    metrics.ERRORS.inc(type="worker")
+                    logger.error("worker.analysis_error", exc_info=True, error=str(analysis_error))
 
         except Exception as e:
             # 타임아웃은 정상 (큐가 비어있음)
             error_type = str(type(e).__name__)
             if "Empty" not in error_type:
-                print(f"[워커 큐 오류] {error_type}: {e}")
-                print(traceback.format_exc())
+                logger.error("worker.queue_error", exc_info=True, error_type=error_type, error=str(e))
             continue
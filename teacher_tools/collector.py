@@ -0,0 +1,391 @@
+"""
+학생 서버 결과 수집 / 채점
+
+student_apis.json의 모든 학생 서버에서 GET /export?format=jsonl (그룹 결과 이력)을
+동시에 받아 정답 라벨 CSV(runpod/labels.csv 형식)와 비교합니다.
+
+- 이미지별: 스티커 유무 정확도, 색/번호 정확도 (정답에 스티커가 있는 이미지만)
+- 그룹별: 불량 수준 혼동 행렬 (그룹 이미지가 모두 라벨에 있을 때만,
+  정답 불량 수준은 학생 서버와 같은 규칙 - 스티커가 있는 마지막 이미지의 색)
+
+응답은 한 줄씩 읽으면서 바로 집계하므로 학생 서버마다 결과가 많아도 메모리가 늘지 않고,
+학생 서버별 ETag와 집계 결과를 캐시 파일에 남겨 두었다가 다음 실행 때 If-None-Match로
+요청하므로, 결과가 바뀌지 않은 서버는 304만 받고 다시 채점하지 않습니다.
+
+    python collector.py --labels ../runpod/labels.csv
+    python collector.py --since "2026-10-18 09:00" --output grades.json
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import json
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import aiohttp
+from tqdm import tqdm
+
+import config
+import loadgen
+from image_sender import load_students
+from result_log import student_key
+
+
+FIELDS = ['has_sticker', 'color', 'number', 'defect_level']
+NO_STICKER = '스티커 없음'
+DEFECT_LEVELS = {'초록색': '정상', '노란색': '경미한 불량', '빨간색': '심각한 불량'}
+COLOR_ALIASES = {
+    '초': '초록색', '초록': '초록색', 'green': '초록색',
+    '노': '노란색', '노랑': '노란색', 'yellow': '노란색',
+    '빨': '빨간색', '빨강': '빨간색', 'red': '빨간색',
+}
+# 학생 서버가 저장할 때 붙이는 업로드 시각 (예: 20261018_093015_123456_20240817_000108.jpg)
+UPLOAD_PREFIX = re.compile(r'^\d{8}_\d{6}_\d{6}_')
+
+
+def normalize_color(value) -> str:
+    value = str(value or '').strip()
+    if not value:
+        return None
+    return COLOR_ALIASES.get(value.lower(), value)
+
+
+def normalize_number(value) -> str:
+    digits = ''.join(ch for ch in str(value or '') if ch.isdigit())
+    return digits or None
+
+
+def defect_level(color) -> str:
+    if color is None:
+        return NO_STICKER
+    return DEFECT_LEVELS.get(normalize_color(color), '미확인')
+
+
+def load_labels(labels_file: Path) -> Dict[str, Dict]:
+    """
+    라벨 CSV 읽기 → {원본 파일명: {has_sticker, color, number}}
+
+    has_sticker가 비어 있는 행(아직 라벨링하지 않은 행)과 # 주석 행은 건너뜁니다.
+    """
+    labels = {}
+    with open(labels_file, 'r', encoding='utf-8') as f:
+        rows = (line for line in f if not line.lstrip().startswith('#'))
+        for row in csv.DictReader(rows):
+            image = (row.get('image') or '').strip()
+            has_sticker = (row.get('has_sticker') or '').strip().lower()
+            if not image or not has_sticker:
+                continue
+            has = has_sticker in {'1', 'true', 't', 'yes', 'y', 'o'}
+            labels[Path(image).name] = {
+                'has_sticker': has,
+                'color': normalize_color(row.get('color')) if has else None,
+                'number': normalize_number(row.get('number')) if has else None,
+            }
+    return labels
+
+
+def original_name(filename: str) -> str:
+    """학생 서버의 저장 파일명 → 보낸 이미지 파일명"""
+    return UPLOAD_PREFIX.sub('', filename or '', count=1)
+
+
+class Grade:
+    """학생 한 명의 채점 누적값"""
+
+    def __init__(self):
+        self.groups = 0
+        self.images = 0
+        self.unlabeled = 0
+        self.errors = 0
+        self.bad_lines = 0
+        self.correct = {field: 0 for field in FIELDS}
+        self.graded = {field: 0 for field in FIELDS}
+        self.confusion = {}
+
+    def _score(self, field: str, ok: bool):
+        self.graded[field] += 1
+        self.correct[field] += int(ok)
+
+    def add_line(self, line: bytes, labels: Dict[str, Dict]):
+        """내보내기 한 줄 채점 (JSON 그룹이 아닌 줄은 세기만 하고 건너뜀)"""
+        try:
+            group = json.loads(line)
+        except ValueError:
+            group = None
+        if not isinstance(group, dict):
+            self.bad_lines += 1
+            return
+        self.add_group(group, labels)
+
+    def add_group(self, group: Dict, labels: Dict[str, Dict]):
+        self.groups += 1
+        truth_sticker = None
+        all_labeled = True
+        for image in group.get('images', []):
+            self.images += 1
+            label = labels.get(original_name(image.get('filename')))
+            if label is None:
+                self.unlabeled += 1
+                all_labeled = False
+                continue
+            if 'error' in image:
+                self.errors += 1
+            if label['has_sticker']:
+                truth_sticker = label
+            self._score('has_sticker', bool(image.get('has_sticker')) == label['has_sticker'])
+            if label['has_sticker']:
+                self._score('color', normalize_color(image.get('sticker_color')) == label['color'])
+                self._score('number', normalize_number(image.get('sticker_number')) == label['number'])
+
+        if all_labeled and group.get('images'):
+            expected = defect_level(truth_sticker['color']) if truth_sticker else NO_STICKER
+            predicted = group.get('defect_level') or NO_STICKER
+            self._score('defect_level', expected == predicted)
+            key = f'{expected}|{predicted}'
+            self.confusion[key] = self.confusion.get(key, 0) + 1
+
+    def accuracy(self, field: str):
+        return round(self.correct[field] / self.graded[field], 4) if self.graded[field] else None
+
+    def to_dict(self) -> Dict:
+        return {
+            'groups': self.groups,
+            'images': self.images,
+            'unlabeled': self.unlabeled,
+            'errors': self.errors,
+            'bad_lines': self.bad_lines,
+            'correct': self.correct,
+            'graded': self.graded,
+            'accuracy': {field: self.accuracy(field) for field in FIELDS},
+            'confusion': self.confusion,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'Grade':
+        grade = cls()
+        for key in ('groups', 'images', 'unlabeled', 'errors', 'correct', 'graded', 'confusion'):
+            setattr(grade, key, data[key])
+        grade.bad_lines = data.get('bad_lines', 0)
+        return grade
+
+
+async def collect(session: aiohttp.ClientSession, student: Dict, labels: Dict[str, Dict],
+                  params: Dict, cached: Dict = None) -> Dict:
+    """
+    학생 서버 하나의 결과를 받아 채점
+
+    Returns:
+        {ok, status_code, grade, etag, cached, latency_ms} 또는 {ok: False, error}
+    """
+    started = time.perf_counter()
+    headers = {'If-None-Match': cached['etag']} if cached and cached.get('etag') else {}
+    try:
+        async with session.get(f"{student['api_url']}/export", params=params, headers=headers) as response:
+            if response.status == 304 and cached:
+                result = {'ok': True, 'status_code': 304, 'grade': Grade.from_dict(cached['grade']),
+                          'etag': cached['etag'], 'cached': True}
+            elif response.status == 200:
+                grade = Grade()
+                # 그룹 한 줄이 길 수 있어 readline 대신 청크를 직접 줄로 나눔
+                buffer = b''
+                async for chunk in response.content.iter_chunked(1 << 16):
+                    *lines, buffer = (buffer + chunk).split(b'\n')
+                    for line in lines:
+                        if line.strip():
+                            grade.add_line(line, labels)
+                if buffer.strip():
+                    grade.add_line(buffer, labels)
+                result = {'ok': True, 'status_code': 200, 'grade': grade,
+                          'etag': response.headers.get('ETag'), 'cached': False}
+            else:
+                await response.read()
+                result = {'ok': False, 'status_code': response.status, 'error': f'HTTP {response.status}'}
+    except asyncio.TimeoutError:
+        result = {'ok': False, 'error': f'No data for {session.timeout.sock_read} seconds'}
+    except aiohttp.ClientConnectionError:
+        result = {'ok': False, 'error': loadgen.CONNECTION_ERROR}
+    except Exception as e:
+        result = {'ok': False, 'error': str(e)}
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+def create_session(max_connections: int, read_timeout: float) -> aiohttp.ClientSession:
+    """
+    수집용 세션 (전체 시간 제한 없이, 응답이 read_timeout초 동안 멈추면 실패)
+
+    결과가 많은 서버는 내보내기 전체가 오래 걸릴 수 있으므로 응답 전체가 아니라
+    데이터가 오는 간격만 제한합니다.
+    """
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=1)
+    client_timeout = aiohttp.ClientTimeout(total=None, sock_connect=min(read_timeout, config.CONNECT_TIMEOUT),
+                                           sock_read=read_timeout)
+    return aiohttp.ClientSession(connector=connector, timeout=client_timeout)
+
+
+async def collect_all(students: List[Dict], labels: Dict[str, Dict], params: Dict, cache: Dict,
+                      timeout: float = config.COLLECT_TIMEOUT, max_connections: int = 1000) -> List[Dict]:
+    """모든 학생 서버에서 동시에 수집 (학생 순서대로 결과 반환)"""
+    async with create_session(max_connections, timeout) as session:
+        with tqdm(total=len(students), desc='수집 중') as progress:
+            async def one(student):
+                result = await collect(session, student, labels, params, cache.get(student_key(student)))
+                progress.update(1)
+                return result
+
+            return list(await asyncio.gather(*[one(student) for student in students]))
+
+
+def labels_fingerprint(labels_file: Path, params: Dict) -> str:
+    """라벨 파일이나 조회 구간이 바뀌면 캐시를 쓰지 않도록"""
+    digest = hashlib.sha1(labels_file.read_bytes())
+    digest.update(json.dumps(params, sort_keys=True).encode())
+    return digest.hexdigest()
+
+
+def load_cache(cache_file: Path, fingerprint: str) -> Dict:
+    if not cache_file.exists():
+        return {}
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+    except ValueError:
+        return {}
+    return data.get('targets', {}) if data.get('fingerprint') == fingerprint else {}
+
+
+def save_cache(cache_file: Path, fingerprint: str, students: List[Dict], results: List[Dict]):
+    targets = {
+        student_key(student): {'etag': result['etag'], 'grade': result['grade'].to_dict()}
+        for student, result in zip(students, results)
+        if result['ok'] and result.get('etag')
+    }
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump({'fingerprint': fingerprint, 'targets': targets}, f, ensure_ascii=False)
+
+
+def _pct(value) -> str:
+    return f"{value * 100:.1f}%" if value is not None else '-'
+
+
+def print_grades(students: List[Dict], results: List[Dict]):
+    print("\n" + "="*70)
+    print("채점 결과 (정확도)")
+    print("="*70)
+    print(f"{'학생':<16} {'그룹':>6} {'이미지':>7} {'스티커':>8} {'색':>8} {'번호':>8} {'불량수준':>8}")
+    for student, result in zip(students, results):
+        if not result['ok']:
+            print(f"{student['name']:<16} 수집 실패: {result['error']}")
+            continue
+        grade = result['grade']
+        print(
+            f"{student['name']:<16} {grade.groups:>6} {grade.images - grade.unlabeled:>3}/{grade.images:<4}"
+            + ''.join(f" {_pct(grade.accuracy(field)):>8}" for field in FIELDS)
+            + (' (캐시)' if result['cached'] else '')
+            + (f" (잘못된 줄 {grade.bad_lines}개 건너뜀)" if grade.bad_lines else '')
+        )
+    print("(이미지: 라벨이 있는 이미지/전체, 색/번호는 정답에 스티커가 있는 이미지만)")
+
+
+def fleet_confusion(results: List[Dict]) -> Dict[str, Dict[str, int]]:
+    """전체 학생의 불량 수준 혼동 행렬 {정답: {예측: 그룹 수}}"""
+    matrix = {}
+    for result in results:
+        if not result['ok']:
+            continue
+        for key, count in result['grade'].confusion.items():
+            expected, predicted = key.split('|')
+            row = matrix.setdefault(expected, {})
+            row[predicted] = row.get(predicted, 0) + count
+    return matrix
+
+
+def print_confusion(matrix: Dict[str, Dict[str, int]]):
+    levels = list(DEFECT_LEVELS.values()) + [NO_STICKER]
+    extra = sorted({level for row in matrix.values() for level in row} - set(levels))
+    columns = levels + extra
+    print("\n불량 수준 혼동 행렬 (전체 학생, 행: 정답, 열: 학생 서버 판정, 단위: 그룹)")
+    print(f"{'':<12}" + ''.join(f"{level:>12}" for level in columns))
+    for expected in levels:
+        row = matrix.get(expected, {})
+        print(f"{expected:<12}" + ''.join(f"{row.get(level, 0):>12}" for level in columns))
+
+
+def save_grades(output_file: Path, students: List[Dict], results: List[Dict], matrix: Dict):
+    report = {
+        'students': [
+            {
+                'student': student,
+                **({'grade': result['grade'].to_dict(), 'cached': result['cached']} if result['ok']
+                   else {'error': result['error']}),
+                'latency_ms': result['latency_ms'],
+            }
+            for student, result in zip(students, results)
+        ],
+        'confusion': matrix,
+    }
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n채점 결과가 저장되었습니다: {output_file}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='학생 서버 결과를 모아 정답 라벨로 채점하는 도구')
+    parser.add_argument('--student-file', type=Path, default=config.DEFAULT_STUDENT_FILE,
+                        help=f'학생 API 목록 파일 (기본: {config.DEFAULT_STUDENT_FILE})')
+    parser.add_argument('--labels', type=Path, default=config.DEFAULT_LABELS_FILE,
+                        help=f'정답 라벨 CSV (image,has_sticker,color,number, 기본: {config.DEFAULT_LABELS_FILE})')
+    parser.add_argument('--since', default=None, help='이 시각 이후 결과만 (예: "2026-10-18 09:00")')
+    parser.add_argument('--until', default=None, help='이 시각까지의 결과만')
+    parser.add_argument('--timeout', type=float, default=config.COLLECT_TIMEOUT,
+                        help=f'학생 서버 응답이 이 시간 동안 멈추면 실패 (초, 기본: {config.COLLECT_TIMEOUT})')
+    parser.add_argument('--max-connections', type=int, default=1000, help='전체 최대 동시 연결 수 (기본: 1000)')
+    parser.add_argument('--cache', type=Path, default=config.COLLECT_CACHE_FILE,
+                        help='ETag/채점 결과 캐시 파일')
+    parser.add_argument('--no-cache', action='store_true', help='캐시를 쓰지 않고 모두 다시 받음')
+    parser.add_argument('--output', type=Path, default=Path('grades.json'),
+                        help='채점 결과 저장 파일 (기본: grades.json)')
+    args = parser.parse_args()
+
+    if not args.labels.exists():
+        print(f"오류: 라벨 파일을 찾을 수 없습니다: {args.labels}")
+        sys.exit(1)
+    if not args.student_file.exists():
+        print(f"오류: 학생 API 파일을 찾을 수 없습니다: {args.student_file}")
+        sys.exit(1)
+
+    students = load_students(args.student_file)
+    labels = load_labels(args.labels)
+    if not labels:
+        print(f"오류: 라벨이 있는 행이 없습니다 (has_sticker를 채워 주세요): {args.labels}")
+        sys.exit(1)
+
+    params = {'format': 'jsonl'}
+    params.update({key: value for key, value in (('since', args.since), ('until', args.until)) if value})
+    fingerprint = labels_fingerprint(args.labels, params)
+    cache = {} if args.no_cache else load_cache(args.cache, fingerprint)
+
+    print(f"학생 수: {len(students)}명, 라벨: {len(labels)}개 ({args.labels})")
+    started = time.perf_counter()
+    results = asyncio.run(collect_all(students, labels, params, cache, args.timeout, args.max_connections))
+    elapsed = time.perf_counter() - started
+    collected = sum(1 for result in results if result['ok'])
+    unchanged = sum(1 for result in results if result['ok'] and result['cached'])
+    print(f"수집: {collected}/{len(students)}명 ({elapsed:.1f}초, 바뀌지 않음 {unchanged}명)")
+
+    print_grades(students, results)
+    matrix = fleet_confusion(results)
+    print_confusion(matrix)
+
+    if not args.no_cache:
+        save_cache(args.cache, fingerprint, students, results)
+    if args.output:
+        save_grades(args.output, students, results, matrix)
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,22 @@ from pathlib import Path
 
 DEFAULT_IMAGE_FOLDER = Path(__file__).parent.parent / "data" / "motor_checker"
 DEFAULT_STUDENT_FILE = Path(__file__).parent / "student_apis.json"
+DEFAULT_LABELS_FILE = Path(__file__).parent.parent / "runpod" / "labels.csv"
 
 DEFAULT_INTERVAL = 0.5  # 업로드만 하므로 빠르게
 DEFAULT_TIMEOUT = 10    # 업로드는 빨라야 하므로 타임아웃 짧게
-MAX_RETRIES = 3
+MAX_RETRIES = 3         # 연결 실패, 429/502/503/504만 재시도
+RETRY_BACKOFF = 0.5     # 재시도 대기 (지수 증가 + 지터, 초)
+RETRY_MAX_BACKOFF = 5
+
+PROBE_TIMEOUT = 3       # 시작 전 GET / 확인 타임아웃 (초)
+CONNECT_TIMEOUT = 3     # 연결 맺기 타임아웃 (초)
+
+# 학생 서버별 서킷 브레이커: 연속 실패 횟수, 다시 확인하기까지 대기 (두 배씩 증가, 초)
+BREAKER_FAILURES = 3
+BREAKER_BACKOFF = 2
+BREAKER_MAX_BACKOFF = 30
+
+# 결과 수집/채점 (collector.py): 학생 서버 응답이 멈췄다고 보는 시간 (초), ETag와 채점 결과 캐시
+COLLECT_TIMEOUT = 30
+COLLECT_CACHE_FILE = Path(__file__).parent / ".collect_cache.json"
@@ -1,14 +1,15 @@
 import argparse
+import asyncio
 import json
 import time
 from pathlib import Path
 from typing import List, Dict
 import sys
 
-import requests
-from tqdm import tqdm
-
 import config
+import loadgen
+import replay
+from result_log import ResultLog
 
 
 def load_students(student_file: Path) -> List[Dict]:
@@ -26,156 +27,209 @@ def load_images(image_folder: Path) -> List[Path]:
     return sorted(images)
 
 
-def send_image(api_url: str, image_path: Path, timeout: int = config.DEFAULT_TIMEOUT) -> Dict:
-    """이미지를 학생 API에 업로드 (분석은 서버에서 비동기로 처리)"""
-    try:
-        with open(image_path, 'rb') as f:
-            files = {'file': (image_path.name, f, 'image/jpeg')}
-            response = requests.post(
-                f"{api_url}/upload",
-                files=files,
-                timeout=timeout
-            )
-
-        if response.status_code == 200:
-            return {
-                'success': True,
-                'status_code': response.status_code,
-                'data': response.json()
-            }
-        else:
-            return {
-                'success': False,
-                'status_code': response.status_code,
-                'error': response.text
-            }
-
-    except requests.exceptions.Timeout:
-        return {
-            'success': False,
-            'error': f'Timeout after {timeout} seconds'
-        }
-    except requests.exceptions.ConnectionError:
-        return {
-            'success': False,
-            'error': 'Connection failed - server may be down'
-        }
-    except Exception as e:
-        return {
-            'success': False,
-            'error': str(e)
-        }
-
-
-def send_images_to_student(
+def preflight(students: List[Dict], timeout: float = config.PROBE_TIMEOUT) -> Dict[str, Dict]:
+    """모든 학생 서버에 동시에 GET / 을 보내 응답하지 않는 서버를 미리 확인"""
+    started = time.perf_counter()
+    health = asyncio.run(loadgen.probe_all(students, timeout))
+    down = [student for student in students if not health[student['api_url']]['ok']]
+
+    print(f"\n사전 확인: {len(students) - len(down)}/{len(students)}명 응답 ({time.perf_counter() - started:.1f}초)")
+    for student in down:
+        print(f"  ✗ {student['name']} ({student['api_url']}): {health[student['api_url']]['error']}")
+    if down:
+        print("  응답하지 않은 서버는 전송을 건너뛰고, 주기적으로 다시 확인합니다.")
+    return health
+
+
+async def send_images_to_student(
+    session,
     student: Dict,
-    images: List[Path],
+    breaker: loadgen.CircuitBreaker,
+    payloads: List,
     interval: float,
-    timeout: int
+    timeout: int,
+    log: ResultLog = None,
+    round_num: int = 0,
+    recorder: replay.TraceRecorder = None
 ) -> Dict:
     print(f"\n학생: {student['name']} ({student['student_id']})")
     print(f"API URL: {student['api_url']}")
-    print(f"전송할 이미지: {len(images)}개\n")
-
-    results = {
-        'student': student,
-        'total': len(images),
-        'success': 0,
-        'failed': 0,
-        'details': []
-    }
-
-    for image_path in tqdm(images, desc=f"{student['name']} 전송 중"):
-        result = send_image(student['api_url'], image_path, timeout)
-
-        if result['success']:
-            results['success'] += 1
-            status = "✓"
-        else:
-            results['failed'] += 1
-            status = "✗"
-
-        results['details'].append({
-            'image': image_path.name,
-            'status': status,
-            'result': result
-        })
+    print(f"전송할 이미지: {len(payloads)}개\n")
 
-        if interval > 0 and image_path != images[-1]:
-            time.sleep(interval)
+    results = (await loadgen.run_closed_loop(
+        [student], payloads, interval, timeout, desc=f"{student['name']} 전송 중",
+        log=log, round_num=round_num, recorder=recorder, session=session, breakers=[breaker]
+    ))[0]
 
     print(f"\n결과: 성공 {results['success']} / 실패 {results['failed']}\n")
 
     return results
 
 
-def send_images_parallel(
+async def send_images_parallel(
+    session,
     students: List[Dict],
-    images: List[Path],
+    breakers: List[loadgen.CircuitBreaker],
+    payloads: List,
     interval: float,
-    timeout: int
+    timeout: int,
+    log: ResultLog = None,
+    round_num: int = 0,
+    recorder: replay.TraceRecorder = None
 ) -> List[Dict]:
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+    """
+    모든 학생에게 동시에 전송 (이벤트 루프 하나, 학생마다 스레드를 만들지 않음)
 
+    payloads는 loadgen.load_payloads로 한 번만 만든 업로드 본문 (모든 학생과 라운드가 공유)
+    """
     print(f"병렬 모드: {len(students)}명의 학생에게 동시 전송\n")
 
-    all_results = []
-
-    with ThreadPoolExecutor(max_workers=len(students)) as executor:
-        futures = {
-            executor.submit(send_images_to_student, student, images, interval, timeout): student
-            for student in students
-        }
-
-        for future in as_completed(futures):
-            student = futures[future]
-            try:
-                result = future.result()
-                all_results.append(result)
-            except Exception as e:
-                print(f"\n학생 {student['name']} 처리 중 오류: {e}\n")
-                all_results.append({
-                    'student': student,
-                    'error': str(e)
-                })
-
-    return all_results
+    return await loadgen.run_closed_loop(
+        students, payloads, interval, timeout,
+        log=log, round_num=round_num, recorder=recorder, session=session, breakers=breakers
+    )
 
 
-def print_summary(all_results: List[Dict]):
+async def send_rounds(args, students: List[Dict], payloads: List, log: ResultLog,
+                      health: Dict[str, Dict] = None, recorder: replay.TraceRecorder = None):
+    """
+    전체 라운드를 이벤트 루프 하나에서 전송
+
+    세션(연결 풀)과 학생별 서킷 브레이커를 실행마다 한 번만 만들어 모든 라운드가 공유하므로,
+    앞 라운드에서 열린 서킷과 맺어 둔 연결이 다음 라운드로 이어집니다.
+    """
+    breakers = loadgen.create_breakers(students, health)
+    async with loadgen.create_session(args.max_connections, args.connections, args.timeout) as session:
+        for round_num in range(args.repeat):
+            if args.repeat > 1:
+                print(f"\n라운드 {round_num + 1}/{args.repeat}")
+
+            if args.parallel:
+                await send_images_parallel(
+                    session, students, breakers, payloads, args.interval, args.timeout, log, round_num, recorder
+                )
+            else:
+                for idx, (student, breaker) in enumerate(zip(students, breakers)):
+                    await send_images_to_student(
+                        session, student, breaker, payloads, args.interval, args.timeout, log, round_num,
+                        recorder if idx == 0 else None
+                    )
+
+            if round_num < args.repeat - 1:
+                print(f"\n다음 라운드까지 {args.interval}초 대기...\n")
+                await asyncio.sleep(args.interval)
+
+
+def print_summary(log: ResultLog):
     print("\n" + "="*70)
     print("전송 결과 요약")
     print("="*70)
 
-    for result in all_results:
-        student = result['student']
-        if 'error' in result:
-            print(f"\n{student['name']} ({student['student_id']}): 오류 발생")
-            print(f"  {result['error']}")
-        else:
-            total = result['total']
-            success = result['success']
-            failed = result['failed']
-            success_rate = (success / total * 100) if total > 0 else 0
-
-            print(f"\n{student['name']} ({student['student_id']}):")
-            print(f"  성공: {success}/{total} ({success_rate:.1f}%)")
-            print(f"  실패: {failed}/{total}")
-
-            if failed > 0:
-                print(f"  실패한 이미지:")
-                for detail in result['details']:
-                    if detail['status'] == "✗":
-                        error_msg = detail['result'].get('error', 'Unknown error')
-                        print(f"    - {detail['image']}: {error_msg}")
+    for stats in log.stats.values():
+        student = stats.student
+        total = stats.total
+        success_rate = (stats.success / total * 100) if total > 0 else 0
+
+        print(f"\n{student['name']} ({student['student_id']}):")
+        print(f"  성공: {stats.success}/{total} ({success_rate:.1f}%)")
+        print(f"  실패: {stats.failed}/{total}")
+        if stats.resumed:
+            print(f"  이전 실행에서 전달됨: {stats.resumed}개 (다시 보내지 않음)")
+
+        if stats.breaker['opened']:
+            print(f"  서킷 열림: {stats.breaker['opened']}회, 건너뛴 이미지: {stats.breaker['skipped']}개")
+
+        if stats.failures:
+            print(f"  실패한 이미지:")
+            for image, error_msg in stats.failures:
+                print(f"    - {image}: {error_msg}")
+            hidden = stats.failed - stats.breaker['skipped'] - len(stats.failures)
+            if hidden > 0:
+                print(f"    ... 외 {hidden}개")
 
     print("\n" + "="*70)
 
 
-def save_results(results: List[Dict], output_file: Path):
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(results, f, ensure_ascii=False, indent=2, default=str)
-    print(f"\n결과가 저장되었습니다: {output_file}")
+def save_trace(recorder: replay.TraceRecorder, output_file: Path):
+    replay.save_trace(output_file, recorder.events, source='image_sender')
+    print(f"trace가 저장되었습니다: {output_file} ({len(recorder.events)}건)")
+
+
+def run_open_loop_mode(args, students: List[Dict], images: List[Path], log: ResultLog,
+                       health: Dict[str, Dict] = None, recorder: replay.TraceRecorder = None):
+    count = int(args.rate * args.duration) if args.duration else len(images) * args.repeat
+    payloads = loadgen.load_payloads(images)
+
+    print(f"="*70)
+    print(f"오픈 루프 부하 시작")
+    print(f"="*70)
+    print(f"이미지 폴더: {args.image_folder} ({len(images)}개 순환)")
+    print(f"학생 수: {len(students)}명")
+    print(f"목표 도착률: 학생마다 {args.rate}/s ({args.arrival}), {count}회 전송")
+    print(f"타임아웃: {args.timeout}초, 연결 수: 학생마다 최대 {args.connections}개 (전체 {args.max_connections}개)")
+    print(f"="*70)
+
+    asyncio.run(loadgen.run_open_loop(
+        students, payloads, args.rate, count,
+        arrival=args.arrival, timeout=args.timeout, connections=args.connections,
+        max_connections=args.max_connections, seed=args.seed, health=health, log=log, recorder=recorder
+    ))
+
+
+def run_replay_mode(args, students: List[Dict], images: List[Path], log: ResultLog,
+                    health: Dict[str, Dict] = None, recorder: replay.TraceRecorder = None):
+    """trace 파일 또는 시나리오를 모든 학생 서버에 재생 (--speed배 시간 압축)"""
+    if args.scenario:
+        name, events = replay.load_scenario(args.scenario, [path.name for path in images])
+        source = f"시나리오 {name} ({args.scenario})"
+    else:
+        events = replay.load_trace(args.replay)
+        source = f"trace {args.replay}"
+    events = replay.scale(events, args.speed)
+
+    by_name = {path.name: path for path in images}
+    missing = sorted({image for _, image in events if image not in by_name})
+    if missing:
+        print(f"오류: trace의 이미지 {len(missing)}개가 이미지 폴더에 없습니다: {', '.join(missing[:5])}")
+        sys.exit(1)
+    # trace에 나오는 이미지만 한 번씩 읽음
+    used = [by_name[image] for image in sorted({image for _, image in events})]
+    payloads = {payload.name: payload for payload in loadgen.load_payloads(used)}
+    schedule = [(t, payloads[image]) for t, image in events]
+    info = replay.describe(events)
+
+    print(f"="*70)
+    print(f"trace 재생 시작")
+    print(f"="*70)
+    print(f"원본: {source}, {args.speed}배속")
+    print(f"업로드 {info['count']}회, {info['duration_s']}초 (평균 {info['mean_rps']}/s, 최대 {info['peak_rps']}/s)")
+    print(f"학생 수: {len(students)}명 (모두 같은 trace를 동시에 재생)")
+    print(f"="*70)
+
+    asyncio.run(loadgen.run_replay(
+        students, schedule, timeout=args.timeout, connections=args.connections,
+        max_connections=args.max_connections, health=health, log=log, recorder=recorder
+    ))
+
+
+def run_closed_loop_mode(args, students: List[Dict], images: List[Path], log: ResultLog,
+                         health: Dict[str, Dict] = None, recorder: replay.TraceRecorder = None):
+    print(f"="*70)
+    print(f"이미지 전송 시작")
+    print(f"="*70)
+    print(f"이미지 폴더: {args.image_folder}")
+    print(f"이미지 개수: {len(images)}개")
+    print(f"학생 수: {len(students)}명")
+    print(f"전송 간격: {args.interval}초")
+    print(f"타임아웃: {args.timeout}초")
+    print(f"반복 횟수: {args.repeat}회")
+    print(f"병렬 모드: {'예' if args.parallel else '아니오'}")
+    print(f"="*70)
+
+    # 이미지를 한 번만 읽어 모든 학생과 라운드가 공유
+    payloads = loadgen.load_payloads(images)
+
+    asyncio.run(send_rounds(args, students, payloads, log, health, recorder))
 
 
 def main():
@@ -227,8 +281,90 @@ def main():
     parser.add_argument(
         '--output',
         type=Path,
-        default=Path('send_results.json'),
-        help='결과 저장 파일 (기본: send_results.json)'
+        default=Path('send_results.jsonl'),
+        help='결과 로그 파일, 응답마다 한 줄씩 추가 (기본: send_results.jsonl)'
+    )
+
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='--output 로그에서 이미 전달한 (학생, 이미지, 라운드)는 건너뛰고 이어서 전송'
+    )
+
+    parser.add_argument(
+        '--rate',
+        type=float,
+        default=None,
+        help='오픈 루프 모드: 학생 서버마다 초당 업로드 수 (응답을 기다리지 않음, --interval/--parallel 무시)'
+    )
+
+    parser.add_argument(
+        '--arrival',
+        choices=['constant', 'poisson'],
+        default='constant',
+        help='오픈 루프 도착 간격 분포 (기본: constant)'
+    )
+
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=None,
+        help='오픈 루프 실행 시간 (초, 기본: 이미지 개수 x 반복 횟수만큼 전송)'
+    )
+
+    parser.add_argument(
+        '--connections',
+        type=int,
+        default=64,
+        help='병렬/오픈 루프 모드에서 학생 서버마다 최대 동시 연결 수 (기본: 64)'
+    )
+
+    parser.add_argument(
+        '--max-connections',
+        type=int,
+        default=1000,
+        help='병렬/오픈 루프 모드에서 전체 최대 동시 연결 수 (기본: 1000)'
+    )
+
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=None,
+        help='poisson 도착 간격 시드 (같은 시드면 같은 도착 시각)'
+    )
+
+    parser.add_argument(
+        '--replay',
+        type=Path,
+        default=None,
+        help='도착 trace 파일(JSONL)을 시각 그대로 재생 (오픈 루프)'
+    )
+
+    parser.add_argument(
+        '--scenario',
+        type=Path,
+        default=None,
+        help='부하 시나리오 파일(JSON)을 trace로 바꿔 재생 (예: scenarios/burst_300_in_5s.json)'
+    )
+
+    parser.add_argument(
+        '--speed',
+        type=float,
+        default=1.0,
+        help='--replay/--scenario 시간 압축 배율 (10이면 10배 빠르게, 기본: 1)'
+    )
+
+    parser.add_argument(
+        '--record-trace',
+        type=Path,
+        default=None,
+        help='첫 번째 학생에게 실제로 보낸 시각과 이미지를 trace 파일(JSONL)로 저장'
+    )
+
+    parser.add_argument(
+        '--no-probe',
+        action='store_true',
+        help='시작 전 GET / 사전 확인을 하지 않음'
     )
 
     parser.add_argument(
@@ -261,42 +397,40 @@ def main():
     if args.limit:
         images = images[:args.limit]
 
-    print(f"="*70)
-    print(f"이미지 전송 시작")
-    print(f"="*70)
-    print(f"이미지 폴더: {args.image_folder}")
-    print(f"이미지 개수: {len(images)}개")
-    print(f"학생 수: {len(students)}명")
-    print(f"전송 간격: {args.interval}초")
-    print(f"타임아웃: {args.timeout}초")
-    print(f"반복 횟수: {args.repeat}회")
-    print(f"병렬 모드: {'예' if args.parallel else '아니오'}")
-    print(f"="*70)
-
-    all_results = []
+    if sum(1 for mode in (args.rate, args.replay, args.scenario) if mode) > 1:
+        parser.error('--rate, --replay, --scenario 중 하나만 사용할 수 있습니다.')
 
-    for round_num in range(args.repeat):
-        if args.repeat > 1:
-            print(f"\n라운드 {round_num + 1}/{args.repeat}")
+    health = None if args.no_probe else preflight(students)
+    recorder = replay.TraceRecorder(time.perf_counter) if args.record_trace else None
+    log = ResultLog(args.output, resume=args.resume)
+    if log.delivered:
+        print(f"이어서 전송: {args.output}에서 이미 전달한 업로드 {len(log.delivered)}건은 건너뜁니다.")
 
-        if args.parallel:
-            results = send_images_parallel(students, images, args.interval, args.timeout)
+    try:
+        if args.rate or args.replay or args.scenario:
+            mode = 'open_loop' if args.rate else 'replay'
+            log.start_run(mode=mode, images=len(images), students=len(students))
+            if args.rate:
+                run_open_loop_mode(args, students, images, log, health, recorder)
+            else:
+                run_replay_mode(args, students, images, log, health, recorder)
+            print_summary(log)
+            loadgen.print_latency_summary(log)
         else:
-            results = []
-            for student in students:
-                result = send_images_to_student(student, images, args.interval, args.timeout)
-                results.append(result)
-
-        all_results.extend(results)
-
-        if round_num < args.repeat - 1:
-            print(f"\n다음 라운드까지 {args.interval}초 대기...\n")
-            time.sleep(args.interval)
-
-    print_summary(all_results)
+            log.start_run(mode='parallel' if args.parallel else 'sequential', images=len(images),
+                          students=len(students), repeat=args.repeat)
+            run_closed_loop_mode(args, students, images, log, health, recorder)
+            print_summary(log)
+    except KeyboardInterrupt:
+        print(f"\n\n중단되었습니다. 같은 옵션에 --resume을 붙여 실행하면 이어서 보냅니다.")
+        print_summary(log)
+    finally:
+        log.close()
 
     if args.output:
-        save_results(all_results, args.output)
+        print(f"\n결과 로그: {args.output}")
+    if recorder is not None:
+        save_trace(recorder, args.record_trace)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,466 @@
+"""
+비동기 전송 엔진 (이벤트 루프 하나로 모든 학생 서버에 전송)
+
+- 오픈 루프 (--rate): 목표 도착률(초당 이미지 수)에 맞춰 미리 정한 시각에 업로드를
+  시작하고, 응답 시간과 관계없이 다음 업로드를 예약합니다. 닫힌 루프는 서버가
+  느려지면 보내는 속도도 같이 느려져서 서버 큐에 쌓이는 지연이 드러나지 않습니다.
+  도착 간격은 constant(일정) 또는 poisson(지수 분포), 지연시간은 예약된 시각부터
+  응답을 받을 때까지 (연결 풀 대기 포함)
+- 닫힌 루프 (--parallel): 학생 서버마다 응답을 받고 --interval만큼 쉰 뒤 다음 이미지
+
+이미지마다 multipart 본문을 한 번만 만들어 모든 학생 서버가 읽기 전용으로 공유하므로
+메모리는 이미지 수에만 비례하고, 연결은 keep-alive 풀 하나(전체 --max-connections,
+학생 서버마다 --connections)를 같이 씁니다.
+
+죽은 학생 서버 때문에 전체 실행이 길어지지 않도록
+- 시작 전에 모든 학생 서버에 GET /을 동시에 보내 응답 여부 확인 (probe_all)
+- 학생 서버마다 서킷 브레이커: 연속 BREAKER_FAILURES번 실패하면 전송을 멈추고,
+  backoff(두 배씩, 최대 BREAKER_MAX_BACKOFF초) 뒤 GET /으로 다시 확인
+- 요청이 서버에 닿지 않은 실패(연결 실패, 429/502/503/504)만 MAX_RETRIES번까지
+  지터를 준 지수 backoff로 재시도 (타임아웃은 중복 업로드가 될 수 있어 재시도하지 않음)
+"""
+import asyncio
+import random
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import aiohttp
+from tqdm import tqdm
+
+import config
+from result_log import LatencyHistogram, ResultLog, round_counter
+
+
+CONNECTION_ERROR = 'Connection failed - server may be down'
+RETRYABLE_STATUS = {429, 502, 503, 504}
+
+
+class ImagePayload:
+    """업로드 요청 본문 (multipart/form-data, 한 번 만들어 모든 전송이 공유)"""
+
+    __slots__ = ('name', 'body', 'content_type')
+
+    def __init__(self, path: Path):
+        self.name = path.name
+        boundary = uuid.uuid4().hex
+        filename = path.name.replace('"', '%22')
+        self.body = b''.join([
+            f'--{boundary}\r\n'.encode(),
+            f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'.encode('utf-8'),
+            b'Content-Type: image/jpeg\r\n\r\n',
+            path.read_bytes(),
+            f'\r\n--{boundary}--\r\n'.encode(),
+        ])
+        self.content_type = f'multipart/form-data; boundary={boundary}'
+
+
+def load_payloads(image_paths: List[Path]) -> List[ImagePayload]:
+    """이미지 파일을 한 번만 읽어 업로드 본문으로 변환"""
+    return [ImagePayload(path) for path in image_paths]
+
+
+def create_session(max_connections: int, connections: int, timeout: float) -> aiohttp.ClientSession:
+    """모든 학생 서버가 같이 쓰는 keep-alive 세션 (연결은 CONNECT_TIMEOUT초 안에 맺어야 함)"""
+    connector = aiohttp.TCPConnector(limit=max_connections, limit_per_host=connections)
+    client_timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=min(timeout, config.CONNECT_TIMEOUT))
+    return aiohttp.ClientSession(connector=connector, timeout=client_timeout)
+
+
+async def probe(session: aiohttp.ClientSession, api_url: str, timeout: float = config.PROBE_TIMEOUT) -> Dict:
+    """GET / 헬스체크"""
+    started = time.perf_counter()
+    try:
+        async with session.get(f"{api_url}/", timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            await response.read()
+            ok = response.status == 200
+            result = {'ok': ok, 'status_code': response.status}
+            if not ok:
+                result['error'] = f'HTTP {response.status}'
+    except asyncio.TimeoutError:
+        result = {'ok': False, 'error': f'Timeout after {timeout} seconds'}
+    except aiohttp.ClientConnectionError:
+        result = {'ok': False, 'error': CONNECTION_ERROR}
+    except Exception as e:
+        result = {'ok': False, 'error': str(e)}
+    result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return result
+
+
+async def probe_all(students: List[Dict], timeout: float = config.PROBE_TIMEOUT,
+                    max_connections: int = 1000) -> Dict[str, Dict]:
+    """모든 학생 서버에 동시에 GET / (api_url -> probe 결과)"""
+    urls = sorted({student['api_url'] for student in students})
+    async with create_session(max_connections, 1, timeout) as session:
+        results = await asyncio.gather(*[probe(session, url, timeout) for url in urls])
+    return dict(zip(urls, results))
+
+
+class CircuitBreaker:
+    """
+    학생 서버 하나의 서킷 브레이커
+
+    연속 실패가 failures번이면 열림(전송 건너뜀) → backoff가 지나면 GET /으로 확인해서
+    응답하면 닫고, 아니면 backoff를 두 배로 늘려 다시 엶
+    """
+
+    def __init__(self, failures: int = config.BREAKER_FAILURES, backoff: float = config.BREAKER_BACKOFF,
+                 max_backoff: float = config.BREAKER_MAX_BACKOFF):
+        self.failures = failures
+        self.base_backoff = backoff
+        self.max_backoff = max_backoff
+        self.backoff = backoff
+        self.consecutive = 0
+        self.open_until = None
+        self.opened = 0
+        self.skipped = 0
+        self._reported = (0, 0)
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.open_until is not None
+
+    def trip(self):
+        # 여러 학생 서버가 같은 시각에 다시 확인하지 않도록 지터
+        self.open_until = time.monotonic() + self.backoff * random.uniform(0.5, 1.0)
+        self.backoff = min(self.backoff * 2, self.max_backoff)
+        self.opened += 1
+
+    def reset(self):
+        self.open_until = None
+        self.backoff = self.base_backoff
+        self.consecutive = 0
+
+    def record(self, result: Dict):
+        """전송 결과 기록 (서버가 응답하지 않았거나 5xx면 실패로 셈)"""
+        status = result.get('status_code')
+        if result['success'] or (status is not None and status < 500):
+            self.consecutive = 0
+            return
+        self.consecutive += 1
+        if self.consecutive >= self.failures and not self.is_open:
+            self.trip()
+
+    async def allow(self, session: aiohttp.ClientSession, api_url: str) -> bool:
+        """지금 전송해도 되는지 (열려 있으면 backoff가 지났을 때 한 번만 다시 확인)"""
+        if not self.is_open:
+            return True
+        if self._probing or time.monotonic() < self.open_until:
+            self.skipped += 1
+            return False
+        self._probing = True
+        try:
+            ok = (await probe(session, api_url))['ok']
+        finally:
+            self._probing = False
+        if ok:
+            self.reset()
+        else:
+            self.trip()
+            self.skipped += 1
+        return ok
+
+    def report(self) -> Dict:
+        """지난 report() 이후 늘어난 횟수 (라운드마다 같은 브레이커를 써도 ResultLog에 중복 집계하지 않음)"""
+        opened, skipped = self._reported
+        self._reported = (self.opened, self.skipped)
+        return {'opened': self.opened - opened, 'skipped': self.skipped - skipped, 'open': self.is_open}
+
+
+def create_breakers(students: List[Dict], health: Dict[str, Dict] = None) -> List[CircuitBreaker]:
+    """학생마다 서킷 브레이커 (사전 확인에서 응답이 없던 서버는 열린 상태로 시작)"""
+    breakers = []
+    for student in students:
+        breaker = CircuitBreaker()
+        if health and not health.get(student['api_url'], {}).get('ok', True):
+            breaker.trip()
+        breakers.append(breaker)
+    return breakers
+
+
+def arrival_offsets(rate: float, count: int, arrival: str = 'constant', seed: int = None) -> List[float]:
+    """시작 시각 기준 업로드 예약 시각 (초)"""
+    if rate <= 0:
+        raise ValueError('rate는 0보다 커야 합니다.')
+    rng = random.Random(seed)
+    offsets = []
+    t = 0.0
+    for i in range(count):
+        if arrival == 'constant':
+            t = i / rate
+        elif arrival == 'poisson':
+            if i > 0:
+                t += rng.expovariate(rate)
+        else:
+            raise ValueError(f'알 수 없는 도착 분포: {arrival} (constant/poisson)')
+        offsets.append(t)
+    return offsets
+
+
+async def upload(session: aiohttp.ClientSession, api_url: str, payload: ImagePayload, timeout: float) -> Dict:
+    """이미지 하나 업로드 (send_image와 같은 결과 형식)"""
+    try:
+        async with session.post(f"{api_url}/upload", data=payload.body,
+                                headers={'Content-Type': payload.content_type}) as response:
+            if response.status == 200:
+                return {'success': True, 'status_code': response.status, 'data': await response.json()}
+            return {'success': False, 'status_code': response.status, 'error': await response.text()}
+    except asyncio.TimeoutError:
+        return {'success': False, 'error': f'Timeout after {timeout} seconds'}
+    except aiohttp.ClientConnectionError:
+        return {'success': False, 'error': CONNECTION_ERROR}
+    except Exception as e:
+        return {'success': False, 'error': str(e)}
+
+
+def _retryable(result: Dict) -> bool:
+    if 'status_code' in result:
+        return result['status_code'] in RETRYABLE_STATUS
+    return result.get('error') == CONNECTION_ERROR
+
+
+async def send(session: aiohttp.ClientSession, api_url: str, payload: ImagePayload, timeout: float,
+               breaker: CircuitBreaker, retries: int = config.MAX_RETRIES) -> Dict:
+    """서킷 브레이커와 재시도를 거쳐 업로드"""
+    if not await breaker.allow(session, api_url):
+        return {'success': False, 'skipped': True, 'error': '서킷 열림 - 서버 응답 없음, 전송 건너뜀'}
+
+    for attempt in range(retries + 1):
+        result = await upload(session, api_url, payload, timeout)
+        if result['success'] or not _retryable(result) or attempt == retries:
+            break
+        await asyncio.sleep(random.uniform(0, min(config.RETRY_MAX_BACKOFF, config.RETRY_BACKOFF * 2 ** attempt)))
+    if attempt:
+        result['attempts'] = attempt + 1
+    breaker.record(result)
+    return result
+
+
+async def drive_target(
+    session: aiohttp.ClientSession,
+    student: Dict,
+    schedule: List[Tuple[float, ImagePayload]],
+    timeout: float,
+    breaker: CircuitBreaker,
+    log: ResultLog,
+    progress: tqdm = None,
+    recorder=None
+) -> Dict:
+    """
+    학생 서버 하나에 예약된 시각마다 업로드 (응답을 기다리지 않고 다음 업로드 예약)
+
+    Args:
+        schedule: [(시작 기준 초, 업로드 본문)] 시각순
+        log: 결과를 받을 때마다 기록할 ResultLog (이미 전달한 업로드는 건너뜀)
+        recorder: 실제 전송 시각을 기록할 replay.TraceRecorder (첫 학생 서버만)
+
+    Returns:
+        이번 전송 정보 (sent, success, failed, offered_rps, achieved_rps, schedule_lag_ms, elapsed_s)
+    """
+    counts = {'sent': 0, 'success': 0, 'failed': 0}
+
+    async def timed(payload, round_num, scheduled):
+        result = await send(session, student['api_url'], payload, timeout, breaker)
+        result['latency_ms'] = round((time.perf_counter() - scheduled) * 1000, 1)
+        log.write(student, payload.name, round_num, result)
+        counts['success' if result['success'] else 'failed'] += 1
+        if progress is not None:
+            progress.update(1)
+
+    log.target(student)
+    next_round = round_counter()
+    start = time.perf_counter()
+    pending = set()
+    lags = LatencyHistogram()
+    for offset, payload in schedule:
+        round_num = next_round(payload.name)
+        if log.is_delivered(student, payload.name, round_num):
+            if progress is not None:
+                progress.update(1)
+            continue
+        scheduled = start + offset
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # 예약 시각보다 늦게 보낸 정도 (이벤트 루프가 밀리면 커짐)
+        lags.add((time.perf_counter() - scheduled) * 1000)
+        if recorder is not None:
+            recorder.record(payload.name)
+        task = asyncio.create_task(timed(payload, round_num, scheduled))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+        counts['sent'] += 1
+    send_window = time.perf_counter() - start
+    if pending:
+        await asyncio.gather(*pending)
+    elapsed = time.perf_counter() - start
+
+    info = {
+        **counts,
+        'offered_rps': round((counts['sent'] - 1) / send_window, 2) if send_window > 0 and counts['sent'] else 0.0,
+        'achieved_rps': round(counts['success'] / elapsed, 2) if elapsed > 0 else 0.0,
+        'schedule_lag_ms': {'p99': round(lags.percentile(99), 1), 'max': round(lags.max, 1)},
+        'elapsed_s': round(elapsed, 2),
+    }
+    log.finish_target(student, breaker.report(), **{key: info[key] for key in
+                                                    ('offered_rps', 'achieved_rps', 'schedule_lag_ms')})
+    return info
+
+
+async def _run_schedules(
+    students: List[Dict],
+    schedules: List[List[Tuple[float, ImagePayload]]],
+    timeout: float,
+    connections: int,
+    max_connections: int,
+    health: Dict[str, Dict],
+    log: ResultLog,
+    recorder
+) -> List[Dict]:
+    breakers = create_breakers(students, health)
+    log = log if log is not None else ResultLog()
+    async with create_session(max_connections, connections, timeout) as session:
+        with tqdm(total=sum(len(schedule) for schedule in schedules), desc='전송 중') as progress:
+            return list(await asyncio.gather(*[
+                drive_target(session, student, schedule, timeout, breaker, log, progress,
+                             recorder if idx == 0 else None)
+                for idx, (student, schedule, breaker) in enumerate(zip(students, schedules, breakers))
+            ]))
+
+
+async def run_open_loop(
+    students: List[Dict],
+    payloads: List[ImagePayload],
+    rate: float,
+    count: int,
+    arrival: str = 'constant',
+    timeout: float = 10,
+    connections: int = 64,
+    max_connections: int = 1000,
+    seed: int = None,
+    health: Dict[str, Dict] = None,
+    log: ResultLog = None,
+    recorder=None
+) -> List[Dict]:
+    """
+    모든 학생 서버에 동시에 오픈 루프 부하
+
+    Args:
+        rate: 학생 서버마다 목표 도착률 (초당 이미지 수)
+        count: 학생 서버마다 보낼 업로드 수 (이미지를 순환)
+        arrival: constant / poisson
+        connections: 학생 서버마다 최대 동시 연결 수
+        max_connections: 전체 최대 동시 연결 수
+        seed: poisson 도착 간격 시드 (학생 서버마다 seed + 인덱스)
+        health: probe_all 결과 (응답이 없던 서버는 서킷이 열린 상태로 시작)
+        log: 결과를 기록할 ResultLog (없으면 메모리에만 집계)
+        recorder: 첫 학생 서버에 실제로 보낸 시각을 기록할 replay.TraceRecorder
+    """
+    schedules = []
+    for idx in range(len(students)):
+        offsets = arrival_offsets(rate, count, arrival, None if seed is None else seed + idx)
+        schedules.append([(offset, payloads[i % len(payloads)]) for i, offset in enumerate(offsets)])
+    return await _run_schedules(students, schedules, timeout, connections, max_connections, health, log, recorder)
+
+
+async def run_replay(
+    students: List[Dict],
+    schedule: List[Tuple[float, ImagePayload]],
+    timeout: float = 10,
+    connections: int = 64,
+    max_connections: int = 1000,
+    health: Dict[str, Dict] = None,
+    log: ResultLog = None,
+    recorder=None
+) -> List[Dict]:
+    """trace(또는 시나리오) 일정을 모든 학생 서버에 동시에 그대로 재생 (오픈 루프)"""
+    return await _run_schedules(
+        students, [schedule] * len(students), timeout, connections, max_connections, health, log, recorder
+    )
+
+
+async def _closed_loop_target(session, student: Dict, payloads: List[ImagePayload], interval: float,
+                              timeout: float, breaker: CircuitBreaker, log: ResultLog, round_num: int,
+                              progress: tqdm, recorder=None) -> Dict:
+    counts = {'sent': 0, 'success': 0, 'failed': 0}
+    log.target(student)
+    for idx, payload in enumerate(payloads):
+        if log.is_delivered(student, payload.name, round_num):
+            progress.update(1)
+            continue
+        if recorder is not None:
+            recorder.record(payload.name)
+        started = time.perf_counter()
+        result = await send(session, student['api_url'], payload, timeout, breaker)
+        result['latency_ms'] = round((time.perf_counter() - started) * 1000, 1)
+        log.write(student, payload.name, round_num, result)
+        counts['sent'] += 1
+        counts['success' if result['success'] else 'failed'] += 1
+        progress.update(1)
+        # 건너뛴 이미지는 기다리지 않음
+        if interval > 0 and idx < len(payloads) - 1 and not result.get('skipped'):
+            await asyncio.sleep(interval)
+    log.finish_target(student, breaker.report())
+    return counts
+
+
+async def run_closed_loop(
+    students: List[Dict],
+    payloads: List[ImagePayload],
+    interval: float,
+    timeout: float = 10,
+    connections: int = 64,
+    max_connections: int = 1000,
+    health: Dict[str, Dict] = None,
+    desc: str = '전송 중',
+    log: ResultLog = None,
+    round_num: int = 0,
+    recorder=None,
+    session: aiohttp.ClientSession = None,
+    breakers: List[CircuitBreaker] = None
+) -> List[Dict]:
+    """
+    모든 학생 서버에 동시에 전송 (학생 서버마다 응답을 받고 interval만큼 쉰 뒤 다음 이미지)
+
+    Args:
+        session: 라운드/학생마다 다시 호출할 때 공유할 세션 (없으면 이번 호출에서 만들고 닫음)
+        breakers: students와 같은 순서의 서킷 브레이커 (넘기면 호출 사이에 상태가 이어짐)
+
+    Returns:
+        학생별 이번 전송 개수 [{sent, success, failed}]
+    """
+    breakers = breakers if breakers is not None else create_breakers(students, health)
+    log = log if log is not None else ResultLog()
+
+    async def run(session):
+        with tqdm(total=len(payloads) * len(students), desc=desc) as progress:
+            return list(await asyncio.gather(*[
+                _closed_loop_target(session, student, payloads, interval, timeout, breaker, log, round_num,
+                                    progress, recorder if idx == 0 else None)
+                for idx, (student, breaker) in enumerate(zip(students, breakers))
+            ]))
+
+    if session is not None:
+        return await run(session)
+    async with create_session(max_connections, connections, timeout) as session:
+        return await run(session)
+
+
+def print_latency_summary(log: ResultLog):
+    print("\n" + "="*70)
+    print("업로드 지연시간 (예약 시각 기준, 성공한 요청만)")
+    print("="*70)
+    print(f"{'학생':<16} {'성공/전체':>10} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} {'목표':>7} {'달성':>7}")
+    worst_lag = 0.0
+    for stats in log.stats.values():
+        latency = stats.latency.summary()
+        print(
+            f"{stats.student['name']:<16} {stats.success:>4}/{stats.total:<5} "
+            f"{latency['p50_ms']:>8.0f} {latency['p95_ms']:>8.0f} {latency['p99_ms']:>8.0f} {latency['max_ms']:>8.0f} "
+            f"{stats.timing.get('offered_rps', 0.0):>7.2f} {stats.timing.get('achieved_rps', 0.0):>7.2f}"
+        )
+        worst_lag = max(worst_lag, stats.timing.get('schedule_lag_ms', {}).get('max', 0.0))
+    print("(지연시간 단위 ms, 목표/달성은 초당 요청 수)")
+    print(f"예약 시각 대비 전송 지연: 최대 {worst_lag:.1f}ms")
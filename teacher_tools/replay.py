@@ -0,0 +1,217 @@
+"""
+도착 trace 기록 / 재생, 부하 시나리오
+
+trace 파일 (JSON Lines)
+    {"type": "trace", "version": 1, "created": "...", "source": "..."}   ← 첫 줄 (헤더)
+    {"t": 0.0, "image": "20240817_000108.jpg"}                          ← 시작 기준 초, 이미지 파일명
+    {"t": 28.0, "image": "20240817_000136.jpg"}
+
+시나리오 파일 (JSON) - 단계를 이어 붙여 trace로 변환
+    {
+      "name": "burst-300-in-5s",
+      "seed": 1,
+      "phases": [
+        {"type": "steady", "rate": 2, "duration": 10},     ← 일정 간격
+        {"type": "burst", "count": 300, "duration": 5},    ← count장을 duration초 안에 균등하게
+        {"type": "pause", "duration": 10},                 ← 쉬기 (라인 정지)
+        {"type": "poisson", "rate": 5, "duration": 30}     ← 포아송 도착
+      ]
+    }
+    이미지는 이미지 폴더를 이름순으로 순환 ("images": "random"이면 seed로 섞어서)
+
+    python replay.py from-folder ../data/motor_checker -o line.jsonl   # 파일명 시각으로 trace 생성
+    python replay.py compile scenarios/burst_300_in_5s.json -o burst.jsonl
+    python replay.py show line.jsonl --speed 10
+"""
+import argparse
+import json
+import random
+import re
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import config
+
+
+TRACE_VERSION = 1
+# 카메라 파일명의 촬영 시각 (예: 20240817_000108.jpg)
+FILENAME_TIME = re.compile(r'(\d{8})_(\d{6})')
+
+
+def save_trace(path: Path, events: List[Tuple[float, str]], source: str = ''):
+    """trace 파일 저장 (시각순)"""
+    header = {
+        'type': 'trace',
+        'version': TRACE_VERSION,
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'source': source,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for t, image in sorted(events, key=lambda event: event[0]):
+            f.write(json.dumps({'t': round(t, 4), 'image': image}, ensure_ascii=False) + '\n')
+
+
+def load_trace(path: Path) -> List[Tuple[float, str]]:
+    """trace 파일 읽기 → [(시작 기준 초, 이미지 파일명)] (첫 도착이 0초)"""
+    events = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if record.get('type') == 'trace':
+                if record.get('version', TRACE_VERSION) > TRACE_VERSION:
+                    raise ValueError(f'지원하지 않는 trace 버전: {record["version"]}')
+                continue
+            if 't' not in record or 'image' not in record:
+                raise ValueError(f'{path}:{line_no}: t와 image가 필요합니다.')
+            events.append((float(record['t']), record['image']))
+    events.sort(key=lambda event: event[0])
+    if events:
+        first = events[0][0]
+        events = [(t - first, image) for t, image in events]
+    return events
+
+
+def trace_from_folder(image_paths: List[Path]) -> List[Tuple[float, str]]:
+    """이미지 파일명의 촬영 시각(없으면 수정 시각)으로 실제 도착 간격 trace 생성"""
+    stamped = []
+    for path in image_paths:
+        match = FILENAME_TIME.search(path.name)
+        if match:
+            stamp = datetime.strptime(match.group(1) + match.group(2), '%Y%m%d%H%M%S').timestamp()
+        else:
+            stamp = path.stat().st_mtime
+        stamped.append((stamp, path.name))
+    stamped.sort()
+    if not stamped:
+        return []
+    first = stamped[0][0]
+    return [(stamp - first, name) for stamp, name in stamped]
+
+
+def compile_scenario(scenario: Dict, image_names: List[str]) -> List[Tuple[float, str]]:
+    """
+    시나리오(단계 목록)를 trace로 변환
+
+    Raises:
+        ValueError: 알 수 없는 단계 종류이거나 값이 잘못됨
+    """
+    if not image_names:
+        raise ValueError('이미지가 없습니다.')
+    rng = random.Random(scenario.get('seed', 0))
+    names = list(image_names)
+    if scenario.get('images', 'cycle') == 'random':
+        rng.shuffle(names)
+
+    times = []
+    t = 0.0
+    for index, phase in enumerate(scenario.get('phases', [])):
+        kind = phase.get('type')
+        duration = float(phase.get('duration', 0))
+        if duration < 0:
+            raise ValueError(f'phases[{index}]: duration은 0 이상이어야 합니다.')
+
+        if kind == 'steady':
+            count = int(round(float(phase['rate']) * duration))
+            times.extend(t + i / float(phase['rate']) for i in range(count))
+        elif kind == 'burst':
+            count = int(phase['count'])
+            step = duration / count if count else 0.0
+            times.extend(t + i * step for i in range(count))
+        elif kind == 'poisson':
+            rate = float(phase['rate'])
+            arrival = t + rng.expovariate(rate)
+            while arrival < t + duration:
+                times.append(arrival)
+                arrival += rng.expovariate(rate)
+        elif kind == 'pause':
+            pass
+        else:
+            raise ValueError(f'phases[{index}]: 알 수 없는 단계 종류 {kind} (steady/burst/poisson/pause)')
+        t += duration
+
+    return [(offset, names[i % len(names)]) for i, offset in enumerate(times)]
+
+
+def load_scenario(path: Path, image_names: List[str]) -> Tuple[str, List[Tuple[float, str]]]:
+    """시나리오 파일 읽기 → (이름, trace)"""
+    with open(path, 'r', encoding='utf-8') as f:
+        scenario = json.load(f)
+    return scenario.get('name', path.stem), compile_scenario(scenario, image_names)
+
+
+def scale(events: List[Tuple[float, str]], speed: float) -> List[Tuple[float, str]]:
+    """시간 압축 (speed=10이면 10배 빠르게)"""
+    if speed <= 0:
+        raise ValueError('speed는 0보다 커야 합니다.')
+    return [(t / speed, image) for t, image in events]
+
+
+def describe(events: List[Tuple[float, str]]) -> Dict:
+    """trace 요약 (개수, 길이, 평균/최대 초당 도착 수)"""
+    if not events:
+        return {'count': 0, 'duration_s': 0.0, 'mean_rps': 0.0, 'peak_rps': 0}
+    duration = events[-1][0]
+    per_second = Counter(int(t) for t, _ in events)
+    return {
+        'count': len(events),
+        'duration_s': round(duration, 2),
+        'mean_rps': round(len(events) / duration, 2) if duration > 0 else float(len(events)),
+        'peak_rps': max(per_second.values()),
+    }
+
+
+class TraceRecorder:
+    """실제로 전송한 시각을 기록 (첫 학생 서버 기준)"""
+
+    def __init__(self, clock):
+        self._clock = clock
+        self._start = clock()
+        self.events = []
+
+    def record(self, image: str):
+        self.events.append((self._clock() - self._start, image))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='도착 trace 만들기 / 확인')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    from_folder = sub.add_parser('from-folder', help='이미지 파일명의 촬영 시각으로 trace 생성')
+    from_folder.add_argument('folder', type=Path, nargs='?', default=config.DEFAULT_IMAGE_FOLDER)
+    from_folder.add_argument('-o', '--output', type=Path, required=True)
+
+    compile_cmd = sub.add_parser('compile', help='시나리오 파일을 trace로 변환')
+    compile_cmd.add_argument('scenario', type=Path)
+    compile_cmd.add_argument('--image-folder', type=Path, default=config.DEFAULT_IMAGE_FOLDER)
+    compile_cmd.add_argument('-o', '--output', type=Path, required=True)
+
+    show = sub.add_parser('show', help='trace 요약')
+    show.add_argument('trace', type=Path)
+    show.add_argument('--speed', type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    if args.command == 'from-folder':
+        from image_sender import load_images
+        events = trace_from_folder(load_images(args.folder))
+        save_trace(args.output, events, source=f'folder:{args.folder}')
+    elif args.command == 'compile':
+        from image_sender import load_images
+        name, events = load_scenario(args.scenario, [path.name for path in load_images(args.image_folder)])
+        save_trace(args.output, events, source=f'scenario:{name}')
+    else:
+        events = scale(load_trace(args.trace), args.speed)
+        print(json.dumps(describe(events), ensure_ascii=False))
+        return
+
+    print(f"trace 저장: {args.output}")
+    print(json.dumps(describe(events), ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+전송 결과 스트리밍 로그 (JSON Lines)
+
+업로드 결과를 받을 때마다 한 줄씩 추가하므로(디스크에는 1초마다) Ctrl-C로 멈춰도 그때까지의 결과가 남고,
+요약은 학생별 누적값(개수, 지연시간 히스토그램)으로 계산하므로 --repeat를 늘려도
+메모리가 늘지 않습니다.
+
+    {"type": "run", "started": "...", "mode": "parallel", "images": 23, "students": 60}
+    {"type": "result", "ts": "...", "student_id": "2021001", "image": "a.jpg", "round": 0,
+     "success": true, "status_code": 200, "latency_ms": 41.2, "data": {...}}
+
+round는 같은 학생에게 같은 이미지를 몇 번째로 보냈는지입니다 (0부터).
+--resume이면 기존 로그에서 이미 전달한 (학생, 이미지, 라운드)를 읽어 다시 보내지 않습니다.
+"""
+import json
+import math
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict
+
+
+MAX_FAILURE_SAMPLES = 10
+FLUSH_SECONDS = 1
+
+
+class LatencyHistogram:
+    """로그 버킷 히스토그램 (백분위수 상대 오차 약 2%, 메모리는 값 개수와 무관)"""
+
+    GROWTH = 1.02
+    MIN_MS = 0.1
+
+    def __init__(self):
+        self.buckets = {}
+        self.count = 0
+        self.max = 0.0
+
+    def add(self, ms: float):
+        index = int(math.log(max(ms, self.MIN_MS) / self.MIN_MS, self.GROWTH))
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.max = max(self.max, ms)
+
+    def percentile(self, pct: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.MIN_MS * self.GROWTH ** (index + 1), self.max)
+        return self.max
+
+    def summary(self) -> Dict:
+        return {
+            'count': self.count,
+            'p50_ms': round(self.percentile(50), 1),
+            'p95_ms': round(self.percentile(95), 1),
+            'p99_ms': round(self.percentile(99), 1),
+            'max_ms': round(self.max, 1),
+        }
+
+
+class TargetStats:
+    """학생 한 명의 누적 전송 결과"""
+
+    def __init__(self, student: Dict):
+        self.student = student
+        self.total = 0
+        self.success = 0
+        self.failed = 0
+        self.resumed = 0
+        self.failures = []
+        self.latency = LatencyHistogram()
+        self.breaker = {'opened': 0, 'skipped': 0}
+        self.timing = {}
+
+    def add(self, image: str, result: Dict):
+        self.total += 1
+        if result['success']:
+            self.success += 1
+            if 'latency_ms' in result:
+                self.latency.add(result['latency_ms'])
+        else:
+            self.failed += 1
+            if not result.get('skipped') and len(self.failures) < MAX_FAILURE_SAMPLES:
+                self.failures.append((image, result.get('error', 'Unknown error')))
+
+    def to_dict(self) -> Dict:
+        return {
+            'student': self.student,
+            'total': self.total,
+            'success': self.success,
+            'failed': self.failed,
+            'resumed': self.resumed,
+            'latency': self.latency.summary(),
+            'breaker': self.breaker,
+            **self.timing,
+        }
+
+
+def student_key(student: Dict) -> str:
+    return str(student.get('student_id') or student['api_url'])
+
+
+class ResultLog:
+    """전송 결과를 JSONL 파일에 추가하면서 학생별 누적값 유지 (path가 없으면 메모리에만)"""
+
+    def __init__(self, path: Path = None, resume: bool = False):
+        self.path = path
+        self.stats = {}
+        self.delivered = set()
+        if resume and path is not None and path.exists():
+            self._load_delivered()
+        self._file = open(path, 'a' if resume else 'w', encoding='utf-8') if path is not None else None
+        self._last_flush = time.monotonic()
+
+    def _load_delivered(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # 쓰다가 멈춘 마지막 줄
+                if record.get('type') == 'result' and record.get('success'):
+                    self.delivered.add((record['student_id'], record['image'], record['round']))
+
+    def _write(self, record: Dict):
+        if self._file is not None:
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+            # 줄마다 flush하면 부하가 높을 때 이벤트 루프가 밀리므로 FLUSH_SECONDS마다
+            if time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def start_run(self, **info):
+        self._write({'type': 'run', 'started': datetime.now().isoformat(timespec='seconds'), **info})
+
+    def target(self, student: Dict) -> TargetStats:
+        key = student_key(student)
+        if key not in self.stats:
+            self.stats[key] = TargetStats(student)
+        return self.stats[key]
+
+    def is_delivered(self, student: Dict, image: str, round_num: int) -> bool:
+        """이전 실행에서 이미 전달했는지 (전달했으면 건너뛴 것으로 셈)"""
+        if (student_key(student), image, round_num) in self.delivered:
+            self.target(student).resumed += 1
+            return True
+        return False
+
+    def write(self, student: Dict, image: str, round_num: int, result: Dict):
+        self.target(student).add(image, result)
+        record = {
+            'type': 'result',
+            'ts': datetime.now().isoformat(timespec='milliseconds'),
+            'student_id': student_key(student),
+            'image': image,
+            'round': round_num,
+        }
+        record.update(result)
+        self._write(record)
+
+    def finish_target(self, student: Dict, breaker: Dict, **timing):
+        """학생 한 명의 전송(라운드)이 끝났을 때 서킷 브레이커 횟수와 시간 정보 반영"""
+        stats = self.target(student)
+        stats.breaker['opened'] += breaker.get('opened', 0)
+        stats.breaker['skipped'] += breaker.get('skipped', 0)
+        stats.timing.update(timing)
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def round_counter():
+    """같은 이미지를 몇 번째로 보내는지 세는 함수 (0부터)"""
+    seen = {}
+
+    def next_round(image: str) -> int:
+        seen[image] = seen.get(image, -1) + 1
+        return seen[image]
+
+    return next_round
+
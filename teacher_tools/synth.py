@@ -0,0 +1,269 @@
+"""
+합성 스티커 이미지 생성 (대량 부하 테스트 / 정확도 테스트용)
+
+data/motor_checker 사진에서 배경을 잘라 초록/노랑/빨강 스티커에 손글씨 느낌의 번호를 그려
+붙이고, 자세(회전, 원근), 흐림, 조명을 무작위로 바꿉니다. 이미지와 함께 정답
+labels.csv(runpod/labels.csv 형식: image,has_sticker,color,number)를 씁니다.
+
+- 이미지 i는 (seed, i)로만 정해지므로 같은 seed면 몇 번을 만들든, 프로세스 수가
+  몇 개든 같은 파일이 나옵니다 (벤치마크 고정 데이터)
+- 모든 CPU 코어에서 병렬 생성 (배경 사진은 프로세스마다 한 번만 1/2 크기로 디코딩)
+
+    python synth.py --count 100000 --output ../data/synthetic --seed 1
+    python image_sender.py --image-folder ../data/synthetic --rate 50 --duration 60
+    python collector.py --labels ../data/synthetic/labels.csv
+
+배경은 라벨 CSV(기본 runpod/labels.csv)에서 has_sticker=false인 사진만 씁니다.
+진짜 스티커가 잘려 들어가면 has_sticker=false 정답이 틀리기 때문입니다.
+라벨 없이 모든 사진을 쓰려면 --any-background (정답이 틀릴 수 있어 부하 테스트용).
+"""
+import argparse
+import csv
+import math
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter
+from tqdm import tqdm
+
+import config
+from collector import load_labels
+from image_sender import load_images
+
+
+# 스티커 기본 색 (RGB), 만들 때마다 조금씩 흔듦
+STICKER_COLORS = {
+    '초록색': (46, 170, 80),
+    '노란색': (240, 205, 40),
+    '빨간색': (215, 45, 45),
+}
+# 숫자 획 (가로 0~1, 세로 0~1 상자 안의 꺾은선), 점마다 흔들어 손글씨처럼
+DIGIT_STROKES = {
+    '0': [[(0.5, 0.0), (0.15, 0.2), (0.1, 0.5), (0.15, 0.8), (0.5, 1.0), (0.85, 0.8), (0.9, 0.5),
+           (0.85, 0.2), (0.5, 0.0)]],
+    '1': [[(0.3, 0.2), (0.55, 0.0), (0.55, 1.0)]],
+    '2': [[(0.15, 0.25), (0.4, 0.02), (0.75, 0.05), (0.85, 0.3), (0.15, 1.0), (0.9, 1.0)]],
+    '3': [[(0.15, 0.1), (0.8, 0.05), (0.45, 0.45), (0.85, 0.65), (0.7, 0.95), (0.15, 0.9)]],
+    '4': [[(0.7, 1.0), (0.7, 0.0), (0.1, 0.65), (0.9, 0.65)]],
+    '5': [[(0.85, 0.0), (0.2, 0.0), (0.15, 0.45), (0.6, 0.4), (0.85, 0.65), (0.7, 0.95), (0.15, 0.9)]],
+    '6': [[(0.8, 0.05), (0.35, 0.2), (0.15, 0.65), (0.4, 1.0), (0.8, 0.85), (0.75, 0.55), (0.2, 0.6)]],
+    '7': [[(0.1, 0.0), (0.9, 0.0), (0.4, 1.0)]],
+    '8': [[(0.5, 0.5), (0.2, 0.28), (0.5, 0.0), (0.8, 0.28), (0.5, 0.5), (0.15, 0.75), (0.5, 1.0),
+           (0.85, 0.75), (0.5, 0.5)]],
+    '9': [[(0.8, 0.45), (0.3, 0.45), (0.2, 0.2), (0.5, 0.0), (0.8, 0.2), (0.8, 0.45), (0.6, 1.0)]],
+}
+# 배경 사진 디코딩 크기 (JPEG draft로 원본 4000x3000을 1/2로 바로 읽음)
+BACKGROUND_SIZE = (2000, 1500)
+
+_backgrounds = None
+
+
+def _load_backgrounds(paths: List[Path]) -> List[Image.Image]:
+    images = []
+    for path in paths:
+        image = Image.open(path)
+        image.draft('RGB', BACKGROUND_SIZE)
+        image = image.convert('RGB')
+        image.thumbnail(BACKGROUND_SIZE)
+        images.append(image)
+    return images
+
+
+def _init_worker(paths: List[Path]):
+    global _backgrounds
+    _backgrounds = _load_backgrounds(paths)
+
+
+def sticker_free(paths: List[Path], labels_file: Path) -> List[Path]:
+    """라벨 CSV에서 스티커가 없다고 표시된 사진만 (라벨이 없는 사진은 제외)"""
+    labels = load_labels(labels_file)
+    return [path for path in paths if path.name in labels and not labels[path.name]['has_sticker']]
+
+
+def _jitter_color(rng: random.Random, rgb: Tuple[int, int, int]) -> Tuple[int, int, int]:
+    return tuple(max(0, min(255, int(c + rng.gauss(0, 12)))) for c in rgb)
+
+
+def _draw_number(draw: ImageDraw.ImageDraw, rng: random.Random, number: str, box: Tuple[float, float, float, float]):
+    """box(x0, y0, x1, y1) 안에 손글씨 느낌으로 번호 쓰기"""
+    x0, y0, x1, y1 = box
+    height = y1 - y0
+    digit_w = min((x1 - x0) / len(number), height * 0.65)
+    left = x0 + ((x1 - x0) - digit_w * len(number)) / 2
+    slant = rng.uniform(-0.25, 0.25)
+    width = max(2, int(height * rng.uniform(0.08, 0.14)))
+    ink = tuple(rng.randint(0, 50) for _ in range(3)) + (255,)
+    for i, digit in enumerate(number):
+        dx = left + i * digit_w + digit_w * 0.1
+        scale = rng.uniform(0.9, 1.1)
+        for stroke in DIGIT_STROKES[digit]:
+            points = []
+            for px, py in stroke:
+                px += rng.gauss(0, 0.04)
+                py += rng.gauss(0, 0.03)
+                y = y0 + py * height * scale
+                x = dx + px * digit_w * 0.8 + (y1 - y) * slant
+                points.append((x, y))
+            draw.line(points, fill=ink, width=width, joint='curve')
+            for x, y in (points[0], points[-1]):
+                r = width / 2
+                draw.ellipse((x - r, y - r, x + r, y + r), fill=ink)
+
+
+def render_sticker(rng: random.Random, color: str, number: str, size: int) -> Image.Image:
+    """번호가 쓰인 스티커 (RGBA, 회전/원근 적용, 바깥은 투명)"""
+    sticker = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(sticker)
+    fill = _jitter_color(rng, STICKER_COLORS[color]) + (255,)
+    margin = size * 0.04
+    if rng.random() < 0.5:
+        draw.ellipse((margin, margin, size - margin, size - margin), fill=fill)
+        text_box = (size * 0.22, size * 0.28, size * 0.78, size * 0.72)
+    else:
+        draw.rounded_rectangle((margin, margin, size - margin, size - margin), radius=size * 0.12, fill=fill)
+        text_box = (size * 0.15, size * 0.22, size * 0.85, size * 0.78)
+    _draw_number(draw, rng, number, text_box)
+
+    # 원근: 네 모서리를 조금씩 흔든 사각형을 정사각형으로 펴기
+    d = size * 0.12
+    quad = [coord for corner in ((0, 0), (0, size), (size, size), (size, 0))
+            for coord in (corner[0] + rng.uniform(-d, d), corner[1] + rng.uniform(-d, d))]
+    sticker = sticker.transform((size, size), Image.QUAD, quad, resample=Image.BILINEAR)
+    # 뒤집힌 스티커도 나오도록 전체 각도
+    return sticker.rotate(rng.uniform(0, 360), resample=Image.BILINEAR, expand=True)
+
+
+def _background(rng: random.Random, size: Tuple[int, int]) -> Image.Image:
+    source = _backgrounds[rng.randrange(len(_backgrounds))]
+    width, height = size
+    scale = rng.uniform(0.5, 1.0) * min(source.width / width, source.height / height)
+    crop_w, crop_h = int(width * scale), int(height * scale)
+    left = rng.randint(0, source.width - crop_w)
+    top = rng.randint(0, source.height - crop_h)
+    image = source.resize(size, Image.BILINEAR, box=(left, top, left + crop_w, top + crop_h))
+    if rng.random() < 0.5:
+        image = image.transpose(Image.FLIP_LEFT_RIGHT)
+    return image
+
+
+def _lighting(rng: random.Random, image: Image.Image) -> Image.Image:
+    image = ImageEnhance.Brightness(image).enhance(rng.uniform(0.6, 1.3))
+    image = ImageEnhance.Contrast(image).enhance(rng.uniform(0.75, 1.25))
+    # 한쪽에서 비치는 조명 (선형 그라디언트로 어둡게)
+    if rng.random() < 0.5:
+        mask = Image.linear_gradient('L').rotate(rng.uniform(0, 360)).resize(image.size)
+        mask = mask.point(lambda v, low=rng.uniform(0.4, 0.8): int(255 * (low + (1 - low) * v / 255)))
+        image = Image.composite(image, Image.new('RGB', image.size, (0, 0, 0)), mask)
+    # 색온도
+    warm = rng.uniform(-0.08, 0.08)
+    r, g, b = image.split()
+    r = r.point(lambda v: min(255, int(v * (1 + warm))))
+    b = b.point(lambda v: min(255, int(v * (1 - warm))))
+    return Image.merge('RGB', (r, g, b))
+
+
+def generate(index: int, seed: int, size: Tuple[int, int], sticker_ratio: float) -> Tuple[Image.Image, Dict]:
+    """
+    합성 이미지 하나와 정답 (index와 seed로만 결정)
+
+    Returns:
+        (이미지, {has_sticker, color, number})
+    """
+    rng = random.Random(seed * 1_000_003 + index)
+    image = _background(rng, size)
+    label = {'has_sticker': False, 'color': '', 'number': ''}
+
+    if rng.random() < sticker_ratio:
+        color = rng.choice(sorted(STICKER_COLORS))
+        number = str(rng.randint(1, 99))
+        sticker = render_sticker(rng, color, number, int(min(size) * rng.uniform(0.1, 0.22)))
+        x = rng.randint(0, max(0, size[0] - sticker.width))
+        y = rng.randint(0, max(0, size[1] - sticker.height))
+        image.paste(sticker, (x, y), sticker)
+        label = {'has_sticker': True, 'color': color, 'number': number}
+
+    image = _lighting(rng, image)
+    if rng.random() < 0.6:
+        # 초점 흐림 (박스 블러가 가우시안보다 두 배 이상 빠름)
+        image = image.filter(ImageFilter.BoxBlur(rng.uniform(0.3, 2.0)))
+    return image, label
+
+
+def _write_one(task: Tuple) -> Dict:
+    index, seed, size, sticker_ratio, output_dir, quality = task
+    image, label = generate(index, seed, size, sticker_ratio)
+    name = f'synth_{seed}_{index:06d}.jpg'
+    image.save(output_dir / name, 'JPEG', quality=quality)
+    return {'image': str(output_dir / name), **label}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='합성 스티커 이미지와 정답 라벨 생성')
+    parser.add_argument('--count', type=int, default=1000, help='생성할 이미지 수 (기본: 1000)')
+    parser.add_argument('--output', type=Path, default=Path('synthetic'), help='출력 폴더 (기본: synthetic)')
+    parser.add_argument('--seed', type=int, default=0, help='시드 (같은 시드면 같은 이미지, 기본: 0)')
+    parser.add_argument('--start', type=int, default=0, help='시작 번호 (이어서 만들 때, 기본: 0)')
+    parser.add_argument('--size', default='1024x768', help='이미지 크기 (기본: 1024x768)')
+    parser.add_argument('--sticker-ratio', type=float, default=1 / 3,
+                        help='스티커가 있는 이미지 비율 (기본: 1/3, 그룹 3장 중 1장)')
+    parser.add_argument('--quality', type=int, default=85, help='JPEG 품질 (기본: 85)')
+    parser.add_argument('--background-folder', type=Path, default=config.DEFAULT_IMAGE_FOLDER,
+                        help=f'배경 사진 폴더 (기본: {config.DEFAULT_IMAGE_FOLDER})')
+    parser.add_argument('--background-labels', type=Path, default=config.DEFAULT_LABELS_FILE,
+                        help=f'배경 사진 라벨 CSV, has_sticker=false인 사진만 배경으로 사용 '
+                             f'(기본: {config.DEFAULT_LABELS_FILE})')
+    parser.add_argument('--any-background', action='store_true',
+                        help='라벨 없이 폴더의 모든 사진을 배경으로 사용 (진짜 스티커가 잘려 들어가 정답이 틀릴 수 있음)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='프로세스 수 (기본: CPU 코어 수)')
+    args = parser.parse_args()
+
+    backgrounds = load_images(args.background_folder)
+    if not backgrounds:
+        print(f"오류: 배경 이미지를 찾을 수 없습니다: {args.background_folder}")
+        sys.exit(1)
+    if not args.any_background:
+        if not args.background_labels.exists():
+            print(f"오류: 배경 라벨 파일을 찾을 수 없습니다: {args.background_labels}")
+            print("  스티커가 없는 사진을 고르려면 라벨이 필요합니다 (--background-labels, 또는 --any-background).")
+            sys.exit(1)
+        total = len(backgrounds)
+        backgrounds = sticker_free(backgrounds, args.background_labels)
+        if not backgrounds:
+            print(f"오류: {args.background_labels}에 has_sticker=false로 라벨링된 배경 사진이 없습니다.")
+            sys.exit(1)
+        print(f"배경: 스티커 없는 사진 {len(backgrounds)}/{total}장 ({args.background_labels})")
+    try:
+        size = tuple(int(v) for v in args.size.lower().split('x'))
+        assert len(size) == 2 and min(size) > 0
+    except (ValueError, AssertionError):
+        parser.error(f'--size는 가로x세로 형식이어야 합니다: {args.size}')
+
+    args.output.mkdir(parents=True, exist_ok=True)
+    labels_file = args.output / 'labels.csv'
+    tasks = [(index, args.seed, size, args.sticker_ratio, args.output, args.quality)
+             for index in range(args.start, args.start + args.count)]
+
+    print(f"합성 이미지 {args.count}개 생성: {args.output} (seed {args.seed}, {size[0]}x{size[1]}, "
+          f"배경 {len(backgrounds)}장, 프로세스 {args.workers}개)")
+    started = time.perf_counter()
+    chunksize = max(1, min(64, math.ceil(args.count / (args.workers * 8))))
+    with Pool(args.workers, initializer=_init_worker, initargs=(backgrounds,)) as pool, \
+            open(labels_file, 'a' if args.start else 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=['image', 'has_sticker', 'color', 'number'])
+        if not args.start:
+            writer.writeheader()
+        for row in tqdm(pool.imap(_write_one, tasks, chunksize=chunksize), total=len(tasks), desc='생성 중'):
+            row['has_sticker'] = 'true' if row['has_sticker'] else 'false'
+            writer.writerow(row)
+
+    elapsed = time.perf_counter() - started
+    print(f"완료: {elapsed:.1f}초 ({args.count / elapsed:.0f}장/초), 라벨: {labels_file}")
+
+
+if __name__ == "__main__":
+    main()